@@ -59,10 +59,12 @@ public class DatabaseInitializer {
                 time_control VARCHAR(50),
                 site VARCHAR(255),
                 opening VARCHAR(255),
-                pgn VARCHAR(670)
+                pgn VARCHAR(670),
+                move_codes TEXT
             )
             """)
-                .then();
+                .then()
+                .then(databaseClient.sql("ALTER TABLE games ADD COLUMN IF NOT EXISTS move_codes TEXT").then());
     }
 
     private Mono<Void> createPositionsTable() {
@@ -1,11 +1,13 @@
 package com.example.chess.app.config;
 
+import org.apache.kafka.clients.admin.NewTopic;
 import org.apache.kafka.clients.consumer.ConsumerConfig;
 import org.apache.kafka.common.serialization.StringDeserializer;
 import org.springframework.beans.factory.annotation.Value;
 import org.springframework.context.annotation.Bean;
 import org.springframework.context.annotation.Configuration;
 import org.springframework.kafka.annotation.EnableKafka;
+import org.springframework.kafka.config.TopicBuilder;
 import org.springframework.kafka.config.ConcurrentKafkaListenerContainerFactory;
 import org.springframework.kafka.core.ConsumerFactory;
 import org.springframework.kafka.core.DefaultKafkaConsumerFactory;
@@ -24,6 +26,26 @@ public class KafkaConsumerConfig {
     @Value("${spring.kafka.consumer.group-id}")
     private String groupId;
 
+    @Value("${kafka.topics.chess-games}")
+    private String chessGamesTopic;
+
+    // Partitions of the games topic; the pre-processor spreads games over them by hashed game ID
+    @Value("${kafka.topics.chess-games.partitions}")
+    private int partitions;
+
+    // Listener containers (consumers) per instance; partitions are shared across all instances in the group
+    @Value("${kafka.consumer.concurrency}")
+    private int concurrency;
+
+    @Bean
+    public NewTopic chessGamesTopic() {
+        // Created on startup if missing; KafkaAdmin adds partitions to an existing topic that has fewer
+        return TopicBuilder.name(chessGamesTopic)
+                .partitions(partitions)
+                .replicas(1)
+                .build();
+    }
+
     @Bean
     public ConsumerFactory<String, String> consumerFactory() {
         Map<String, Object> props = new HashMap<>();
@@ -46,6 +68,7 @@ public class KafkaConsumerConfig {
                 new ConcurrentKafkaListenerContainerFactory<>();
         factory.setConsumerFactory(consumerFactory());
         factory.setBatchListener(true); // Enable batch listening
+        factory.setConcurrency(concurrency);
         return factory;
     }
 }
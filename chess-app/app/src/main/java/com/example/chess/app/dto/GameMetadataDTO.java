@@ -17,4 +17,5 @@ public class GameMetadataDTO {
     private String opening;
     private String site;
     private String pgn;
+    private String moveCodes;
 }
@@ -6,6 +6,8 @@ import java.util.List;
 
 @Data
 public class PositionDTO {
+    // Content-derived (gameId, ply) ID from the pre-processor
+    private String positionId;
     private Integer moveNumber;
     private String sideToMove;
     private Integer castlingRights;
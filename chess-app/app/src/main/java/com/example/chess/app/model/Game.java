@@ -30,6 +30,8 @@ public class Game implements Persistable<String> {
     private String site;
     private String opening;
     private String pgn;
+    // Base64 of 16-bit from/to/promotion codes, one per ply, untruncated
+    private String moveCodes;
 
     @Transient
     private Boolean isNew = false;
@@ -22,6 +22,8 @@ public class LLMRequest {
         private String gameId;
         private String fen;
         private String moves;
+        // Continuation as base64 move codes; when set, moves may be empty
+        private String moveCodes;
         private String side;
     }
 }
@@ -20,6 +20,7 @@ import reactor.core.publisher.Mono;
 import java.util.ArrayList;
 import java.util.List;
 import java.util.UUID;
+import java.util.stream.Collectors;
 
 @Service
 @Slf4j
@@ -60,7 +61,7 @@ public class KafkaListenerService {
     }
 
     private Mono<Void> processGameData(GameDTO gameData) {
-        // Generate a unique game ID if not provided
+        // The pre-processor sends content-derived IDs; generate a random one only for older producers
         String gameId = gameData.getGameMetadata().getGameId();
         if (gameId == null || gameId.isEmpty()) {
             gameId = UUID.randomUUID().toString();
@@ -76,11 +77,22 @@ public class KafkaListenerService {
         // Create Position entities
         List<Position> positions = mapToPositions(gameData.getPositions(), finalGameId);
 
-        // Save game first, then save all positions, returning a single Mono that completes when all operations complete
-        return gameRepository.save(game)
-                .then(Flux.fromIterable(positions)
-                        .flatMap(positionRepository::save)
-                        .then())
+        // Stable IDs make ingestion idempotent: a replayed game or position is skipped instead of
+        // duplicated. Positions are checked even when the game exists, to complete a partial earlier save.
+        Mono<Void> saveGame = gameRepository.existsById(finalGameId)
+                .flatMap(exists -> exists ? Mono.<Void>empty() : gameRepository.save(game).then());
+
+        Mono<Void> savePositions = positionRepository.findAllById(positions.stream().map(Position::getId).toList())
+                .map(Position::getId)
+                .collect(Collectors.toSet())
+                .flatMapMany(existing -> Flux.fromIterable(positions)
+                        .filter(position -> !existing.contains(position.getId())))
+                .flatMap(positionRepository::save)
+                .then();
+
+        // Save game first, then the missing positions, returning a single Mono that completes when all operations complete
+        return saveGame
+                .then(savePositions)
                 .doOnSuccess(v -> log.debug("Successfully processed game {}", finalGameId))
                 .doOnError(e -> log.error("Error processing game {}: {}", finalGameId, e.getMessage()));
     }
@@ -100,6 +112,7 @@ public class KafkaListenerService {
                 .opening(metadata.getOpening())
                 .site(metadata.getSite())
                 .pgn(metadata.getPgn())
+                .moveCodes(metadata.getMoveCodes())
                 .build();
     }
 
@@ -109,7 +122,7 @@ public class KafkaListenerService {
         for (PositionDTO dto : positionDTOs) {
 
             Position position = Position.builder()
-                    .id(UUID.randomUUID())
+                    .id(dto.getPositionId() != null ? UUID.fromString(dto.getPositionId()) : UUID.randomUUID())
                     .gameId(gameId)
                     .moveNumber(dto.getMoveNumber())
                     .whiteKing(dto.getWhiteKing())
@@ -10,6 +10,8 @@ import com.example.chess.app.repository.PositionRepository;
 import org.springframework.stereotype.Service;
 import reactor.core.publisher.Mono;
 
+import java.util.Arrays;
+import java.util.Base64;
 import java.util.List;
 import java.util.UUID;
 
@@ -61,7 +63,8 @@ public class SummaryService {
                 .map(result -> LLMRequest.GameSummaryRequest.builder()
                         .gameId(result.getGame().getId())
                         .fen(result.getPosition().getFen())
-                        .moves(extractRemainingPgn(result.getPosition().getFen(), result.getGame().getPgn()))
+                        .moves(hasMoveCodes(result) ? "" : extractRemainingPgn(result.getPosition().getFen(), result.getGame().getPgn()))
+                        .moveCodes(hasMoveCodes(result) ? sliceMoveCodes(result.getGame().getMoveCodes(), result.getPosition().getMoveNumber()) : null)
                         .side(side)
                         .build())
                 .toList();
@@ -69,6 +72,17 @@ public class SummaryService {
         return llmClient.analyzeStrategy(requestList);
     }
 
+    private boolean hasMoveCodes(SimilarityResult result) {
+        return result.getGame().getMoveCodes() != null && result.getPosition().getMoveNumber() != null;
+    }
+
+    // Move codes are 2 bytes per ply, so the continuation after a position is a byte slice
+    private String sliceMoveCodes(String moveCodes, int ply) {
+        byte[] codes = Base64.getDecoder().decode(moveCodes);
+        int start = Math.min(2 * ply, codes.length);
+        return Base64.getEncoder().encodeToString(Arrays.copyOfRange(codes, start, codes.length));
+    }
+
     private String extractRemainingPgn(String fen, String fullPgn) {
         String[] fenParts = fen.split(" ");
         if (fenParts.length < 6) return "";
@@ -1,12 +1,17 @@
-from openai import OpenAI
+from openai import AsyncOpenAI
 import os
 from dotenv import load_dotenv
-from typing import List
+from typing import AsyncIterator, List
+from llm_scheduler import estimate_tokens, get_scheduler
+from single_flight import SingleFlight, aggregate_key
 
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+async_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
 
-async def aggregate_strategies(summaries: List[str]) -> str:
+# Identical concurrent aggregations share one LLM call
+aggregate_flight = SingleFlight("aggregate")
+
+def build_messages(summaries: List[str]) -> list[dict]:
     joined = "\n".join(summaries)
     prompt = f"""
     Below are summaries of strategies from multiple games. Your task is to synthesize a **tactical roadmap** that captures the most common and actionable ideas shared across games.
@@ -20,13 +25,42 @@ async def aggregate_strategies(summaries: List[str]) -> str:
     - Do **not** repeat full sentences from the input. Consolidate and abstract over them.
     """
 
-    response = client.chat.completions.create(
-        model=os.getenv("OPENAI_MODEL"),
-        messages=[
-            {"role": "system", "content": "You are a chess analyst trained to extract common plans across games."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.5
+    return [
+        {"role": "system", "content": "You are a chess analyst trained to extract common plans across games."},
+        {"role": "user", "content": prompt}
+    ]
+
+async def _aggregate(summaries: List[str]) -> str:
+    messages = build_messages(summaries)
+    response = await get_scheduler().acall(
+        lambda: async_client.chat.completions.create(
+            model=os.getenv("OPENAI_MODEL"),
+            messages=messages,
+            temperature=0.5
+        ),
+        estimate_tokens(message["content"] for message in messages)
     )
 
-    return response.choices[0].message.content.strip()
\ No newline at end of file
+    return response.choices[0].message.content.strip()
+
+async def aggregate_strategies(summaries: List[str]) -> str:
+    key = aggregate_key(summaries, os.getenv("OPENAI_MODEL"))
+    return await aggregate_flight.do(key, lambda: _aggregate(summaries))
+
+async def stream_aggregate_strategies(summaries: List[str]) -> AsyncIterator[str]:
+    """
+    Same as aggregate_strategies, but yields the roadmap's tokens as they are produced.
+    """
+    messages = build_messages(summaries)
+    stream = await get_scheduler().acall(
+        lambda: async_client.chat.completions.create(
+            model=os.getenv("OPENAI_MODEL"),
+            messages=messages,
+            temperature=0.5,
+            stream=True
+        ),
+        estimate_tokens(message["content"] for message in messages)
+    )
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
\ No newline at end of file
@@ -1,15 +1,49 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Header
+from fastapi.responses import StreamingResponse
 from models import StrategyRequest
-from strategy_generator import generate_per_game_summaries
-from aggregator import aggregate_strategies
+from strategy_generator import generate_per_game_summaries, stream_per_game_summaries
+from aggregator import aggregate_strategies, stream_aggregate_strategies
+from llm_scheduler import INTERACTIVE, get_scheduler, set_llm_priority
+import json
 
 app = FastAPI()
 
 @app.post("/analyze-strategy")
-async def analyze_strategy(request: StrategyRequest):
+async def analyze_strategy(request: StrategyRequest, x_llm_priority: str = Header(None)):
+    set_llm_priority(x_llm_priority or INTERACTIVE)
     summaries = await generate_per_game_summaries(request)
     agg_summary = await aggregate_strategies([s["summary"] for s in summaries])
     return {
         "aggregated_summary": agg_summary,
         "per_game_summaries": summaries
-    }
\ No newline at end of file
+    }
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/analyze-strategy/stream")
+async def analyze_strategy_stream(request: StrategyRequest, x_llm_priority: str = Header(None)):
+    """
+    Server-sent events: one `game_summary` event per game as soon as it completes,
+    then `aggregate_token` events while the aggregated roadmap is generated, then `done`.
+    """
+    async def events():
+        set_llm_priority(x_llm_priority or INTERACTIVE)
+        summaries = []
+        async for summary in stream_per_game_summaries(request):
+            yield sse_event("game_summary", summary)
+            if "summary" in summary:
+                summaries.append(summary["summary"])
+
+        tokens = []
+        async for token in stream_aggregate_strategies(summaries):
+            tokens.append(token)
+            yield sse_event("aggregate_token", {"token": token})
+        yield sse_event("done", {"aggregated_summary": "".join(tokens).strip()})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/llm-scheduler")
+async def llm_scheduler_stats():
+    return get_scheduler().snapshot()
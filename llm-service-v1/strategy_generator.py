@@ -1,16 +1,21 @@
-from openai import OpenAI
+from openai import AsyncOpenAI
+import asyncio
 import os
-from models import StrategyRequest
+from typing import AsyncIterator
+from models import GameSummaryRequest, StrategyRequest
+from llm_scheduler import estimate_tokens, get_scheduler
+from single_flight import SingleFlight, analysis_key
 from dotenv import load_dotenv
 
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Retries are handled by the scheduler so that 429s also pause the other queued calls
+async_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
 
-async def generate_per_game_summaries(request: StrategyRequest) -> list[dict]:
-    summaries = []
-    i = 1
-    for position in request.positions:
-        prompt = f"""
+# Concurrent requests for the same game share one LLM call
+summary_flight = SingleFlight("summary")
+
+def build_messages(position: GameSummaryRequest) -> list[dict]:
+    prompt = f"""
         You are a chess strategist. Your task is to analyze the following position and move sequence, and create a clear, objective strategy that the player should follow.
 
         FEN (starting position): {position.fen}  
@@ -22,25 +27,58 @@ async def generate_per_game_summaries(request: StrategyRequest) -> list[dict]:
         - Keep the suggestions **concrete and actionable**, not generic advice
         - Do NOT include summaries, or closing remarks
         """
+    return [
+        {"role": "system", "content": "You are a chess assistant that analyzes strategies from a given position and move sequence."},
+        {"role": "user", "content": prompt}
+    ]
+
+def _estimate(messages: list[dict]) -> int:
+    return estimate_tokens(message["content"] for message in messages)
 
-        response = client.chat.completions.create(
+async def _summarize(position: GameSummaryRequest) -> str:
+    messages = build_messages(position)
+    response = await get_scheduler().acall(
+        lambda: async_client.chat.completions.create(
             model=os.getenv("OPENAI_MODEL"),
-            messages=[
-                {"role": "system", "content": "You are a chess assistant that analyzes strategies from a given position and move sequence."},
-                {"role": "user", "content": prompt}
-            ],
+            messages=messages,
             temperature=0.7
-        )
-
-        print(i,response)
-        i+=1
+        ),
+        _estimate(messages)
+    )
+    return response.choices[0].message.content.strip()
 
-        content = response.choices[0].message.content.strip()
+def summarize_position(position: GameSummaryRequest):
+    key = analysis_key(position.fen, position.moves, position.side, os.getenv("OPENAI_MODEL"))
+    return summary_flight.do(key, lambda: _summarize(position))
 
+async def generate_per_game_summaries(request: StrategyRequest) -> list[dict]:
+    summaries = []
+    for position in request.positions:
         summaries.append({
             "game_id": position.gameId,
-            "summary": content
+            "summary": await summarize_position(position)
         })
 
+    return summaries
+
+async def stream_per_game_summaries(request: StrategyRequest) -> AsyncIterator[dict]:
+    """
+    Requests all per-game summaries concurrently and yields each one as soon as it completes.
+    """
+    async def run(position: GameSummaryRequest) -> dict:
+        try:
+            summary = await summarize_position(position)
+        except Exception as e:
+            return {"game_id": position.gameId, "error": str(e)}
+        return {
+            "game_id": position.gameId,
+            "summary": summary
+        }
 
-    return summaries
\ No newline at end of file
+    tasks = [asyncio.create_task(run(position)) for position in request.positions]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
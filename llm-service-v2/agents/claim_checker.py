@@ -0,0 +1,190 @@
+import os
+import re
+from typing import Dict, List
+
+import chess
+
+# Minimum number of supported claims (and maximum share of claims we could not
+# check) before the rule-based verdict is trusted without an LLM critique.
+MIN_SUPPORTED_CLAIMS = int(os.getenv("CLAIM_CHECK_MIN_SUPPORTED", "2"))
+MAX_UNVERIFIABLE_RATIO = float(os.getenv("CLAIM_CHECK_MAX_UNVERIFIABLE_RATIO", "0.34"))
+
+PIECE_WORDS = {
+    "king": chess.KING,
+    "queen": chess.QUEEN,
+    "rook": chess.ROOK,
+    "bishop": chess.BISHOP,
+    "knight": chess.KNIGHT,
+    "pawn": chess.PAWN,
+}
+
+PIECE_ON_SQUARE = re.compile(r"\b(?:(white|black)(?:['’]s)?\s+)?(king|queen|rook|bishop|knight|pawn)s?\s+(?:on|at)\s+([a-h][1-8])\b",
+                             re.IGNORECASE)
+SAN_MOVE = re.compile(r"(?<![\w-])((?:[KQRBN][a-h]?[1-8]?x?|[a-h]x)[a-h][1-8](?:=[QRBN])?)[+#]?(?![\w])")
+OPEN_FILE = re.compile(r"\b(open|semi-open|half-open)\s+([a-h])-file\b", re.IGNORECASE)
+FILE_IS_OPEN = re.compile(r"\b([a-h])-file\s+is\s+(open|semi-open|half-open|closed)\b", re.IGNORECASE)
+CASTLING = re.compile(r"\b(?:castl\w*)\s+(kingside|queenside|king-side|queen-side|short|long)\b", re.IGNORECASE)
+BISHOP_PAIR = re.compile(r"\bbishop pair\b", re.IGNORECASE)
+
+COLOR_WORDS = {"white": chess.WHITE, "black": chess.BLACK}
+
+
+def _replay_boards(fen: str, moves_uci: List[str]) -> List[chess.Board]:
+    board = chess.Board(fen) if fen else chess.Board()
+    boards = [board.copy(stack=False)]
+    for uci in moves_uci:
+        try:
+            move = chess.Move.from_uci(uci)
+        except ValueError:
+            break
+        if move not in board.legal_moves:
+            break
+        board.push(move)
+        boards.append(board.copy(stack=False))
+    return boards
+
+
+def _claimed_colors(text: str, start: int, side: str) -> List[chess.Color]:
+    """
+    Color a claim is about: the last "white"/"black" in the words before it within its
+    sentence, else the side being analyzed, else both.
+    """
+    sentence = re.split(r"[.;:\n]", text[max(0, start - 60):start])[-1].lower().split()
+    for word in reversed(sentence[-6:]):
+        color = COLOR_WORDS.get(word.strip(",'()").removesuffix("'s"))
+        if color is not None:
+            return [color]
+    if (side or "").lower() in COLOR_WORDS:
+        return [COLOR_WORDS[side.lower()]]
+    return list(chess.COLORS)
+
+
+def _file_is_open(board: chess.Board, file_index: int) -> str:
+    file_mask = chess.BB_FILES[file_index]
+    white = bool(board.pieces_mask(chess.PAWN, chess.WHITE) & file_mask)
+    black = bool(board.pieces_mask(chess.PAWN, chess.BLACK) & file_mask)
+    if not white and not black:
+        return "open"
+    if not white or not black:
+        return "semi-open"
+    return "closed"
+
+
+def check_strategy_claims(strategy: str, fen: str, position_features: Dict, moves_uci: List[str],
+                          side: str = None) -> Dict:
+    """
+    Extracts square, piece, file, castling and capture references from a synthesized strategy
+    and validates them against the FEN, the played continuation and the extracted position features.
+    `side` is the side the strategy is for; castling claims that name no color are checked for it.
+    Returns a verdict of 'valid', 'needs_correction' or 'inconclusive' along with the detected issues.
+    """
+    boards = _replay_boards(fen, moves_uci)
+    supported, contradicted, unverifiable = 0, 0, 0
+    issues = []
+
+    # Which pieces (color, type) ever stood on which square, and which pieces exist at all
+    occupancy: Dict[int, set] = {}
+    pieces_seen = set()
+    for board in boards:
+        for square, piece in board.piece_map().items():
+            occupancy.setdefault(square, set()).add((piece.color, piece.piece_type))
+            pieces_seen.add((piece.color, piece.piece_type))
+    piece_types_seen = {piece_type for _, piece_type in pieces_seen}
+
+    # 1. "<piece> on <square>", of the color the text gives ("White's knight on f6") or either
+    for match in PIECE_ON_SQUARE.finditer(strategy):
+        color_word, piece_word = (match.group(1) or "").lower(), match.group(2).lower()
+        piece_type = PIECE_WORDS[piece_word]
+        square = chess.parse_square(match.group(3).lower())
+        pieces = {(COLOR_WORDS[color_word], piece_type)} if color_word else {(color, piece_type) for color in chess.COLORS}
+        named = f"{color_word} {piece_word}".strip()
+        if pieces & occupancy.get(square, set()):
+            supported += 1
+        elif not pieces & pieces_seen:
+            contradicted += 1
+            issues.append(f"Mentions a {named} on {match.group(3)}, but there is no {named} on the board.")
+        else:
+            # The piece exists but never stands there: usually a plan ("the knight belongs on d5")
+            unverifiable += 1
+
+    # 2. SAN moves such as Nf3, Bxf6, exd5
+    for match in SAN_MOVE.finditer(strategy):
+        san = match.group(1)
+        piece_type = chess.PIECE_SYMBOLS.index(san[0].lower()) if san[0].isupper() else chess.PAWN
+        if piece_type not in piece_types_seen:
+            contradicted += 1
+            issues.append(f"Move {san} refers to a piece that does not exist in the position.")
+            continue
+        playable = False
+        for board in boards:
+            try:
+                board.parse_san(san)
+                playable = True
+                break
+            except ValueError:
+                continue
+        if playable:
+            supported += 1
+        else:
+            unverifiable += 1
+
+    # 3. Open / semi-open files
+    file_claims = [(m.group(2).lower(), m.group(1).lower()) for m in OPEN_FILE.finditer(strategy)]
+    file_claims += [(m.group(1).lower(), m.group(2).lower()) for m in FILE_IS_OPEN.finditer(strategy)]
+    for file_letter, claimed in file_claims:
+        claimed = "semi-open" if claimed == "half-open" else claimed
+        file_index = ord(file_letter) - ord("a")
+        statuses = {_file_is_open(board, file_index) for board in boards}
+        if claimed in statuses or (claimed == "semi-open" and "open" in statuses):
+            supported += 1
+        else:
+            contradicted += 1
+            issues.append(f"Claims the {file_letter}-file is {claimed}, but it is {_file_is_open(boards[0], file_index)} "
+                          f"and stays {'/'.join(sorted(statuses))} over the played moves.")
+
+    # 4. Castling
+    for match in CASTLING.finditer(strategy):
+        kingside = match.group(1).lower() in ("kingside", "king-side", "short")
+        start = boards[0]
+        colors = _claimed_colors(strategy, match.start(), side)
+        has_rights = any(
+            (start.has_kingside_castling_rights(color) if kingside else start.has_queenside_castling_rights(color))
+            for color in colors
+        )
+        already_castled = any(
+            start.king(color) == chess.square(6 if kingside else 2, 0 if color == chess.WHITE else 7)
+            for color in colors
+        )
+        if has_rights:
+            supported += 1
+        elif already_castled:
+            # Either advice to castle a second time or a remark about the past: let the critique decide
+            unverifiable += 1
+        else:
+            contradicted += 1
+            named = "neither side" if len(colors) == 2 else chess.COLOR_NAMES[colors[0]].capitalize()
+            issues.append(f"Refers to castling {match.group(1).lower()}, but {named} cannot castle there.")
+
+    # 5. Bishop pair
+    if BISHOP_PAIR.search(strategy):
+        if position_features.get("white_has_bishop_pair") or position_features.get("black_has_bishop_pair"):
+            supported += 1
+        elif position_features:
+            contradicted += 1
+            issues.append("Mentions the bishop pair, but neither side has it.")
+
+    total = supported + contradicted + unverifiable
+    if contradicted:
+        verdict = "needs_correction"
+    elif supported >= MIN_SUPPORTED_CLAIMS and unverifiable <= MAX_UNVERIFIABLE_RATIO * total:
+        verdict = "valid"
+    else:
+        verdict = "inconclusive"
+
+    return {
+        "verdict": verdict,
+        "issues": issues,
+        "supported": supported,
+        "contradicted": contradicted,
+        "unverifiable": unverifiable,
+    }
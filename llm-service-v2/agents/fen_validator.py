@@ -22,7 +22,6 @@ def fen_validator_tool(state: Annotated[Dict, "state"]) -> dict:
             "is_check": board.is_check(),
             "halfmove_clock": board.halfmove_clock,
         }
-        print("State after FEN Validator: ", state)
         return {"state": state}
     except Exception as e:
         raise ValueError(f"Invalid FEN: {e}")
@@ -1,8 +1,45 @@
 from langchain_core.tools import tool
-from typing import Dict
+from typing import Dict, List, Optional
 from langchain_core.runnables import Runnable
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.language_models import BaseChatModel
+import asyncio
+import json
+import os
+
+from instrumentation import debug, node_span
+from prompt_budget import PROMPT_TOKEN_BUDGET, count_tokens, encode_position_features, fit_prompt_to_budget
+
+# Input token budget of one batched synthesis call, and the budget of each game inside it
+BATCH_SYNTHESIS_TOKENS = int(os.getenv("BATCH_SYNTHESIS_TOKENS", "6000"))
+BATCH_GAME_TOKENS = int(os.getenv("BATCH_GAME_TOKENS", str(PROMPT_TOKEN_BUDGET // 2)))
+# Caps the games per call so the roadmaps fit in the completion
+BATCH_SYNTHESIS_MAX_GAMES = int(os.getenv("BATCH_SYNTHESIS_MAX_GAMES", "8"))
+
+# Prompts keep every static instruction in the system message and only per-request data in
+# the user message, so all calls of a prompt share a byte-identical prefix that the provider
+# can serve from its prompt cache. Nothing request-specific may go into the system message.
+SYNTHESIS_PROMPT = ChatPromptTemplate.from_messages([
+    ("system",
+     "You are a chess strategist. Your task is to analyze the chess game shared with you with the help of the "
+     "structural and positional insights provided and generate a strategic plan for the side named in the request.\n"
+     "Carefully go through and analyze the game move by move. Take help of the insights provided.\n"
+     "Please produce the following:\n"
+     "- A short summary of the strategic goal for that side\n"
+     "- A bullet-point roadmap of **specific strategic ideas**, such as:\n"
+     "  - pawn breaks\n"
+     "  - piece placements\n"
+     "  - open files\n"
+     "  - targets or weaknesses to attack or defend\n"
+     "- Each bullet should be **concrete, actionable, and free of vague advice**\n"
+     "- Do NOT include conclusions, closing remarks, or phrases like 'In summary' or 'Overall'."),
+    ("user",
+     "Plan for {side}\n"
+     "FEN of current position - {fen}\n"
+     "POSITION FEATURES of above position:\n{position}\n\n"
+     "PGN sequence of moves after the above position - {pgn}\n"
+     "STRUCTURE INSIGHTS for moves:\n{structure}")
+])
 
 @tool
 def idea_synthesizer_tool(state: Dict, llm: BaseChatModel) -> Dict:
@@ -19,38 +56,127 @@ def idea_synthesizer_tool(state: Dict, llm: BaseChatModel) -> Dict:
     if not structure or not side:
         raise ValueError("Missing one or more of: structure_insights, position_features, side")
 
-    prompt = ChatPromptTemplate.from_messages([
-    ("system", 
-     "You are a chess strategist. Your task is to analyze the chess game shared with you with the help of the structural and positional insights below and generate a strategic plan for {side}."),
-     
-    ("user", 
+    chain: Runnable = SYNTHESIS_PROMPT | llm
+
+    # Compact, token-budgeted encodings instead of the raw dict reprs
+    inputs = fit_prompt_to_budget(SYNTHESIS_PROMPT, {
+        "side": side,
+        "position": encode_position_features(position),
+        "fen":fen,
+        "pgn": pgn
+    }, structure, node="idea_synthesizer", truncatable=("structure", "pgn"))
+
+    formatted = chain.invoke(inputs)
+
+    return {"state": {"synthesized_ideas": formatted.content.strip()}}
+
+
+GAME_BLOCK = ChatPromptTemplate.from_messages([
+    ("user",
+     "plan for {side}\n"
      "FEN of current position - {fen}\n"
-     "POSITION FEATURES of above position:\n{position}\n\n"
+     "POSITION FEATURES:\n{position}\n"
      "PGN sequence of moves after the above position - {pgn}\n"
-     "STRUCTURE INSIGHTS for moves:\n{structure}\n\n"
-     "Carefully go through and analyze the game above move by move. Take help of the insights provided.\n"
-     "Please produce the following:\n"
-     "- A short summary of the strategic goal for {side}\n"
-     "- A bullet-point roadmap of **specific strategic ideas**, such as:\n"
-     "  - pawn breaks\n"
-     "  - piece placements\n"
-     "  - open files\n"
-     "  - targets or weaknesses to attack or defend\n"
+     "STRUCTURE INSIGHTS for moves:\n{structure}\n")
+])
+
+BATCH_PROMPT = ChatPromptTemplate.from_messages([
+    ("system",
+     "You are a chess strategist. For each chess game shared with you, analyze it with the help of the structural "
+     "and positional insights and generate a strategic plan for the side named in that game's header.\n"
+     "For EVERY game, carefully go through the moves and produce:\n"
+     "- A short summary of the strategic goal\n"
+     "- A bullet-point roadmap of **specific strategic ideas** (pawn breaks, piece placements, open files, "
+     "targets or weaknesses to attack or defend)\n"
      "- Each bullet should be **concrete, actionable, and free of vague advice**\n"
-     "- Do NOT include conclusions, closing remarks, or phrases like 'In summary' or 'Overall'."
-    )
+     "- Do NOT include conclusions, closing remarks, or phrases like 'In summary' or 'Overall'.\n\n"
+     "Return JSON: {{\"games\": [{{\"game\": <game number>, \"strategy\": \"Strategic Goal\\n<goal>\\n- <idea>\\n- <idea>\"}}]}} "
+     "with one entry per game."),
+    ("user", "{games}")
 ])
 
-    chain: Runnable = prompt | llm
 
-    formatted = chain.invoke({
-        "side": side,
-        "structure": structure,
-        "position": position,
-        "fen":fen,
-        "pgn": pgn
-    })
+def _game_block(state: Dict) -> str:
+    inputs = fit_prompt_to_budget(GAME_BLOCK, {
+        "side": state.get("side"),
+        "position": encode_position_features(state.get("position_features", {})),
+        "fen": state.get("fen"),
+        "pgn": state.get("moves")
+    }, state.get("structure_insights", []), node="batch_idea_synthesizer", truncatable=("structure", "pgn"),
+        budget=BATCH_GAME_TOKENS)
+    return GAME_BLOCK.format_messages(**inputs)[0].content
+
+
+def pack_game_batches(blocks: List[str], budget: int = BATCH_SYNTHESIS_TOKENS,
+                      max_games: int = BATCH_SYNTHESIS_MAX_GAMES) -> List[List[int]]:
+    """
+    Greedily groups game blocks (by position in `blocks`) into batches that fit the token budget.
+    """
+    batches, current, current_tokens = [], [], 0
+    for index, block in enumerate(blocks):
+        tokens = count_tokens(block)
+        if current and (current_tokens + tokens > budget or len(current) >= max_games):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(index)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _parse_batch(content: str, size: int) -> List[Optional[str]]:
+    """
+    Maps the model's JSON reply to one strategy per game in the batch; games that are
+    missing or malformed come back as None.
+    """
+    strategies = [None] * size
+    try:
+        games = json.loads(content).get("games", [])
+    except (json.JSONDecodeError, AttributeError):
+        return strategies
+    for entry in games if isinstance(games, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            number = int(entry.get("game"))
+        except (TypeError, ValueError):
+            continue
+        strategy = entry.get("strategy")
+        if 1 <= number <= size and isinstance(strategy, str) and strategy.strip():
+            strategies[number - 1] = strategy.strip()
+    return strategies
+
+
+@tool
+async def batch_idea_synthesizer_tool(states: List[Dict], llm: BaseChatModel) -> Dict:
+    """
+    Synthesizes strategic ideas for several analyzed games with as few LLM calls as possible:
+    the games' compact analyses are packed into token-budgeted batches, each answered with a
+    JSON array of per-game roadmaps. Returns {"ideas": [...]} aligned with `states`; an entry is
+    None when its batch reply could not be parsed, so the caller can fall back to a per-game call.
+    """
+    with node_span("batch_idea_synthesizer"):
+        blocks = [_game_block(state) for state in states]
+        batches = pack_game_batches(blocks)
+        chain: Runnable = BATCH_PROMPT | llm.bind(response_format={"type": "json_object"})
+
+        async def synthesize(batch: List[int]) -> List[Optional[str]]:
+            # Games are renumbered 1..n inside each batch
+            games = "\n".join(f"GAME {number} - {blocks[index]}" for number, index in enumerate(batch, start=1))
+            try:
+                response = await chain.ainvoke({"games": games})
+            except Exception as e:
+                debug(f"Batched synthesis failed for {len(batch)} games: {e}")
+                return [None] * len(batch)
+            return _parse_batch(response.content, len(batch))
+
+        results = await asyncio.gather(*(synthesize(batch) for batch in batches))
 
-    state["synthesized_ideas"] = formatted.content.strip()
-    print("State after Idea Generator: ", state)
-    return {"state": state}
+    ideas = [None] * len(states)
+    for batch, strategies in zip(batches, results):
+        for index, strategy in zip(batch, strategies):
+            ideas[index] = strategy
+    debug(f"Batched synthesis: {len(states)} games in {len(batches)} calls, "
+          f"{sum(idea is None for idea in ideas)} left for per-game fallback")
+    return {"ideas": ideas}
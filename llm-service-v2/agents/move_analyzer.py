@@ -0,0 +1,111 @@
+from typing import Dict, List, NamedTuple, Optional
+import chess
+
+from langchain_core.tools import tool
+
+from single_flight import normalize_moves
+
+# Structural flags of a ply
+PAWN_PUSH = 1
+PAWN_DIAGONAL_PUSH = 2
+CENTRAL_FILE = 4
+FLANK_FILE = 8
+FILE_ACTIVATION = 16  # rook or queen move
+CAPTURE = 32
+
+CENTRAL_FILES = (2, 3, 4, 5)  # c-f
+
+
+class PlyRecord(NamedTuple):
+    """
+    One ply of the continuation with everything the prompts and the verifier need.
+    Squares and piece types are python-chess integers.
+    """
+    move_number: int
+    white: bool
+    san: str
+    uci: str
+    from_square: int
+    to_square: int
+    piece_type: int
+    captured_piece_type: Optional[int]
+    flags: int
+
+    @property
+    def player(self) -> str:
+        return "White" if self.white else "Black"
+
+    @property
+    def capture_narration(self) -> Optional[str]:
+        if not self.flags & CAPTURE:
+            return None
+        captured = chess.piece_name(self.captured_piece_type) if self.captured_piece_type else "unknown piece"
+        return (f"{chess.piece_name(self.piece_type).capitalize()} on {chess.square_name(self.from_square)} "
+                f"captures {captured} on {chess.square_name(self.to_square)}.")
+
+    def as_dict(self) -> Dict:
+        """
+        Readable form for logs and debugging, in the shape of the former per-ply insight dicts.
+        """
+        movement = (f"{chess.piece_name(self.piece_type).capitalize()} moved from "
+                    f"{chess.square_name(self.from_square)} to {chess.square_name(self.to_square)}")
+        insights = []
+        if self.flags & PAWN_PUSH:
+            insights.append("pawn_push")
+        if self.flags & PAWN_DIAGONAL_PUSH:
+            insights.append("pawn_diagonal_push")
+        insights.append(f"{'central' if self.flags & CENTRAL_FILE else 'flank'}_file movement - {movement}")
+        if self.flags & FILE_ACTIVATION:
+            insights.append(f"{chess.piece_symbol(self.piece_type)}_file_activation")
+        if self.flags & CAPTURE:
+            insights.append("central_capture" if self.flags & CENTRAL_FILE else "flank_capture")
+        ply = {"move_number": self.move_number, "player": self.player, "san": self.san, "uci": self.uci,
+               "insights": insights}
+        if self.flags & CAPTURE:
+            ply["capture_narration"] = self.capture_narration
+        return ply
+
+
+def analyze_moves(fen: str, moves: str) -> List[PlyRecord]:
+    """
+    Replays the SAN continuation from `fen` once and records each ply's structural flags:
+    pawn pushes, central or flank file, rook/queen file activation and captures.
+    """
+    board = chess.Board(fen)
+    plies = []
+    for san in normalize_moves(moves).split():
+        try:
+            move = board.parse_san(san)
+        except ValueError:
+            raise ValueError(f"Illegal move '{san}' on board: {board.fen()}")
+
+        piece_type = board.piece_type_at(move.from_square)
+        flags = CENTRAL_FILE if chess.square_file(move.to_square) in CENTRAL_FILES else FLANK_FILE
+        if piece_type == chess.PAWN:
+            flags |= PAWN_PUSH
+            if chess.square_file(move.from_square) != chess.square_file(move.to_square):
+                flags |= PAWN_DIAGONAL_PUSH
+        elif piece_type in (chess.ROOK, chess.QUEEN):
+            flags |= FILE_ACTIVATION
+
+        captured_piece_type = None
+        if board.is_capture(move):
+            flags |= CAPTURE
+            captured_piece_type = chess.PAWN if board.is_en_passant(move) else board.piece_type_at(move.to_square)
+
+        plies.append(PlyRecord(board.fullmove_number, board.turn, san, move.uci(), move.from_square,
+                               move.to_square, piece_type, captured_piece_type, flags))
+        board.push(move)
+    return plies
+
+
+@tool
+def move_analyzer_tool(state: Dict) -> Dict:
+    """
+    Replays the SAN moves after the given FEN in a single pass and returns one compact
+    PlyRecord per ply with its structural flags under `structure_insights`.
+    Requires `moves` in the input state; a missing `fen` means the starting position.
+    """
+    if not state.get("moves"):
+        raise ValueError("'moves' must be provided in the state.")
+    return {"state": {"structure_insights": analyze_moves(state.get("fen") or chess.STARTING_FEN, state["moves"])}}
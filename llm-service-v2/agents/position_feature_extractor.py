@@ -31,7 +31,6 @@ def position_feature_extractor_tool(state: Dict) ->  Annotated[Dict, "position_f
         king_square = board.king(color)
         rank = chess.square_rank(king_square)
         file = chess.square_file(king_square)
-        print("KIng rank:", rank, "king File: ", file)
         castled = (file in [6, 2])  # kingside or queenside
 
         pawn_shield = 0
@@ -99,5 +98,4 @@ def position_feature_extractor_tool(state: Dict) ->  Annotated[Dict, "position_f
 
     #state["position_features"] = features
 
-    print("Position Feature Extractor : ", features)
     return PositionFeaturesOutput(position_features=features)
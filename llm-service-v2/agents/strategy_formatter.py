@@ -42,6 +42,4 @@ def strategy_formatter_tool(state: Dict) -> Dict:
     for point in bullet_points:
         formatted += f"\n{point}"
 
-    state["formatted_strategy"] = formatted.strip()
-    print("State After Strategy Formatter - ", state)
-    return {"state": state}
+    return {"state": {"formatted_strategy": formatted.strip()}}
@@ -5,72 +5,110 @@ from langchain_core.runnables import Runnable
 from typing import Dict
 import json
 
+from agents.claim_checker import check_strategy_claims
+from deadlines import has_time_for_llm_call, skip_step
+from instrumentation import debug, record_verifier_outcome
+from prompt_budget import encode_position_features, fit_prompt_to_budget
+
+# Static instructions first, per-request data last (see agents/idea_synthesizer.py) so the
+# provider can cache the shared prefix
+CRITIQUE_PROMPT = ChatPromptTemplate.from_messages([
+    ("system",
+     "You are a strict chess expert and a verifier. Given a strategy, identify if it aligns with the position.\n"
+     "Check the strategy for hallucinations or contradictions.\n"
+     "Return JSON:\n"
+     "- verdict: 'valid' or 'needs_correction'\n"
+     "- issues: list of detected problems"),
+    ("user",
+     "FEN: {fen}\n"
+     "Side to play: {side}\n"
+     "Position Features:\n{position}\n"
+     "Structure Insights:\n{structure}\n"
+     "Moves:\n{moves}\n\n"
+     "Strategy to verify:\n{strategy}")
+])
+
+CORRECTION_PROMPT = ChatPromptTemplate.from_messages([
+    ("system",
+     "You are a chess strategist. Rewrite the plan to fix the listed issues.\n"
+     "Please correct the strategy so it aligns with the FEN and structure insights.\n"
+     "New output should ONLY be a corrected strategy with goal + bullet points."),
+    ("user",
+     "Original Strategy:\n{strategy}\n\n"
+     "Issues:\n{issues}")
+])
+
 @tool
 def strategy_verifier_tool(state: Dict, llm: BaseChatModel, verifier_llm: BaseChatModel) -> Dict:
     """
     Verifies and optionally corrects hallucinated or invalid strategies.
+    Mechanically checkable claims are validated against the board first; the LLM critique
+    only runs when that check is inconclusive.
     If strategy is invalid, asks the LLM to rewrite it based on position and structure.
+    LLM steps that no longer fit the request deadline are skipped and listed in `skipped_steps`.
+    Returns only the state keys it changed.
     """
+    original, state = state, dict(state)
 
-    print("Inside Strategy Verifier")
     strategy = state.get("synthesized_ideas", "")
     position = state.get("position_features", {})
     structure = state.get("structure_insights", [])
     fen = state.get("fen", "")
     side = state.get("side", "")
     moves = state.get("moves", "")
+    moves_uci = [ply.uci for ply in structure]
 
     if not strategy:
         raise ValueError("Missing synthesized strategy in state")
 
-    # First prompt: Ask LLM to critique the strategy
-    critique_prompt = ChatPromptTemplate.from_messages([
-        ("system", 
-         "You are a strict chess expert and a verifier. Given a strategy, identify if it aligns with the position."),
-        ("user", 
-         "FEN: {fen}\n"
-         "Side to play: {side}\n"
-         "Position Features:\n{position}\n"
-         "Structure Insights:\n{structure}\n"
-         "Moves:\n{moves}\n\n"
-         "Strategy to verify:\n{strategy}\n\n"
-         "Check the strategy for hallucinations or contradictions.\n"
-         "Return JSON:\n"
-         "- verdict: 'valid' or 'needs_correction'\n"
-         "- issues: list of detected problems"
-        )
-    ])
-    critique_chain: Runnable = critique_prompt | verifier_llm
-    critique_response = critique_chain.invoke({
-        "fen": fen,
-        "side": side,
-        "position": position,
-        "structure": structure,
-        "moves": moves,
-        "strategy": strategy
-    })
-
-    state["strategy_verification"] = critique_response.content.strip()
-
-    # Try parsing the response
-    try:
-        feedback = json.loads(critique_response.content)
-    except json.JSONDecodeError:
-        feedback = {"verdict": "needs_correction", "issues": ["Invalid JSON from LLM"]}
-
-    print("Feedback - ", feedback)
+    # Rule-based pre-verification: skip the critique call when the claims can be checked on the board
+    claim_check = check_strategy_claims(strategy, fen, position, moves_uci, side)
+    debug(f"Claim check - {claim_check}")
+
+    if claim_check["verdict"] != "inconclusive":
+        feedback = {"verdict": claim_check["verdict"], "issues": claim_check["issues"]}
+        state["strategy_verification"] = json.dumps(feedback)
+        state["verifier_outcome"] = "rule_valid" if feedback["verdict"] == "valid" else "rule_corrected"
+    elif not has_time_for_llm_call(state, "verifier"):
+        # No budget left for the critique: keep the synthesized ideas unverified
+        feedback = {"verdict": "unverified", "issues": []}
+        state["strategy_verification"] = json.dumps(feedback)
+        state["verifier_outcome"] = "skipped_critique"
+        skip_step(state, "verifier_critique")
+    else:
+        # First prompt: Ask LLM to critique the strategy
+        # JSON output mode so the reply always parses
+        critique_chain: Runnable = CRITIQUE_PROMPT | verifier_llm.bind(response_format={"type": "json_object"})
+        inputs = fit_prompt_to_budget(CRITIQUE_PROMPT, {
+            "fen": fen,
+            "side": side,
+            "position": encode_position_features(position),
+            "moves": moves,
+            "strategy": strategy
+        }, structure, node="verifier", truncatable=("structure", "moves"))
+        critique_response = critique_chain.invoke(inputs)
+
+        state["strategy_verification"] = critique_response.content.strip()
+
+        # Try parsing the response; an unreadable critique is not a reason to rewrite the strategy
+        try:
+            feedback = json.loads(critique_response.content)
+        except json.JSONDecodeError:
+            feedback = {"verdict": "valid", "issues": ["Invalid JSON from verifier LLM"]}
+
+        state["verifier_outcome"] = "llm_corrected" if feedback.get("verdict") == "needs_correction" else "llm_valid"
+
+    debug(f"Feedback - {feedback}")
+    record_verifier_outcome(state["verifier_outcome"])
+
+    if feedback.get("verdict") == "needs_correction" and not has_time_for_llm_call(state, "verifier"):
+        skip_step(state, "correction")
+        state["strategy_verification"] += "\n\n[Correction skipped: deadline]"
+        return {"state": _changes(original, state)}
+
     # If correction is needed, do it
     if feedback.get("verdict") == "needs_correction":
-        correction_prompt = ChatPromptTemplate.from_messages([
-            ("system", 
-             "You are a chess strategist. Rewrite the plan to fix the listed issues."),
-            ("user",
-             "Original Strategy:\n{strategy}\n\n"
-             "Issues:\n{issues}\n\n"
-             "Please correct the strategy so it aligns with the FEN and structure insights.\n"
-             "New output should ONLY be a corrected strategy with goal + bullet points.")
-        ])
-        correction_chain: Runnable = correction_prompt | llm
+        correction_chain: Runnable = CORRECTION_PROMPT | llm
         corrected = correction_chain.invoke({
             "strategy": strategy,
             "issues": "\n".join(feedback.get("issues", []))
@@ -80,4 +118,8 @@ def strategy_verifier_tool(state: Dict, llm: BaseChatModel, verifier_llm: BaseCh
         state["synthesized_ideas"] = corrected.content.strip()
         state["strategy_verification"] += "\n\n[Auto-corrected ✅]"
 
-    return {"state": state}
+    return {"state": _changes(original, state)}
+
+
+def _changes(original: Dict, state: Dict) -> Dict:
+    return {key: value for key, value in state.items() if original.get(key) is not value}
@@ -1,32 +1,94 @@
-from openai import OpenAI
+from typing import AsyncIterator, List
+from llm_clients import get_llm, model_identity
+from instrumentation import debug, record_cache_lookup
+from prompt_budget import count_tokens, truncate_to_tokens
+from single_flight import SingleFlight, aggregate_key
+import asyncio
 import os
-from dotenv import load_dotenv
-from typing import List
 
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Token budget for the summaries packed into a single aggregation call
+AGGREGATION_CHUNK_TOKENS = int(os.getenv("AGGREGATION_CHUNK_TOKENS", "3000"))
+
+# Identical concurrent aggregations (and reduce rounds) share one computation
+aggregate_flight = SingleFlight("aggregate_single_flight", on_lookup=record_cache_lookup)
+
+AGGREGATION_INSTRUCTIONS = (
+    "You are a chess analyst trained to extract common plans across games.\n"
+    "You are given summaries of strategies from multiple games. Your task is to synthesize a **tactical roadmap** "
+    "that captures the most common and actionable ideas shared across games.\n\n"
+    "Output:\n"
+    "- A short 2–3 line high-level goal\n"
+    "- 4–6 bullet points capturing recurring patterns: key maneuvers, typical threats, pawn breaks, open file "
+    "strategies, piece coordination plans\n"
+    "- Do **not** repeat full sentences from the input. Consolidate and abstract over them."
+)
 
-async def aggregate_strategies(summaries: List[str]) -> str:
-    joined = "\n".join(summaries)
-    prompt = f"""
-    Below are summaries of strategies from multiple games. Your task is to synthesize a **tactical roadmap** that captures the most common and actionable ideas shared across games.
 
-    Summaries:
-    {joined}
+def _aggregation_messages(summaries: List[str]) -> list:
+    # The instructions are a constant system message ahead of the summaries so every
+    # aggregation call shares a cacheable prompt prefix
+    return [
+        ("system", AGGREGATION_INSTRUCTIONS),
+        ("user", "Summaries:\n" + "\n".join(summaries))
+    ]
 
-    Output:
-    - A short 2–3 line high-level goal
-    - 4–6 bullet points capturing recurring patterns: key maneuvers, typical threats, pawn breaks, open file strategies, piece coordination plans
-    - Do **not** repeat full sentences from the input. Consolidate and abstract over them.
+
+def chunk_summaries(summaries: List[str], budget: int = AGGREGATION_CHUNK_TOKENS) -> List[List[str]]:
+    """
+    Greedily packs summaries into chunks of at most `budget` tokens. Each summary is capped
+    at half the budget so every chunk holds at least two of them and each reduce round
+    at least halves the number of summaries.
+    """
+    chunks, current, current_tokens = [], [], 0
+    for summary in summaries:
+        summary = truncate_to_tokens(summary, budget // 2)
+        tokens = count_tokens(summary)
+        if current and current_tokens + tokens > budget:
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(summary)
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+async def _reduce_until_single_chunk(summaries: List[str]) -> List[str]:
+    """
+    Map-reduce step: while the summaries do not fit one aggregation call, every chunk is reduced
+    to a partial roadmap in parallel and the partial roadmaps are fed into the next round.
     """
+    chunks = chunk_summaries(summaries)
+    level = 0
+    while len(chunks) > 1:
+        level += 1
+        debug(f"Aggregation level {level}: reducing {sum(len(chunk) for chunk in chunks)} summaries in {len(chunks)} chunks")
+        responses = await asyncio.gather(*(get_llm().ainvoke(_aggregation_messages(chunk)) for chunk in chunks))
+        chunks = chunk_summaries([response.content.strip() for response in responses])
+    return chunks[0] if chunks else []
 
-    response = client.chat.completions.create(
-        model=os.getenv("OPENAI_MODEL"),
-        messages=[
-            {"role": "system", "content": "You are a chess analyst trained to extract common plans across games."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.5
-    )
 
-    return response.choices[0].message.content.strip()
\ No newline at end of file
+async def _aggregate(summaries: List[str]) -> str:
+    summaries = await _reduce(summaries)
+    response = await get_llm().ainvoke(_aggregation_messages(summaries))
+    return response.content.strip()
+
+
+def _reduce(summaries: List[str]):
+    return aggregate_flight.do(aggregate_key(["reduce", *summaries], model_identity()),
+                               lambda: _reduce_until_single_chunk(summaries))
+
+
+async def aggregate_strategies(summaries: List[str]) -> str:
+    return await aggregate_flight.do(aggregate_key(summaries, model_identity()), lambda: _aggregate(summaries))
+
+
+async def stream_aggregate_strategies(summaries: List[str]) -> AsyncIterator[str]:
+    """
+    Same as aggregate_strategies, but yields the final roadmap's tokens as the model produces them.
+    Only the reduce rounds are shared with identical requests; every stream gets its own final call.
+    """
+    summaries = await _reduce(summaries)
+    async for chunk in get_llm().astream(_aggregation_messages(summaries)):
+        if chunk.content:
+            yield chunk.content
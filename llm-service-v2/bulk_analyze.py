@@ -0,0 +1,113 @@
+# Bulk strategy analysis of an NDJSON file of GameSummaryRequest records, resumable from its output file
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import AsyncIterator, Dict, Set, Tuple
+
+import dotenv
+
+dotenv.load_dotenv()
+
+
+def completed_indexes(output_path: str, retry_errors: bool) -> Set[int]:
+    """
+    Indexes already answered in the output (checkpoint) file. A line cut short by an
+    interruption is dropped from the file so appending continues on a clean line.
+    """
+    if not os.path.exists(output_path):
+        return set()
+    with open(output_path, "rb+") as file:
+        content = file.read()
+        if content and not content.endswith(b"\n"):
+            file.truncate(content.rfind(b"\n") + 1)
+            content = content[:content.rfind(b"\n") + 1]
+
+    done = set()
+    for line in content.splitlines():
+        try:
+            result = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if retry_errors and "error" in result:
+            done.discard(result.get("index"))
+        else:
+            done.add(result.get("index"))
+    return done
+
+
+async def pending_records(input_path: str, done: Set[int]) -> AsyncIterator[Tuple[int, Dict]]:
+    with open(input_path, "r", encoding="utf-8") as file:
+        for index, line in enumerate(file):
+            if index in done or not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                record = {"invalid": str(e)}
+            yield index, record
+
+
+async def analyze_in_process(records: AsyncIterator[Tuple[int, Dict]], concurrency: int) -> AsyncIterator[Dict]:
+    from llm_scheduler import BATCH, set_llm_priority
+    from strategy_generator import stream_bulk_summaries
+
+    set_llm_priority(BATCH)
+    async for result in stream_bulk_summaries(records, concurrency):
+        yield result
+
+
+async def analyze_remote(records: AsyncIterator[Tuple[int, Dict]], concurrency: int, url: str) -> AsyncIterator[Dict]:
+    import httpx
+
+    async def body():
+        async for index, record in records:
+            yield (json.dumps({**record, "index": index}) + "\n").encode("utf-8")
+
+    async with httpx.AsyncClient(timeout=None) as client:
+        async with client.stream("POST", f"{url.rstrip('/')}/analyze-bulk", params={"concurrency": concurrency},
+                                 content=body(), headers={"Content-Type": "application/x-ndjson"}) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.strip():
+                    yield json.loads(line)
+
+
+async def main(args):
+    done = completed_indexes(args.output, args.retry_errors)
+    print(f"Resuming past {len(done)} completed records" if done else "Starting fresh")
+
+    records = pending_records(args.input, done)
+    if args.url:
+        results = analyze_remote(records, args.concurrency, args.url)
+    else:
+        results = analyze_in_process(records, args.concurrency)
+
+    start = time.perf_counter()
+    count = errors = 0
+    # Results are appended and flushed one by one: the output file is the checkpoint.
+    # After --retry-errors, a later line for an index supersedes an earlier error line.
+    with open(args.output, "a", encoding="utf-8") as output:
+        async for result in results:
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+            count += 1
+            errors += "error" in result
+            if count % 50 == 0:
+                print(f"{count} done ({errors} errors), {count / (time.perf_counter() - start):.2f} records/s")
+    print(f"Finished {count} records ({errors} errors) in {time.perf_counter() - start:.1f}s -> {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyze an NDJSON file of GameSummaryRequest records")
+    parser.add_argument("--input", type=str, required=True, help="NDJSON with one GameSummaryRequest per line")
+    parser.add_argument("--output", type=str, required=True,
+                        help="NDJSON results tagged with the input line index; also the resume checkpoint")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("BULK_CONCURRENCY", "4")),
+                        help="Graph runs in flight")
+    parser.add_argument("--url", type=str, default=None,
+                        help="Send to a running service's /analyze-bulk instead of running the graph in-process")
+    parser.add_argument("--retry-errors", action="store_true", help="Re-run records whose previous result was an error")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,48 @@
+import math
+import os
+import time
+from typing import Dict, Optional
+
+from instrumentation import recent_llm_seconds, record_skipped_step
+
+# Assumed duration of an LLM call until the service has measured real ones
+DEFAULT_LLM_CALL_SECONDS = float(os.getenv("DEADLINE_LLM_CALL_SECONDS", "4.0"))
+# Extra headroom on top of the expected call duration
+DEADLINE_SAFETY_FACTOR = float(os.getenv("DEADLINE_SAFETY_FACTOR", "1.2"))
+
+
+def deadline_from_ms(deadline_ms: Optional[int], default_env: str) -> Optional[float]:
+    """
+    Absolute deadline (time.monotonic) for a request: the caller's deadlineMs if given,
+    otherwise the endpoint default from `default_env`, otherwise none.
+    """
+    if deadline_ms is None:
+        configured = os.getenv(default_env)
+        deadline_ms = int(configured) if configured else None
+    if deadline_ms is None:
+        return None
+    return time.monotonic() + deadline_ms / 1000.0
+
+
+def remaining_seconds(state: Dict) -> float:
+    deadline = state.get("deadline")
+    if deadline is None:
+        return math.inf
+    return deadline - time.monotonic()
+
+
+def has_time_for_llm_call(state: Dict, node: str) -> bool:
+    """
+    True when the remaining budget covers a typical LLM call made from `node`.
+    """
+    expected = recent_llm_seconds(node) or DEFAULT_LLM_CALL_SECONDS
+    return remaining_seconds(state) >= expected * DEADLINE_SAFETY_FACTOR
+
+
+def skip_step(state: Dict, step: str) -> Dict:
+    """
+    Records in the state (and metrics) that `step` was skipped to meet the deadline.
+    """
+    state["skipped_steps"] = [*state.get("skipped_steps", []), step]
+    record_skipped_step(step)
+    return state
@@ -0,0 +1,171 @@
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+DEFAULT_STRATEGY = (
+    "Strategic Goal\n"
+    "Improve the worst-placed piece and prepare a pawn break on the side where you have more space.\n"
+    "- Reroute the knight towards the weakened squares around the enemy king\n"
+    "- Double rooks behind the pawn break before opening the position\n"
+    "- Trade the opponent's active bishop to reduce counterplay\n"
+    "- Keep the king sheltered until the centre is resolved"
+)
+DEFAULT_VERDICT = {"verdict": "valid", "issues": []}
+
+
+class FakeLLMError(Exception):
+    """
+    Injected provider error. Carries a status_code so the LLM scheduler treats it
+    like the corresponding OpenAI error (429 and 5xx are retried).
+    """
+
+    def __init__(self, status_code: int):
+        super().__init__(f"Injected fake LLM error ({status_code})")
+        self.status_code = status_code
+
+
+class FakeChessChatModel(BaseChatModel):
+    """
+    Offline stand-in for ChatOpenAI used for benchmarking the strategy graph.
+    Replies are canned (a strategy, or in JSON output mode a verdict or batched roadmaps),
+    latency is drawn from a configurable distribution, streaming emits words at a fixed
+    token rate, and a fraction of calls can fail with 429/503. All randomness comes from
+    a seeded generator so runs are reproducible for a given call order.
+    """
+    strategy: str = DEFAULT_STRATEGY
+    verdict: Dict = DEFAULT_VERDICT
+    # "fixed", "uniform" (0..2x mean) or "lognormal" (mean with sigma `latency_sigma`)
+    latency_distribution: str = "lognormal"
+    latency_ms: float = 800.0
+    latency_sigma: float = 0.5
+    tokens_per_second: float = 60.0
+    error_rate: float = 0.0
+    rate_limit_share: float = 0.5
+    seed: int = 0
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def model_post_init(self, __context: Any):
+        self._rng = random.Random(self.seed)
+        self._rng_lock = threading.Lock()
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chess"
+
+    # Behaviour
+
+    def _latency(self) -> float:
+        mean = self.latency_ms / 1000.0
+        with self._rng_lock:
+            if self.latency_distribution == "fixed":
+                return mean
+            if self.latency_distribution == "uniform":
+                return self._rng.uniform(0.0, 2 * mean)
+            # Lognormal parametrised so that its mean equals latency_ms
+            mu = math.log(mean) - self.latency_sigma ** 2 / 2 if mean > 0 else 0.0
+            return self._rng.lognormvariate(mu, self.latency_sigma) if mean > 0 else 0.0
+
+    def _maybe_fail(self):
+        with self._rng_lock:
+            if self._rng.random() >= self.error_rate:
+                return
+            status = 429 if self._rng.random() < self.rate_limit_share else 503
+        raise FakeLLMError(status)
+
+    def _reply(self, messages: List[BaseMessage], kwargs: Dict) -> str:
+        json_mode = (kwargs.get("response_format") or {}).get("type") == "json_object"
+        if not json_mode:
+            return self.strategy
+        prompt = str(messages[-1].content) if messages else ""
+        if any('"games"' in str(message.content) for message in messages):
+            # Batched synthesis: one roadmap per "GAME n - " block
+            games = len(re.findall(r"^GAME \d+ - ", prompt, re.MULTILINE))
+            return json.dumps({"games": [{"game": n, "strategy": self.strategy} for n in range(1, games + 1)]})
+        return json.dumps(self.verdict)
+
+    @staticmethod
+    def _usage(messages: List[BaseMessage], content: str) -> Dict:
+        prompt_tokens = sum(len(str(message.content)) for message in messages) // 4
+        completion_tokens = len(content) // 4
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    def _result(self, messages: List[BaseMessage], content: str) -> ChatResult:
+        usage = self._usage(messages, content)
+        message = AIMessage(content=content, usage_metadata={
+            "input_tokens": usage["prompt_tokens"],
+            "output_tokens": usage["completion_tokens"],
+            "total_tokens": usage["total_tokens"],
+        })
+        return ChatResult(generations=[ChatGeneration(message=message)],
+                          llm_output={"token_usage": usage, "model_name": self._llm_type})
+
+    def _words(self, content: str) -> List[str]:
+        words = content.split(" ")
+        return [word + " " for word in words[:-1]] + words[-1:]
+
+    # BaseChatModel interface
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self._latency())
+        self._maybe_fail()
+        return self._result(messages, self._reply(messages, kwargs))
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self._latency())
+        self._maybe_fail()
+        return self._result(messages, self._reply(messages, kwargs))
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        # The latency models time to first token; the rest arrives at tokens_per_second
+        time.sleep(self._latency())
+        self._maybe_fail()
+        for word in self._words(self._reply(messages, kwargs)):
+            time.sleep(max(1, len(word) // 4) / self.tokens_per_second)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word))
+            if run_manager:
+                run_manager.on_llm_new_token(word, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self._latency())
+        self._maybe_fail()
+        for word in self._words(self._reply(messages, kwargs)):
+            await asyncio.sleep(max(1, len(word) // 4) / self.tokens_per_second)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word))
+            if run_manager:
+                await run_manager.on_llm_new_token(word, chunk=chunk)
+            yield chunk
+
+
+def fake_chat_model_from_env(seed_offset: int = 0) -> FakeChessChatModel:
+    """
+    Builds the fake model from FAKE_LLM_* environment variables.
+    """
+    return FakeChessChatModel(
+        latency_distribution=os.getenv("FAKE_LLM_LATENCY_DISTRIBUTION", "lognormal"),
+        latency_ms=float(os.getenv("FAKE_LLM_LATENCY_MS", "800")),
+        latency_sigma=float(os.getenv("FAKE_LLM_LATENCY_SIGMA", "0.5")),
+        tokens_per_second=float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "60")),
+        error_rate=float(os.getenv("FAKE_LLM_ERROR_RATE", "0")),
+        seed=int(os.getenv("FAKE_LLM_SEED", "0")) + seed_offset,
+    )
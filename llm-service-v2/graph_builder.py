@@ -4,88 +4,68 @@ from langchain_core.runnables import Runnable
 from langchain_core.language_models import BaseChatModel
 
 from agents.fen_validator import fen_validator_tool
-from agents.move_simulator import move_simulator_tool
-from agents.structure_extractor import structure_extractor_tool
+from agents.move_analyzer import PlyRecord, move_analyzer_tool
 from agents.position_feature_extractor import position_feature_extractor_tool
 from agents.idea_synthesizer import idea_synthesizer_tool
 from agents.strategy_formatter import strategy_formatter_tool
 from agents.verifier import strategy_verifier_tool 
+from deadlines import has_time_for_llm_call, skip_step
+from instrumentation import record_verifier_outcome, timed_node
 
-def build_chess_strategy_graph(llm: BaseChatModel, verifier_llm: BaseChatModel) -> Runnable:
+def build_chess_strategy_graph(llm: BaseChatModel = None, verifier_llm: BaseChatModel = None,
+                               analysis_only: bool = False) -> Runnable:
+    """
+    Builds the strategy graph. With analysis_only the graph stops after the board analysis
+    (no LLM calls), which is what batched synthesis needs for all games up front.
+    The full graph resumes mid-way for states that already carry the analysis or the ideas.
+    Nodes return only the keys they change; LangGraph merges them into the state.
+    """
     # Define the state with typed information using TypedDict
     class GraphState(TypedDict, total=False):
         """State for the chess strategy graph."""
-        structure_output: dict
-        feature_output: dict
         fen: str
         moves: str
         side: str
-        move_analysis: List[Any]
-        structure_insights: dict
+        structure_insights: List[PlyRecord]
         position_features: dict
         synthesized_ideas: str
         formatted_strategy: str
         strategy_verification: str
         synthesized_ideas_corrected: str
+        verifier_outcome: str
+        deadline: float
+        skipped_steps: List[str]
     
     # Initialize the state graph
     graph = StateGraph(GraphState)
     
-    # Define wrapper functions for each tool to handle the state formatting correctly
+    # Define wrapper functions for each tool; tools return their updates under "state"
     def run_fen_validator(input_state):
-        print(input_state)
-        tool_input = {"state": input_state}
-        result = fen_validator_tool.invoke(tool_input)
-        return {**input_state, **result.get("state", {})}
+        result = fen_validator_tool.invoke({"state": {"fen": input_state.get("fen")}})
+        return {key: value for key, value in result.get("state", {}).items() if key == "side"}
     
-    def run_move_simulator(input_state):
-        tool_input = {"state": input_state}
-        result = move_simulator_tool.invoke(tool_input)
-        return {**input_state, **result.get("state", {})}
-    
-    # Use a different approach for parallel nodes to avoid state conflicts
-    
-    # First parallel branch only returns structure_output
-    def run_structure_extractor(input_state):
-        # Create a copy of only the necessary state for this tool
+    # Replays the continuation once: per-ply records with all structural flags
+    def run_move_analyzer(input_state):
         tool_state = {
-            "move_analysis": input_state.get("move_analysis", ""),
+            "fen": input_state.get("fen"),
+            "moves": input_state.get("moves"),
         }
-        tool_input = {"state": tool_state}
-        result = structure_extractor_tool.invoke(tool_input)
-        # Only return the specific key we're updating
-        return {"structure_output": result.structure_insights}
+        result = move_analyzer_tool.invoke({"state": tool_state})
+        return result.get("state", {})
     
-    # Second parallel branch only returns feature_output
+    # Runs in parallel with the move analyzer and only writes position_features
     def run_position_feature_extractor(input_state):
-        # Create a copy of only the necessary state for this tool
         tool_state = {
             "fen": input_state.get("fen", ""),
         }
         tool_input = {"state": tool_state}
         result = position_feature_extractor_tool.invoke(tool_input)
-        # Only return the specific key we're updating
-        return {"feature_output": result.position_features}
-    
-    # Join node that combines results from both parallel paths
-    def join_results(state):
-        # Combine the parallel results with the original state
-        structure_output = state.get("structure_output", {})
-        feature_output = state.get("feature_output", {})
-        
-        # Create a new state with the combined results
-        return {
-            **state,
-            "structure_insights": structure_output,
-            "position_features": feature_output
-        }
+        return {"position_features": result.position_features}
     
     # Add the wrapped nodes
-    graph.add_node("fen_validator", run_fen_validator)
-    graph.add_node("move_simulator", run_move_simulator)
-    graph.add_node("structure_extractor", run_structure_extractor)
-    graph.add_node("position_feature_extractor", run_position_feature_extractor)
-    graph.add_node("join", join_results)
+    graph.add_node("fen_validator", timed_node("fen_validator", run_fen_validator))
+    graph.add_node("move_analyzer", timed_node("move_analyzer", run_move_analyzer))
+    graph.add_node("position_feature_extractor", timed_node("position_feature_extractor", run_position_feature_extractor))
     
     # Wrap the idea synthesizer to handle state format
     def run_idea_synthesizer(input_state):
@@ -94,9 +74,9 @@ def build_chess_strategy_graph(llm: BaseChatModel, verifier_llm: BaseChatModel)
             "llm": llm
         }
         result = idea_synthesizer_tool.invoke(tool_input)
-        return {**input_state, **result.get("state", {})}
+        return result.get("state", {})
     
-    graph.add_node("idea_synthesizer", run_idea_synthesizer)
+    graph.add_node("idea_synthesizer", timed_node("idea_synthesizer", run_idea_synthesizer))
 
     def run_verifier(input_state):
         tool_input = {
@@ -105,33 +85,55 @@ def build_chess_strategy_graph(llm: BaseChatModel, verifier_llm: BaseChatModel)
             "verifier_llm":verifier_llm
         }
         result = strategy_verifier_tool.invoke(tool_input)
-        return {**input_state, **result.get("state", {})}
+        return result.get("state", {})
+
+    graph.add_node("verifier", timed_node("verifier", run_verifier))
 
-    graph.add_node("verifier", run_verifier)
+    # Taken instead of the verifier when the deadline leaves no room for its LLM calls
+    def skip_verifier(input_state):
+        updates = skip_step({"skipped_steps": input_state.get("skipped_steps", [])}, "verifier")
+        updates["verifier_outcome"] = "skipped_deadline"
+        record_verifier_outcome("skipped_deadline")
+        return updates
+
+    graph.add_node("skip_verifier", timed_node("skip_verifier", skip_verifier))
+
+    def route_after_synthesis(state):
+        return "verifier" if has_time_for_llm_call(state, "verifier") else "skip_verifier"
+
+    def route_entry(state):
+        if state.get("synthesized_ideas"):
+            return route_after_synthesis(state)
+        if state.get("structure_insights"):
+            return "idea_synthesizer"
+        return "fen_validator"
     
     # Wrap the strategy formatter
     def run_strategy_formatter(input_state):
         result = strategy_formatter_tool.invoke({"state": input_state})
-        return {**input_state, **result.get("state", {})}
+        return result.get("state", {})
     
-    graph.add_node("strategy_formatter", run_strategy_formatter)
+    graph.add_node("strategy_formatter", timed_node("strategy_formatter", run_strategy_formatter))
     
     # Set up the graph edges
-    graph.set_entry_point("fen_validator")
-    graph.add_edge("fen_validator", "move_simulator")
-    
-    # Connect to parallel nodes
-    graph.add_edge("move_simulator", "structure_extractor")
-    graph.add_edge("move_simulator", "position_feature_extractor")
-    
-    # Join the parallel branches properly
-    graph.add_edge("structure_extractor", "join")
-    graph.add_edge("position_feature_extractor", "join")
+    if analysis_only:
+        graph.set_entry_point("fen_validator")
+    else:
+        graph.set_conditional_entry_point(route_entry, ["fen_validator", "idea_synthesizer", "verifier", "skip_verifier"])
+    
+    # Board analysis: move replay and position features in parallel
+    graph.add_edge("fen_validator", "move_analyzer")
+    graph.add_edge("fen_validator", "position_feature_extractor")
+
+    if analysis_only:
+        graph.add_edge(["move_analyzer", "position_feature_extractor"], END)
+        return graph.compile()
     
-    # Connect the rest of the graph
-    graph.add_edge("join", "idea_synthesizer")
-    graph.add_edge("idea_synthesizer", "verifier")
+    # Connect the rest of the graph once both analysis branches are done
+    graph.add_edge(["move_analyzer", "position_feature_extractor"], "idea_synthesizer")
+    graph.add_conditional_edges("idea_synthesizer", route_after_synthesis, ["verifier", "skip_verifier"])
     graph.add_edge("verifier", "strategy_formatter")
+    graph.add_edge("skip_verifier", "strategy_formatter")
     graph.add_edge("strategy_formatter", END)
     
-    return graph.compile()
\ No newline at end of file
+    return graph.compile()
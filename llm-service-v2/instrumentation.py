@@ -0,0 +1,279 @@
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# PIPELINE_DEBUG=1 dumps the full graph state after every node (expensive, for local debugging only)
+PIPELINE_DEBUG = os.getenv("PIPELINE_DEBUG", "0") == "1"
+# OTEL_TRACING=1 emits an OpenTelemetry span per graph node (requires opentelemetry-api)
+OTEL_TRACING = os.getenv("OTEL_TRACING", "0") == "1"
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Recent samples per node kept for percentile reports
+RECENT_SAMPLES = 10000
+
+# Graph node currently executing, used to attribute LLM token usage
+current_node: ContextVar[str] = ContextVar("current_node", default="aggregate")
+
+_lock = threading.Lock()
+_node_bucket_counts = defaultdict(lambda: [0] * (len(DURATION_BUCKETS) + 1))
+_node_duration_sum = defaultdict(float)
+_node_errors = Counter()
+_node_recent = defaultdict(lambda: deque(maxlen=RECENT_SAMPLES))
+_llm_calls = Counter()
+_llm_tokens = Counter()  # (node, "prompt" | "completion" | "cached") -> tokens
+_llm_recent = defaultdict(lambda: deque(maxlen=RECENT_SAMPLES))  # node -> recent LLM call seconds
+_prompt_tokens = Counter()  # node -> budgeted prompt tokens
+_prompts = Counter()  # (node, "within_budget" | "over_budget") -> prompts
+_cache_lookups = Counter()  # (cache, "hit" | "miss") -> count
+_skipped_steps = Counter()
+verifier_outcomes = Counter()
+
+
+def _tracer():
+    if not OTEL_TRACING:
+        return None
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        print("OTEL_TRACING is set but opentelemetry-api is not installed - spans disabled")
+        return None
+    return trace.get_tracer("llm-service-v2")
+
+
+_otel_tracer = _tracer()
+
+
+def debug(message: str):
+    if PIPELINE_DEBUG:
+        print(message)
+
+
+# Recording
+
+def record_node_duration(node: str, seconds: float, failed: bool = False):
+    with _lock:
+        counts = _node_bucket_counts[node]
+        for index, bound in enumerate(DURATION_BUCKETS):
+            if seconds <= bound:
+                counts[index] += 1
+                break
+        else:
+            counts[-1] += 1
+        _node_duration_sum[node] += seconds
+        _node_recent[node].append(seconds)
+        if failed:
+            _node_errors[node] += 1
+
+
+def record_llm_usage(prompt_tokens: int, completion_tokens: int, node: str = None, seconds: float = None,
+                     cached_tokens: int = 0):
+    """
+    `cached_tokens` is the part of `prompt_tokens` the provider served from its prompt cache.
+    """
+    node = node or current_node.get()
+    with _lock:
+        _llm_calls[node] += 1
+        _llm_tokens[(node, "prompt")] += prompt_tokens
+        _llm_tokens[(node, "completion")] += completion_tokens
+        _llm_tokens[(node, "cached")] += cached_tokens
+        if seconds is not None:
+            _llm_recent[node].append(seconds)
+
+
+def record_prompt_tokens(node: str, tokens: int, budget: int):
+    """
+    Estimated input tokens of a prompt fitted to `budget` (prompt_budget.fit_prompt_to_budget).
+    """
+    with _lock:
+        _prompt_tokens[node] += tokens
+        _prompts[(node, "within_budget" if tokens <= budget else "over_budget")] += 1
+
+
+def recent_llm_seconds(node: str) -> Optional[float]:
+    """
+    Median duration of recent LLM calls made from `node` (any node if it has none yet),
+    or None before the first call.
+    """
+    with _lock:
+        samples = list(_llm_recent.get(node) or [value for values in _llm_recent.values() for value in values])
+    if not samples:
+        return None
+    return sorted(samples)[len(samples) // 2]
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    with _lock:
+        _cache_lookups[(cache, "hit" if hit else "miss")] += 1
+
+
+def record_verifier_outcome(outcome: str):
+    with _lock:
+        verifier_outcomes[outcome] += 1
+
+
+def record_skipped_step(step: str):
+    with _lock:
+        _skipped_steps[step] += 1
+
+
+@contextmanager
+def node_span(node: str) -> Iterator[None]:
+    """
+    Times one node execution, attributes LLM usage inside it to the node and,
+    when tracing is enabled, wraps it in a span.
+    """
+    token = current_node.set(node)
+    span = _otel_tracer.start_as_current_span(f"node.{node}") if _otel_tracer else None
+    if span:
+        span.__enter__()
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        record_node_duration(node, time.perf_counter() - start, failed)
+        if span:
+            span.__exit__(None, None, None)
+        current_node.reset(token)
+
+
+def timed_node(name: str, node: Callable) -> Callable:
+    """
+    Wraps a graph node with node_span and, under PIPELINE_DEBUG, dumps the state it returns.
+    """
+    def run(state):
+        with node_span(name):
+            result = node(state)
+        if PIPELINE_DEBUG:
+            print(f"[state] after {name}: {json.dumps(result, default=str)}")
+        return result
+    return run
+
+
+# Reporting
+
+def node_timing_report() -> Dict[str, Dict]:
+    """
+    Summarizes recent node wall times: calls, total, mean and p95 in milliseconds.
+    """
+    with _lock:
+        timings = {name: sorted(values) for name, values in _node_recent.items()}
+    report = {}
+    for name, values in timings.items():
+        report[name] = {
+            "calls": len(values),
+            "total_ms": round(sum(values) * 1000, 1),
+            "mean_ms": round(sum(values) / len(values) * 1000, 1),
+            "p95_ms": round(values[min(len(values) - 1, int(len(values) * 0.95))] * 1000, 1),
+        }
+    return report
+
+
+def reset_node_timings():
+    with _lock:
+        _node_recent.clear()
+
+
+def reset_node_metrics():
+    """
+    Forgets every node measurement, including the Prometheus histograms, error counts and
+    prompt token counts.
+    Only meant for before the service takes traffic (e.g. after the warm-up dry run).
+    """
+    with _lock:
+        _node_recent.clear()
+        _node_bucket_counts.clear()
+        _node_duration_sum.clear()
+        _node_errors.clear()
+        _prompt_tokens.clear()
+        _prompts.clear()
+
+
+def verifier_skip_report() -> Dict:
+    """
+    Returns how many verifications were decided without calling the verifier LLM.
+    """
+    with _lock:
+        outcomes = dict(verifier_outcomes)
+    total = sum(outcomes.values())
+    skipped = sum(count for outcome, count in outcomes.items() if not outcome.startswith("llm_"))
+    return {
+        "total": total,
+        "critique_skipped": skipped,
+        "skip_rate": skipped / total if total else 0.0,
+        "outcomes": outcomes,
+    }
+
+
+def _labels(**labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+
+def render_prometheus(extra_gauges: List[Tuple[str, Dict[str, str], float]] = ()) -> str:
+    """
+    Renders all metrics in the Prometheus text exposition format.
+    `extra_gauges` are (name, labels, value) samples for gauges owned by other modules.
+    """
+    lines = []
+    with _lock:
+        lines += ["# HELP strategy_node_duration_seconds Wall time of strategy graph nodes.",
+                  "# TYPE strategy_node_duration_seconds histogram"]
+        for node, counts in sorted(_node_bucket_counts.items()):
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS, counts):
+                cumulative += count
+                lines.append(f"strategy_node_duration_seconds_bucket{_labels(node=node, le=bound)} {cumulative}")
+            cumulative += counts[-1]
+            lines.append(f"strategy_node_duration_seconds_bucket{_labels(node=node, le='+Inf')} {cumulative}")
+            lines.append(f"strategy_node_duration_seconds_sum{_labels(node=node)} {_node_duration_sum[node]:.6f}")
+            lines.append(f"strategy_node_duration_seconds_count{_labels(node=node)} {cumulative}")
+
+        lines += ["# HELP strategy_node_errors_total Node executions that raised.",
+                  "# TYPE strategy_node_errors_total counter"]
+        lines += [f"strategy_node_errors_total{_labels(node=node)} {count}" for node, count in sorted(_node_errors.items())]
+
+        lines += ["# HELP llm_calls_total LLM calls per graph node.", "# TYPE llm_calls_total counter"]
+        lines += [f"llm_calls_total{_labels(node=node)} {count}" for node, count in sorted(_llm_calls.items())]
+
+        lines += ["# HELP llm_tokens_total LLM tokens per graph node (cached: prompt tokens read from the provider's prompt cache).", "# TYPE llm_tokens_total counter"]
+        lines += [f"llm_tokens_total{_labels(node=node, kind=kind)} {count}"
+                  for (node, kind), count in sorted(_llm_tokens.items())]
+
+        lines += ["# HELP prompt_tokens_total Estimated input tokens of budgeted prompts per node.",
+                  "# TYPE prompt_tokens_total counter"]
+        lines += [f"prompt_tokens_total{_labels(node=node)} {count}" for node, count in sorted(_prompt_tokens.items())]
+
+        lines += ["# HELP prompts_total Budgeted prompts per node, by whether they fit the token budget.",
+                  "# TYPE prompts_total counter"]
+        lines += [f"prompts_total{_labels(node=node, result=result)} {count}"
+                  for (node, result), count in sorted(_prompts.items())]
+
+        lines += ["# HELP cache_lookups_total Cache lookups by cache and result.", "# TYPE cache_lookups_total counter"]
+        lines += [f"cache_lookups_total{_labels(cache=cache, result=result)} {count}"
+                  for (cache, result), count in sorted(_cache_lookups.items())]
+
+        lines += ["# HELP deadline_skipped_steps_total Graph steps skipped to meet a request deadline.",
+                  "# TYPE deadline_skipped_steps_total counter"]
+        lines += [f"deadline_skipped_steps_total{_labels(step=step)} {count}" for step, count in sorted(_skipped_steps.items())]
+
+        lines += ["# HELP verifier_outcomes_total Strategy verifier outcomes.", "# TYPE verifier_outcomes_total counter"]
+        lines += [f"verifier_outcomes_total{_labels(outcome=outcome)} {count}"
+                  for outcome, count in sorted(verifier_outcomes.items())]
+
+    declared = set()
+    for name, labels, value in extra_gauges:
+        if name not in declared:
+            lines.append(f"# TYPE {name} gauge")
+            declared.add(name)
+        lines.append(f"{name}{_labels(**labels)} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,136 @@
+import asyncio
+import os
+import time
+from functools import lru_cache
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+from instrumentation import record_llm_usage
+from llm_scheduler import LLMScheduler, estimate_tokens, get_scheduler
+
+# "openai" or "fake" (offline FakeChessChatModel for benchmarks, configured by FAKE_LLM_* variables)
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai")
+
+
+class ScheduledChatModel(BaseChatModel):
+    """
+    Wraps a chat model so every call is admitted by the shared LLMScheduler
+    (rate limits, priority classes, retries on 429/5xx).
+    """
+    inner: BaseChatModel
+    scheduler: LLMScheduler
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    @property
+    def _llm_type(self) -> str:
+        return f"scheduled-{self.inner._llm_type}"
+
+    @staticmethod
+    def _estimate(messages: List[BaseMessage]) -> int:
+        return estimate_tokens(str(message.content) for message in messages)
+
+    def _reconcile(self, estimated: int, result: ChatResult, seconds: float):
+        usage = (result.llm_output or {}).get("token_usage") or {}
+        self.scheduler.reconcile(estimated, usage.get("total_tokens", 0))
+        cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+        record_llm_usage(usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0), seconds=seconds,
+                         cached_tokens=cached)
+
+    def _record_chunk_usage(self, estimated: int, chunk: ChatGenerationChunk):
+        # Streamed responses report usage on their last chunk
+        usage = getattr(chunk.message, "usage_metadata", None)
+        if usage:
+            self.scheduler.reconcile(estimated, usage.get("total_tokens", 0))
+            cached = (usage.get("input_token_details") or {}).get("cache_read") or 0
+            record_llm_usage(usage.get("input_tokens", 0), usage.get("output_tokens", 0), cached_tokens=cached)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        estimated = self._estimate(messages)
+        start = time.perf_counter()
+        result = self.scheduler.call(lambda: self.inner._generate(messages, stop=stop, **kwargs), estimated)
+        self._reconcile(estimated, result, time.perf_counter() - start)
+        return result
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        estimated = self._estimate(messages)
+        start = time.perf_counter()
+        result = await self.scheduler.acall(lambda: self.inner._agenerate(messages, stop=stop, **kwargs), estimated)
+        self._reconcile(estimated, result, time.perf_counter() - start)
+        return result
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        estimated = self._estimate(messages)
+        for chunk in self.scheduler.stream(lambda: self.inner._stream(messages, stop=stop, **kwargs), estimated):
+            self._record_chunk_usage(estimated, chunk)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        estimated = self._estimate(messages)
+        async for chunk in self.scheduler.astream(lambda: self.inner._astream(messages, stop=stop, **kwargs), estimated):
+            self._record_chunk_usage(estimated, chunk)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+def _chat_model(model: str, seed_offset: int) -> BaseChatModel:
+    if LLM_PROVIDER == "fake":
+        from fake_chat_model import fake_chat_model_from_env
+        return fake_chat_model_from_env(seed_offset)
+    # Deferred: the openai client tree dominates import time and is not needed with the fake provider
+    from langchain_openai import ChatOpenAI
+    # Retries are owned by the scheduler
+    return ChatOpenAI(model=model, temperature=0.5, max_retries=0, stream_usage=True)
+
+
+@lru_cache(maxsize=None)
+def get_llm() -> BaseChatModel:
+    """
+    Chat model used for idea synthesis, corrections and aggregation.
+    """
+    return ScheduledChatModel(inner=_chat_model(os.getenv("OPENAI_MODEL"), 0), scheduler=get_scheduler())
+
+
+@lru_cache(maxsize=None)
+def get_verifier_llm() -> BaseChatModel:
+    """
+    Chat model used to critique synthesized strategies.
+    """
+    return ScheduledChatModel(inner=_chat_model(os.getenv("VERIFIER_OPENAI_MODEL"), 1), scheduler=get_scheduler())
+
+
+def model_identity() -> str:
+    """
+    Identifies the models behind get_llm/get_verifier_llm, for keying shared or cached results.
+    """
+    return f"{LLM_PROVIDER}:{os.getenv('OPENAI_MODEL')}:{os.getenv('VERIFIER_OPENAI_MODEL')}"
+
+
+async def open_connection_pools(connections: int) -> int:
+    """
+    Opens `connections` keep-alive HTTPS connections per client pool (async and sync, which
+    the graph's threaded nodes use) with cheap model lookups, so the first requests do not pay
+    for TLS setup. Returns the number of lookups made; errors are ignored since the response
+    status does not matter for pooling.
+    """
+    calls = []
+    for chat_model in {id(model): model for model in (get_llm(), get_verifier_llm())}.values():
+        inner = chat_model.inner
+        if not hasattr(inner, "root_async_client"):
+            continue
+        for _ in range(connections):
+            calls.append(inner.root_async_client.models.retrieve(inner.model_name))
+            calls.append(asyncio.to_thread(inner.root_client.models.retrieve, inner.model_name))
+    await asyncio.gather(*calls, return_exceptions=True)
+    return len(calls)
@@ -0,0 +1,302 @@
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator
+
+# Priority classes: lower value is served first
+INTERACTIVE = 0
+BATCH = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+# Priority of the LLM calls made while handling the current request
+current_priority: ContextVar[int] = ContextVar("llm_priority", default=INTERACTIVE)
+
+POLL_INTERVAL = 0.02
+
+
+def set_llm_priority(priority):
+    """
+    Sets the priority class for LLM calls made from the current request.
+    Accepts INTERACTIVE / BATCH or their names.
+    """
+    if isinstance(priority, str):
+        priority = {name: value for value, name in PRIORITY_NAMES.items()}.get(priority.lower(), INTERACTIVE)
+    current_priority.set(priority)
+
+
+def estimate_tokens(texts, expected_completion_tokens: int = None) -> int:
+    """
+    Cheap token estimate (~4 characters per token) for rate limiting purposes;
+    the scheduler reconciles it with the reported usage after the call.
+    """
+    if expected_completion_tokens is None:
+        expected_completion_tokens = int(os.getenv("LLM_EXPECTED_COMPLETION_TOKENS", "500"))
+    return sum(len(text) for text in texts) // 4 + expected_completion_tokens
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float, now: float):
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta: float):
+        # Positive delta gives tokens back, negative charges extra (may go below zero)
+        self.tokens = min(self.capacity, self.tokens + delta)
+
+
+def _is_retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError", "ConnectError", "ReadTimeout")
+
+
+def _retry_after(error: Exception):
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class LLMScheduler:
+    """
+    Admits LLM calls through request-per-minute and token-per-minute buckets.
+    Waiting calls are served strictly by priority class, then arrival order, so batch work
+    cannot starve interactive requests. Calls that fail with 429/5xx are retried with
+    jittered exponential backoff (streams only until their first chunk); a 429 also pauses
+    admission for its Retry-After period.
+    Safe to use from both threads (call / stream / acquire) and the event loop (acall / astream / acquire_async).
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float, max_retries: int = 5,
+                 base_backoff: float = 0.5, max_backoff: float = 30.0):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._lock = threading.Lock()
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._paused_until = 0.0
+
+        self._stats = {
+            name: {"admitted": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0, "max_queue_depth": 0}
+            for name in PRIORITY_NAMES.values()
+        }
+        self._retries = 0
+        self._rate_limited = 0
+        self._failures = 0
+
+    # Queueing
+
+    def _enqueue(self, priority: int):
+        ticket = (priority, next(self._sequence))
+        with self._lock:
+            heapq.heappush(self._waiters, ticket)
+            depth = sum(1 for waiter in self._waiters if waiter[0] == priority)
+            stats = self._stats[PRIORITY_NAMES[priority]]
+            stats["max_queue_depth"] = max(stats["max_queue_depth"], depth)
+        return ticket
+
+    def _dequeue(self, ticket):
+        with self._lock:
+            if ticket in self._waiters:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+
+    def _try_admit(self, ticket, estimated_tokens: int) -> float:
+        """
+        Returns 0 when the call was admitted, otherwise the number of seconds to wait before trying again.
+        """
+        with self._lock:
+            if self._waiters[0] != ticket:
+                return POLL_INTERVAL
+            now = time.monotonic()
+            wait = max(
+                self._paused_until - now,
+                self.requests.wait_time(1, now),
+                self.tokens.wait_time(estimated_tokens, now),
+            )
+            if wait > 0:
+                return wait
+            heapq.heappop(self._waiters)
+            self.requests.take(1, now)
+            self.tokens.take(estimated_tokens, now)
+            return 0.0
+
+    def _record_admission(self, priority: int, waited: float):
+        with self._lock:
+            stats = self._stats[PRIORITY_NAMES[priority]]
+            stats["admitted"] += 1
+            stats["wait_seconds_total"] += waited
+            stats["wait_seconds_max"] = max(stats["wait_seconds_max"], waited)
+
+    def acquire(self, estimated_tokens: int, priority: int = None):
+        priority = current_priority.get() if priority is None else priority
+        ticket = self._enqueue(priority)
+        start = time.monotonic()
+        try:
+            while (wait := self._try_admit(ticket, estimated_tokens)) > 0:
+                time.sleep(min(wait, POLL_INTERVAL * 5))
+        except BaseException:
+            self._dequeue(ticket)
+            raise
+        self._record_admission(priority, time.monotonic() - start)
+
+    async def acquire_async(self, estimated_tokens: int, priority: int = None):
+        priority = current_priority.get() if priority is None else priority
+        ticket = self._enqueue(priority)
+        start = time.monotonic()
+        try:
+            while (wait := self._try_admit(ticket, estimated_tokens)) > 0:
+                await asyncio.sleep(min(wait, POLL_INTERVAL * 5))
+        except BaseException:
+            self._dequeue(ticket)
+            raise
+        self._record_admission(priority, time.monotonic() - start)
+
+    # Usage accounting and retries
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int):
+        """
+        Corrects the token bucket once the provider reports the real usage of a call.
+        """
+        if actual_tokens:
+            with self._lock:
+                self.tokens.adjust(estimated_tokens - actual_tokens)
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        delay = min(self.max_backoff, self.base_backoff * (2 ** attempt))
+        delay = random.uniform(delay / 2, delay)
+        retry_after = _retry_after(error)
+        with self._lock:
+            self._retries += 1
+            if getattr(error, "status_code", None) == 429 or retry_after is not None:
+                self._rate_limited += 1
+                # Hold back every queued call, not just this one
+                self._paused_until = max(self._paused_until, time.monotonic() + (retry_after or delay))
+        return max(delay, retry_after or 0.0)
+
+    def call(self, fn: Callable[[], Any], estimated_tokens: int, priority: int = None) -> Any:
+        for attempt in range(self.max_retries + 1):
+            self.acquire(estimated_tokens, priority)
+            try:
+                return fn()
+            except Exception as e:
+                if not _is_retryable(e) or attempt == self.max_retries:
+                    with self._lock:
+                        self._failures += 1
+                    raise
+                time.sleep(self._backoff(attempt, e))
+
+    async def acall(self, fn: Callable[[], Awaitable[Any]], estimated_tokens: int, priority: int = None) -> Any:
+        for attempt in range(self.max_retries + 1):
+            await self.acquire_async(estimated_tokens, priority)
+            try:
+                return await fn()
+            except Exception as e:
+                if not _is_retryable(e) or attempt == self.max_retries:
+                    with self._lock:
+                        self._failures += 1
+                    raise
+                await asyncio.sleep(self._backoff(attempt, e))
+
+    def stream(self, fn: Callable[[], Iterator], estimated_tokens: int, priority: int = None) -> Iterator:
+        """
+        Streaming counterpart of call: `fn` opens the stream. Failures before the first chunk
+        are retried like call; once a chunk has been yielded an error is raised to the caller.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.acquire(estimated_tokens, priority)
+            started = False
+            try:
+                for chunk in fn():
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                if started or not _is_retryable(e) or attempt == self.max_retries:
+                    with self._lock:
+                        self._failures += 1
+                    raise
+                time.sleep(self._backoff(attempt, e))
+
+    async def astream(self, fn: Callable[[], AsyncIterator], estimated_tokens: int, priority: int = None) -> AsyncIterator:
+        for attempt in range(self.max_retries + 1):
+            await self.acquire_async(estimated_tokens, priority)
+            started = False
+            try:
+                async for chunk in fn():
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                if started or not _is_retryable(e) or attempt == self.max_retries:
+                    with self._lock:
+                        self._failures += 1
+                    raise
+                await asyncio.sleep(self._backoff(attempt, e))
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            now = time.monotonic()
+            queue_depth = {name: 0 for name in PRIORITY_NAMES.values()}
+            for priority, _ in self._waiters:
+                queue_depth[PRIORITY_NAMES[priority]] += 1
+            return {
+                "queue_depth": queue_depth,
+                "priorities": {name: dict(stats) for name, stats in self._stats.items()},
+                "retries": self._retries,
+                "rate_limited": self._rate_limited,
+                "failures": self._failures,
+                "available_requests": round(min(self.requests.capacity, self.requests.tokens + (now - self.requests.updated) * self.requests.rate), 2),
+                "available_tokens": round(min(self.tokens.capacity, self.tokens.tokens + (now - self.tokens.updated) * self.tokens.rate)),
+                "paused_for_seconds": round(max(0.0, self._paused_until - now), 3),
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> LLMScheduler:
+    """
+    Process-wide scheduler shared by every LLM client, configured from LLM_RPM / LLM_TPM / LLM_MAX_RETRIES.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler(
+                requests_per_minute=float(os.getenv("LLM_RPM", "500")),
+                tokens_per_minute=float(os.getenv("LLM_TPM", "200000")),
+                max_retries=int(os.getenv("LLM_MAX_RETRIES", "5")),
+            )
+        return _scheduler
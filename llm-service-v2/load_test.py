@@ -0,0 +1,168 @@
+# Load test for /analyze-strategy and /analyze-single-strategy.
+#
+# Without --url the service runs in-process with the fake chat model (LLM_PROVIDER=fake),
+# so no OpenAI calls are made and per-node timings can be reported:
+#
+#   python load_test.py --concurrency 8 --requests 64
+#   FAKE_LLM_LATENCY_MS=1500 FAKE_LLM_ERROR_RATE=0.05 python load_test.py --endpoint single
+#
+# With --url it drives an already running service (latency and throughput only):
+#
+#   python load_test.py --url http://localhost:8000 --concurrency 4 --requests 20
+
+import argparse
+import asyncio
+import contextlib
+import io
+import itertools
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+import chess
+import httpx
+
+SAMPLE_POSITIONS = [
+    {
+        "fen": "2kr3r/pp5p/2Pb2pQ/3p4/4pPq1/2N5/P1P3PP/R3R1K1 b - - 0 21",
+        "moves": "bxc6 22. Ne2 Rdf8 23. Rab1 Bxf4 24. Nxf4 Qxf4",
+        "side": "black",
+    },
+    {
+        "fen": chess.STARTING_FEN,
+        "moves": "1. e4 e5 2. Nf3 Nc6 3. Bb5 a6 4. Ba4 Nf6 5. O-O Be7 6. Re1 b5 7. Bb3 d6 8. c3 O-O",
+        "side": "white",
+    },
+    {
+        "fen": chess.STARTING_FEN,
+        "moves": "1. d4 d5 2. c4 e6 3. Nc3 Nf6 4. Bg5 Be7 5. e3 O-O 6. Nf3 h6 7. Bh4 b6",
+        "side": "black",
+    },
+]
+
+ENDPOINTS = {
+    "strategy": "/analyze-strategy",
+    "single": "/analyze-single-strategy",
+}
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, int(round(q / 100 * len(values))) - 1))]
+
+
+def build_body(endpoint: str, index: int, positions_per_request: int) -> dict:
+    def position(offset):
+        sample = SAMPLE_POSITIONS[(index + offset) % len(SAMPLE_POSITIONS)]
+        return {"gameId": f"load-{index}-{offset}", **sample}
+
+    if endpoint == "single":
+        return position(0)
+    return {"positions": [position(offset) for offset in range(positions_per_request)]}
+
+
+async def run_load(client: httpx.AsyncClient, endpoints, total_requests: int, concurrency: int,
+                   positions_per_request: int):
+    results = defaultdict(list)  # endpoint -> [(latency seconds, ok)]
+    counter = itertools.count()
+
+    async def worker():
+        while (index := next(counter)) < total_requests:
+            endpoint = endpoints[index % len(endpoints)]
+            body = build_body(endpoint, index, positions_per_request)
+            start = time.perf_counter()
+            try:
+                response = await client.post(ENDPOINTS[endpoint], json=body)
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            results[endpoint].append((time.perf_counter() - start, ok))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results, time.perf_counter() - start
+
+
+def report(results, elapsed: float, node_timings=None, scheduler=None) -> dict:
+    summary = {"elapsed_seconds": round(elapsed, 2), "endpoints": {}}
+    total = 0
+    for endpoint, samples in results.items():
+        latencies = [latency for latency, ok in samples if ok]
+        total += len(samples)
+        summary["endpoints"][endpoint] = {
+            "requests": len(samples),
+            "errors": sum(1 for _, ok in samples if not ok),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        }
+    summary["requests_per_second"] = round(total / elapsed, 2) if elapsed else 0.0
+    if node_timings is not None:
+        summary["nodes"] = node_timings
+    if scheduler is not None:
+        summary["llm_scheduler"] = {key: scheduler[key] for key in ("retries", "rate_limited", "failures")}
+    return summary
+
+
+def print_report(summary: dict):
+    print(f"\n{summary['requests_per_second']} req/s over {summary['elapsed_seconds']}s")
+    print(f"{'endpoint':<12}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for endpoint, stats in summary["endpoints"].items():
+        print(f"{endpoint:<12}{stats['requests']:>10}{stats['errors']:>8}"
+              f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+    if "nodes" in summary:
+        print(f"\n{'node':<28}{'calls':>8}{'mean ms':>10}{'p95 ms':>10}{'total ms':>12}")
+        for node, stats in sorted(summary["nodes"].items(), key=lambda item: -item[1]["total_ms"]):
+            print(f"{node:<28}{stats['calls']:>8}{stats['mean_ms']:>10}{stats['p95_ms']:>10}{stats['total_ms']:>12}")
+    if "llm_scheduler" in summary:
+        print(f"\nLLM scheduler: {summary['llm_scheduler']}")
+
+
+async def main(args):
+    endpoints = list(ENDPOINTS) if args.endpoint == "both" else [args.endpoint]
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout) as client:
+            results, elapsed = await run_load(client, endpoints, args.requests, args.concurrency,
+                                              args.positions_per_request)
+        return report(results, elapsed)
+
+    os.environ.setdefault("LLM_PROVIDER", "fake")
+    os.environ.setdefault("OPENAI_API_KEY", "unused")
+    # Keep the report readable: the service logs to stdout (set PIPELINE_DEBUG=1 with --verbose for state dumps)
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with output:
+        import main as service
+        from instrumentation import node_timing_report, reset_node_timings
+        from llm_scheduler import get_scheduler
+
+        reset_node_timings()
+        transport = httpx.ASGITransport(app=service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=args.timeout) as client:
+            results, elapsed = await run_load(client, endpoints, args.requests, args.concurrency,
+                                              args.positions_per_request)
+    return report(results, elapsed, node_timing_report(), get_scheduler().snapshot())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", type=str, help="Base URL of a running service; omit to run in-process with the fake LLM")
+    parser.add_argument("--endpoint", choices=["strategy", "single", "both"], default="both")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=32, help="Total number of requests")
+    parser.add_argument("--positions-per-request", type=int, default=3, help="Positions per /analyze-strategy request")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Show the service's own output")
+    args = parser.parse_args()
+
+    summary = asyncio.run(main(args))
+    if args.json:
+        json.dump(summary, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(summary)
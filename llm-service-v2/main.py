@@ -1,14 +1,33 @@
-from fastapi import FastAPI
+import dotenv
+
+# Before the local imports, which read their configuration at import time
+dotenv.load_dotenv()
+
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from models.game_summary_request import GameSummaryRequest, StrategyRequest
-from strategy_generator import generate_per_game_summaries, generate_single_game_summary
-from aggregator import aggregate_strategies
-import dotenv
+from instrumentation import render_prometheus, verifier_skip_report
+from llm_scheduler import BATCH, INTERACTIVE, get_scheduler, set_llm_priority
+from warmup import readiness, warm_up
+import asyncio
+import json
 import os
 
-dotenv.load_dotenv()
+# The LLM pipeline (strategy_generator, aggregator) is imported by the warm-up or the first
+# request that needs it, so the process starts serving /ready immediately.
+
 os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warm_up_task = asyncio.create_task(warm_up())
+    yield
+    warm_up_task.cancel()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,7 +38,11 @@ app.add_middleware(
 )
 
 @app.post("/analyze-strategy")
-async def analyze_strategy(request: StrategyRequest):
+async def analyze_strategy(request: StrategyRequest, x_llm_priority: str = Header(None)):
+    from strategy_generator import generate_per_game_summaries
+    from aggregator import aggregate_strategies
+
+    set_llm_priority(x_llm_priority or INTERACTIVE)
     summaries = await generate_per_game_summaries(request)
     agg_summary = await aggregate_strategies([s["summary"] for s in summaries])
     return {
@@ -27,9 +50,111 @@ async def analyze_strategy(request: StrategyRequest):
         "per_game_summaries": summaries
     }
 
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/analyze-strategy/stream")
+async def analyze_strategy_stream(request: StrategyRequest, x_llm_priority: str = Header(None)):
+    """
+    Server-sent events: one `game_summary` event per game as soon as its graph run completes,
+    then `aggregate_token` events while the aggregated roadmap is generated, then `done`.
+    """
+    from strategy_generator import stream_per_game_summaries
+    from aggregator import stream_aggregate_strategies
+
+    async def events():
+        set_llm_priority(x_llm_priority or INTERACTIVE)
+        summaries = []
+        async for summary in stream_per_game_summaries(request):
+            yield sse_event("game_summary", summary)
+            if "summary" in summary:
+                summaries.append(summary["summary"])
+
+        tokens = []
+        async for token in stream_aggregate_strategies(summaries):
+            tokens.append(token)
+            yield sse_event("aggregate_token", {"token": token})
+        yield sse_event("done", {"aggregated_summary": "".join(tokens).strip()})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.post("/analyze-single-strategy")
-async def analyze_single_strategy(request: GameSummaryRequest):
-    summary = await generate_single_game_summary(request)
+async def analyze_single_strategy(request: GameSummaryRequest, x_llm_priority: str = Header(None)):
+    from strategy_generator import generate_single_game_summary
+
+    set_llm_priority(x_llm_priority or INTERACTIVE)
+    result = await generate_single_game_summary(request)
     return {
-        "summary": summary
-    }
\ No newline at end of file
+        "summary": result["summary"],
+        "skipped_steps": result["skipped_steps"]
+    }
+
+async def ndjson_records(body: bytes):
+    """
+    Parses an NDJSON body into (index, record) pairs. The index is the record's "index" field
+    if present (resumed jobs keep their original numbering), else its line number.
+    """
+    for line_number, line in enumerate(body.split(b"\n")):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            record = {"invalid": str(e)}
+        if not isinstance(record, dict):
+            record = {"invalid": "not a JSON object"}
+        yield record.pop("index", line_number), record
+
+@app.post("/analyze-bulk")
+async def analyze_bulk(request: Request, concurrency: Optional[int] = None, x_llm_priority: str = Header(None)):
+    """
+    Body: NDJSON of GameSummaryRequest records. Response: NDJSON with one line per record,
+    {"index", "game_id", "summary", "skipped_steps"} or {"index", "game_id", "error"},
+    streamed in completion order.
+    """
+    from strategy_generator import BULK_CONCURRENCY, stream_bulk_summaries
+
+    # Read up front: the streaming response listens for client disconnects on the same channel
+    body = await request.body()
+
+    async def lines():
+        set_llm_priority(x_llm_priority or BATCH)
+        async for result in stream_bulk_summaries(ndjson_records(body), max(1, concurrency or BULK_CONCURRENCY)):
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/ready")
+async def ready():
+    """
+    Readiness probe: 503 until the startup warm-up has loaded the pipeline and opened the
+    LLM connection pools, then 200. The body lists the warm-up steps and their durations.
+    """
+    status = readiness()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/verifier-stats")
+async def verifier_stats():
+    return verifier_skip_report()
+
+
+@app.get("/llm-scheduler")
+async def llm_scheduler_stats():
+    return get_scheduler().snapshot()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus metrics: node latency histograms, LLM token usage per node, cache lookups,
+    verifier outcomes and the LLM scheduler's queue state.
+    """
+    scheduler = get_scheduler().snapshot()
+    gauges = [("llm_scheduler_queue_depth", {"priority": priority}, depth)
+              for priority, depth in scheduler["queue_depth"].items()]
+    gauges += [("llm_scheduler_retries", {}, scheduler["retries"]),
+               ("llm_scheduler_rate_limited", {}, scheduler["rate_limited"]),
+               ("llm_scheduler_failures", {}, scheduler["failures"])]
+    return render_prometheus(gauges)
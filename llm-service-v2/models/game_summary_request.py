@@ -1,11 +1,16 @@
 from pydantic import BaseModel
-from typing import List, Literal
+from typing import List, Literal, Optional
 
 class GameSummaryRequest(BaseModel):
     gameId: str
     fen: str
-    moves: str
+    moves: str = ""
+    # Continuation as base64 16-bit move codes (see move_codes.py); takes precedence over moves
+    moveCodes: Optional[str] = None
     side: Literal["white", "black"]
+    # Optional time budget for the whole request; LLM steps that do not fit are skipped
+    deadlineMs: Optional[int] = None
 
 class StrategyRequest(BaseModel):
-    positions: List[GameSummaryRequest]
\ No newline at end of file
+    positions: List[GameSummaryRequest]
+    deadlineMs: Optional[int] = None
\ No newline at end of file
@@ -0,0 +1,43 @@
+import base64
+import struct
+from typing import List, Optional
+
+import chess
+
+# 16-bit move codes as emitted by the pre-processor (utils/move_codes.py): from square in
+# bits 0-5, to square in bits 6-11, promotion piece type in bits 12-15 (0 for none);
+# little-endian, base64 encoded. The continuation from ply N starts at byte 2 * N.
+
+
+def decode_moves(encoded: str) -> List[chess.Move]:
+    data = base64.b64decode(encoded)
+    return [chess.Move(code & 0x3F, (code >> 6) & 0x3F, (code >> 12) or None)
+            for code in struct.unpack(f"<{len(data) // 2}H", data)]
+
+
+def slice_codes(encoded: str, ply: int, count: Optional[int] = None) -> str:
+    """
+    The encoded moves after `ply` plies (at most `count` of them), without decoding them.
+    """
+    data = base64.b64decode(encoded)
+    end = len(data) if count is None else 2 * (ply + count)
+    return base64.b64encode(data[2 * ply:end]).decode("ascii")
+
+
+def board_at(encoded: str, ply: int, fen: str = chess.STARTING_FEN) -> chess.Board:
+    """
+    Board after the first `ply` encoded moves from `fen`.
+    """
+    board = chess.Board(fen)
+    for move in decode_moves(encoded)[:ply]:
+        board.push(move)
+    return board
+
+
+def continuation_san(fen: str, encoded: str, plies: Optional[int] = None) -> str:
+    """
+    The encoded continuation from `fen` as numbered SAN ("4. d3 Bc5 5. O-O"), the form
+    the graph takes as `moves`. Raises ValueError if a move is illegal in the position.
+    """
+    moves = decode_moves(encoded)
+    return chess.Board(fen).variation_san(moves[:plies] if plies is not None else moves)
@@ -0,0 +1,149 @@
+# Local stand-in for the OpenAI chat completions API that enforces rate limits and mimics
+# prompt caching, used to exercise the LLM scheduler without calling the real provider.
+#
+#   STUB_RPM=20 STUB_TPM=20000 uvicorn openai_stub_server:app --port 8001
+#   OPENAI_BASE_URL=http://localhost:8001/v1 OPENAI_API_KEY=stub uvicorn main:app
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from collections import OrderedDict, deque
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Limits per STUB_WINDOW_SECONDS (a minute by default; shorten it for quick experiments)
+STUB_RPM = int(os.getenv("STUB_RPM", "60"))
+STUB_TPM = int(os.getenv("STUB_TPM", "60000"))
+STUB_WINDOW_SECONDS = float(os.getenv("STUB_WINDOW_SECONDS", "60"))
+STUB_LATENCY_SECONDS = float(os.getenv("STUB_LATENCY_SECONDS", "0.2"))
+STUB_SERVER_ERROR_RATE = float(os.getenv("STUB_SERVER_ERROR_RATE", "0.0"))
+# Prompt caching as the provider does it: prompts from STUB_CACHE_MIN_TOKENS on are cached in
+# STUB_CACHE_INCREMENT_TOKENS steps, and a request reuses the longest cached exact prefix
+STUB_CACHE_MIN_TOKENS = int(os.getenv("STUB_CACHE_MIN_TOKENS", "1024"))
+STUB_CACHE_INCREMENT_TOKENS = int(os.getenv("STUB_CACHE_INCREMENT_TOKENS", "128"))
+STUB_CACHE_ENTRIES = int(os.getenv("STUB_CACHE_ENTRIES", "100000"))
+
+STRATEGY = (
+    "Strategic Goal\n"
+    "Use the semi-open file to build pressure against the backward pawn.\n"
+    "- Double rooks on the semi-open file\n"
+    "- Reroute the knight to the outpost in front of the isolated pawn\n"
+    "- Prepare the pawn break to open the position for the bishops\n"
+)
+VERDICT = json.dumps({"verdict": "valid", "issues": []})
+
+app = FastAPI()
+window = deque()  # (timestamp, tokens) of accepted requests in the current window
+prompt_cache = OrderedDict()  # digest of a cached prompt prefix -> None, in LRU order
+stats = {"accepted": 0, "rate_limited": 0, "server_errors": 0, "prompt_tokens": 0, "cached_tokens": 0}
+
+
+def _rate_limited(tokens: int):
+    now = time.monotonic()
+    while window and now - window[0][0] > STUB_WINDOW_SECONDS:
+        window.popleft()
+    if len(window) + 1 > STUB_RPM or sum(t for _, t in window) + tokens > STUB_TPM:
+        retry_after = max(0.1, STUB_WINDOW_SECONDS - (now - window[0][0])) if window else 1.0
+        return retry_after
+    window.append((now, tokens))
+    return None
+
+
+def _prompt_text(messages) -> str:
+    # Roles are part of the prefix: moving text between messages changes it
+    return "".join(f"<{message.get('role')}>{message.get('content', '')}" for message in messages)
+
+
+def _cached_tokens(prompt_text: str) -> int:
+    """
+    Tokens (4 characters each) of the longest cached prefix of the prompt; caches every
+    prefix length of the prompt for later requests.
+    """
+    cached = 0
+    length = STUB_CACHE_MIN_TOKENS
+    while length * 4 <= len(prompt_text):
+        digest = hashlib.sha256(prompt_text[:length * 4].encode()).digest()
+        if digest in prompt_cache:
+            prompt_cache.move_to_end(digest)
+            cached = length
+        else:
+            prompt_cache[digest] = None
+            if len(prompt_cache) > STUB_CACHE_ENTRIES:
+                prompt_cache.popitem(last=False)
+        length += STUB_CACHE_INCREMENT_TOKENS
+    return cached
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    prompt_text = _prompt_text(body.get("messages", []))
+    prompt_tokens = len(prompt_text) // 4
+
+    retry_after = _rate_limited(prompt_tokens + 200)
+    if retry_after is not None:
+        stats["rate_limited"] += 1
+        return JSONResponse(
+            status_code=429,
+            headers={"retry-after": f"{retry_after:.2f}"},
+            content={"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+        )
+    if random.random() < STUB_SERVER_ERROR_RATE:
+        stats["server_errors"] += 1
+        return JSONResponse(status_code=503, content={"error": {"message": "Overloaded", "type": "server_error"}})
+
+    stats["accepted"] += 1
+    cached_tokens = _cached_tokens(prompt_text)
+    stats["prompt_tokens"] += prompt_tokens
+    stats["cached_tokens"] += cached_tokens
+    await asyncio.sleep(STUB_LATENCY_SECONDS)
+    json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+    content = VERDICT if json_mode else STRATEGY
+    completion_tokens = len(content) // 4
+    usage = {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": cached_tokens},
+    }
+    created = int(time.time())
+
+    if body.get("stream"):
+        async def chunks():
+            for word in content.split(" "):
+                chunk = {
+                    "id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": created, "model": body.get("model"),
+                    "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            done = {
+                "id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": created, "model": body.get("model"),
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            }
+            yield f"data: {json.dumps(done)}\n\n"
+            if (body.get("stream_options") or {}).get("include_usage"):
+                usage_chunk = {
+                    "id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": created, "model": body.get("model"),
+                    "choices": [], "usage": usage,
+                }
+                yield f"data: {json.dumps(usage_chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": created,
+        "model": body.get("model"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": usage,
+    }
+
+
+@app.get("/stub/stats")
+async def stub_stats():
+    return stats
@@ -0,0 +1,166 @@
+# Offline job: pregenerates strategies for the most frequent positions into the read-only strategy store
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import chess
+import chess.pgn
+import dotenv
+
+from graph_builder import build_chess_strategy_graph
+from llm_clients import get_llm, get_verifier_llm, model_identity
+from llm_scheduler import BATCH, set_llm_priority
+from move_codes import continuation_san, slice_codes
+from strategy_store import (CONTINUATION_PLIES, open_for_writing, position_key, publish, ranking_key, stored_keys,
+                            write_strategy)
+
+dotenv.load_dotenv()
+
+
+def continuation_from_pgn(pgn: str, fen: str, plies: int = CONTINUATION_PLIES) -> Optional[str]:
+    """
+    Replays the game's moves up to `fen` and returns the next `plies` moves in SAN,
+    or None when the position does not occur in the game.
+    """
+    game = chess.pgn.read_game(io.StringIO(pgn))
+    if game is None:
+        return None
+    target = " ".join(fen.split()[:4])
+    board = game.board()
+    moves = list(game.mainline_moves())
+    for index, move in enumerate(moves):
+        if " ".join(board.fen().split()[:4]) == target:
+            return board.variation_san(moves[index:index + plies])
+        board.push(move)
+    return None
+
+
+def read_records(path: str, sides: List[str]) -> Iterator[Dict]:
+    """
+    Yields {fen, moves, side} candidates from an NDJSON file holding either pre-processor
+    game records ({"gameMetadata", "positions"}) or position records ({"fen", "moves", "side"?}).
+    Game records with move codes are sliced by ply; older ones are replayed from their PGN.
+    Without a side, one candidate per side in `sides` is produced.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                print(f"Skipping malformed line {line_number}")
+                continue
+
+            if "positions" in record:
+                pgn = record.get("gameMetadata", {}).get("pgn", "")
+                codes = record.get("gameMetadata", {}).get("moveCodes")
+                positions = [(position.get("fen"), None, position.get("moveNumber")) for position in record["positions"]]
+            else:
+                pgn = codes = None
+                positions = [(record.get("fen"), record.get("moves"), None)]
+
+            for fen, moves, ply in positions:
+                if not fen:
+                    continue
+                if moves is None and codes and ply is not None:
+                    # The position's ply indexes straight into the untruncated move codes
+                    moves = continuation_san(fen, slice_codes(codes, ply, CONTINUATION_PLIES))
+                elif moves is None:
+                    moves = continuation_from_pgn(pgn, fen) if pgn else None
+                if not moves:
+                    continue
+                for side in [record["side"]] if record.get("side") else sides:
+                    yield {"fen": fen, "moves": moves, "side": side.lower()}
+
+
+def rank_positions(path: str, sides: List[str], top: int, continuations: int = 1) -> List[Tuple[Dict, int]]:
+    """
+    The `top` most frequent positions (ranking_key: continuations differ almost every time a
+    position recurs, so they are not ranked on) with their counts. Each position comes with
+    its `continuations` most frequent continuations, as keyed by the store.
+    """
+    counts = Counter()
+    continuation_counts: Dict[str, Counter] = defaultdict(Counter)
+    first_seen: Dict[str, Dict] = {}
+    for candidate in read_records(path, sides):
+        position = ranking_key(candidate["fen"], candidate["side"])
+        key = position_key(candidate["fen"], candidate["side"], candidate["moves"])
+        counts[position] += 1
+        continuation_counts[position][key] += 1
+        first_seen.setdefault(key, candidate)
+    return [(first_seen[key], count)
+            for position, count in counts.most_common(top)
+            for key, _ in continuation_counts[position].most_common(continuations)]
+
+
+async def pregenerate(ranked: List[Tuple[Dict, int]], checkpoint: str, concurrency: int) -> Dict:
+    """
+    Runs the strategy graph for every ranked position not yet in the checkpoint database,
+    at most `concurrency` at a time, committing each result as it completes.
+    """
+    set_llm_priority(BATCH)
+    app = build_chess_strategy_graph(get_llm(), get_verifier_llm())
+    model = model_identity()
+    connection = open_for_writing(checkpoint)
+    done = set(stored_keys(connection, model))
+    pending = [(candidate, count) for candidate, count in ranked
+               if position_key(candidate["fen"], candidate["side"], candidate["moves"]) not in done]
+    print(f"{len(ranked)} positions and continuations ranked, {len(ranked) - len(pending)} already in checkpoint, {len(pending)} to run")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    stats = {"generated": 0, "failed": 0, "skipped": len(ranked) - len(pending)}
+
+    async def run(candidate: Dict, count: int):
+        async with semaphore:
+            try:
+                result = await app.ainvoke(dict(candidate))
+            except Exception as e:
+                stats["failed"] += 1
+                print(f"Failed {candidate['fen']} ({candidate['side']}): {e}")
+                return
+        if not result.get("formatted_strategy"):
+            stats["failed"] += 1
+            return
+        write_strategy(connection, {**candidate, "frequency": count, "model": model,
+                                    "formatted_strategy": result["formatted_strategy"]})
+        stats["generated"] += 1
+        finished = stats["generated"] + stats["failed"]
+        if finished % 50 == 0:
+            print(f"{finished}/{len(pending)} done")
+
+    await asyncio.gather(*(run(candidate, count) for candidate, count in pending))
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pregenerate strategies for the most frequent positions")
+    parser.add_argument("--input", type=str, required=True,
+                        help="NDJSON of pre-processor game records or {fen, moves, side} position records")
+    parser.add_argument("--output", type=str, default=os.getenv("STRATEGY_STORE_PATH", "strategy_store.sqlite"),
+                        help="Read-only store the API serves from (STRATEGY_STORE_PATH)")
+    parser.add_argument("--checkpoint", type=str, default=None,
+                        help="Working database for resuming (default: <output>.partial)")
+    parser.add_argument("--top", type=int, default=2000, help="Number of most frequent positions")
+    parser.add_argument("--continuations", type=int, default=1,
+                        help="Most frequent continuations pregenerated per position")
+    parser.add_argument("--side", type=str, choices=["white", "black", "both"], default="both",
+                        help="Planning side for records that do not name one")
+    parser.add_argument("--concurrency", type=int, default=4, help="Graph runs in flight")
+    args = parser.parse_args()
+
+    sides = ["white", "black"] if args.side == "both" else [args.side]
+    checkpoint = args.checkpoint or f"{args.output}.partial"
+
+    start = time.perf_counter()
+    ranked = rank_positions(args.input, sides, args.top, args.continuations)
+    stats = asyncio.run(pregenerate(ranked, checkpoint, args.concurrency))
+    publish(open_for_writing(checkpoint), args.output)
+    print(f"Generated {stats['generated']}, failed {stats['failed']}, resumed past {stats['skipped']} "
+          f"in {time.perf_counter() - start:.1f}s; published {args.output}")
@@ -0,0 +1,187 @@
+import os
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+import chess
+from langchain_core.prompts import ChatPromptTemplate
+
+from agents.move_analyzer import CAPTURE, CENTRAL_FILE, FILE_ACTIVATION, PAWN_DIAGONAL_PUSH, PAWN_PUSH, PlyRecord
+from instrumentation import PIPELINE_DEBUG, debug, record_prompt_tokens
+
+# Upper bound on input tokens (system prompt included) for a single LLM call; prompts that
+# cannot be shrunk below it are sent anyway and logged
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1800"))
+# Number of plies from the continuation that are described in a prompt
+MAX_PROMPT_PLIES = int(os.getenv("MAX_PROMPT_PLIES", "30"))
+MIN_PROMPT_PLIES = 4
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    import tiktoken
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # BPE files could not be loaded (e.g. no network on first start) - fall back to estimates
+        print(f"tiktoken encoding unavailable, estimating token counts: {e}")
+        return None
+
+
+def count_tokens(text: str, model: str = None) -> int:
+    encoding = _encoding(model or os.getenv("OPENAI_MODEL") or "gpt-4o-mini")
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = None) -> str:
+    if max_tokens <= 0:
+        return ""
+    encoding = _encoding(model or os.getenv("OPENAI_MODEL") or "gpt-4o-mini")
+    if encoding is None:
+        return text[:max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+def count_prompt_tokens(prompt: ChatPromptTemplate, inputs: Dict, model: str = None) -> int:
+    messages = prompt.format_messages(**inputs)
+    # ~4 tokens of framing per chat message
+    return sum(count_tokens(str(message.content), model) + 4 for message in messages)
+
+
+def encode_position_features(features: Dict) -> str:
+    """
+    Renders position_features as a few short lines instead of a Python dict repr.
+    """
+    if not features:
+        return "(none)"
+
+    def join(values: Iterable) -> str:
+        values = sorted(values)
+        return ",".join(values) if values else "-"
+
+    lines = []
+    if "white_king_safety" in features or "black_king_safety" in features:
+        lines.append(f"king safety: white={features.get('white_king_safety')} black={features.get('black_king_safety')}")
+    if "center_control" in features:
+        center = features["center_control"]
+        lines.append(f"center control: white={join(center.get('white', []))} black={join(center.get('black', []))}")
+    if "white_has_bishop_pair" in features or "black_has_bishop_pair" in features:
+        pairs = [color for color in ("white", "black") if features.get(f"{color}_has_bishop_pair")]
+        lines.append(f"bishop pair: {join(pairs)}")
+    if "open_files" in features:
+        lines.append(f"open files: {join(features['open_files'])}")
+    if "white_semi_open_files" in features or "black_semi_open_files" in features:
+        lines.append(f"semi-open files: white={join(features.get('white_semi_open_files', []))} "
+                     f"black={join(features.get('black_semi_open_files', []))}")
+
+    known = {"white_king_safety", "black_king_safety", "center_control", "white_has_bishop_pair",
+             "black_has_bishop_pair", "open_files", "white_semi_open_files", "black_semi_open_files"}
+    for key, value in features.items():
+        if key not in known:
+            lines.append(f"{key}: {value}")
+    return "\n".join(lines)
+
+
+def _ply_label(ply: PlyRecord, with_number: bool) -> str:
+    if not with_number:
+        return ply.san
+    dots = "." if ply.white else "..."
+    return f"{ply.move_number}{dots}{ply.san}"
+
+
+def _ply_tags(ply: PlyRecord) -> Tuple[str, ...]:
+    flags = ply.flags
+    tags = []
+    if flags & PAWN_PUSH:
+        tags.append("push")
+    if flags & PAWN_DIAGONAL_PUSH:
+        tags.append("diag")
+    tags.append("center" if flags & CENTRAL_FILE else "flank")
+    if flags & FILE_ACTIVATION:
+        tags.append("rook-file" if ply.piece_type == chess.ROOK else "queen-file")
+    if flags & CAPTURE:
+        tags.append("central-capture" if flags & CENTRAL_FILE else "flank-capture")
+        tags.append(f"takes-{chess.piece_name(ply.captured_piece_type)}" if ply.captured_piece_type else "capture")
+    return tuple(tags)
+
+
+def encode_structure_insights(insights: List[PlyRecord], max_plies: int = MAX_PROMPT_PLIES) -> str:
+    """
+    Collapses per-ply structure insights into run-length lines: consecutive plies that
+    share the same structural tags are listed once, e.g. "22.Ne2 Rdf8 23.Rab1: flank".
+    Only the first `max_plies` plies are described; the rest is summarized in one line.
+    """
+    if not insights:
+        return "(none)"
+
+    shown, omitted = insights[:max_plies], insights[max_plies:]
+    lines = []
+    run, run_tags = [], None
+    for ply in shown:
+        tags = _ply_tags(ply)
+        if run and tags != run_tags:
+            lines.append(_render_run(run, run_tags))
+            run = []
+        run.append(ply)
+        run_tags = tags
+    if run:
+        lines.append(_render_run(run, run_tags))
+
+    if omitted:
+        captures = sum(1 for ply in omitted if ply.flags & CAPTURE)
+        pushes = sum(1 for ply in omitted if ply.flags & PAWN_PUSH)
+        lines.append(f"(+{len(omitted)} later plies: {captures} captures, {pushes} pawn pushes)")
+    return "\n".join(lines)
+
+
+def _render_run(run: List[PlyRecord], tags: Tuple[str, ...]) -> str:
+    labels = [_ply_label(ply, index == 0 or ply.white) for index, ply in enumerate(run)]
+    return f"{' '.join(labels)}: {' '.join(tags) if tags else 'quiet'}"
+
+
+def fit_prompt_to_budget(
+    prompt: ChatPromptTemplate,
+    inputs: Dict,
+    structure_insights: List[PlyRecord],
+    node: str,
+    truncatable: Tuple[str, ...] = ("structure",),
+    budget: int = PROMPT_TOKEN_BUDGET,
+    max_plies: int = MAX_PROMPT_PLIES,
+) -> Dict:
+    """
+    Fills inputs["structure"] with the compact encoding and shrinks it until the formatted
+    prompt, system message included, fits the token budget: first by halving the number of
+    plies described, then by truncating the `truncatable` inputs in order. Records the resulting
+    token count for `node` and warns when the prompt is still over budget.
+    """
+    plies = max_plies
+    while True:
+        candidate = {**inputs, "structure": encode_structure_insights(structure_insights, plies)}
+        tokens = count_prompt_tokens(prompt, candidate)
+        if tokens <= budget or plies <= MIN_PROMPT_PLIES:
+            break
+        plies = max(MIN_PROMPT_PLIES, plies // 2)
+
+    for key in truncatable:
+        if tokens <= budget:
+            break
+        value = str(candidate.get(key, ""))
+        keep = count_tokens(value) - (tokens - budget)
+        candidate[key] = truncate_to_tokens(value, keep)
+        tokens = count_prompt_tokens(prompt, candidate)
+
+    record_prompt_tokens(node, tokens, budget)
+    if tokens > budget:
+        print(f"[prompt tokens] {node}: {tokens} over the budget of {budget} after truncating {', '.join(truncatable)}")
+    if PIPELINE_DEBUG:
+        # Formatting re-tokenizes the structure insights; only worth it when debugging
+        debug(f"[prompt tokens] {node}: {tokens} (budget {budget}, plies {min(plies, len(structure_insights))}/{len(structure_insights)}, "
+              f"structure {count_tokens(candidate['structure'])} vs {count_tokens(str(structure_insights))} as repr)")
+    return candidate
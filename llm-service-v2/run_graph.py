@@ -33,7 +33,7 @@ if __name__ == "__main__":
     print("\n🔍 Position Features:\n")
     print(json.dumps(result.get("position_features", {}), indent=2))
     print("\n📦 Structure Insights:\n")
-    print(json.dumps(result.get("structure_insights", []), indent=2))
+    print(json.dumps([ply.as_dict() for ply in result.get("structure_insights", [])], indent=2))
     print("\n✅ Final Output:\n")
     print(result.get("formatted_strategy", "[No strategy generated]"))
     print("\n🧠 Synthesized Ideas (Raw):\n")
@@ -0,0 +1,100 @@
+import asyncio
+import hashlib
+import json
+import re
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+MOVE_NUMBERS = re.compile(r"\d+\.(\.\.)?")
+RESULTS = re.compile(r"1-0|0-1|1/2-1/2|\*")
+
+
+def normalize_moves(moves: str) -> str:
+    """
+    Reduces a move sequence to space-separated SAN: no move numbers, results or extra whitespace.
+    """
+    moves = MOVE_NUMBERS.sub(" ", moves or "")
+    moves = RESULTS.sub(" ", moves)
+    return " ".join(moves.split())
+
+
+def _digest(parts: Iterable) -> str:
+    return hashlib.sha256(json.dumps(list(parts), ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def analysis_key(fen: str, moves: str, side: str, model: str) -> str:
+    """
+    Identity of a per-game analysis: normalized (FEN, moves, side, model).
+    """
+    return _digest(["analysis", " ".join((fen or "").split()), normalize_moves(moves), (side or "").lower(), model])
+
+
+def aggregate_key(summaries: Iterable[str], model: str) -> str:
+    """
+    Identity of an aggregation over the given summaries (order matters, it is part of the prompt).
+    """
+    return _digest(["aggregate", model, *summaries])
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical computations within the process: the first caller for a key
+    starts the work, later callers with the same key await the same result (or exception)
+    instead of starting their own. Keys are forgotten as soon as the work finishes, so this
+    deduplicates in-flight work only and never serves stale results.
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, name: str, on_lookup: Optional[Callable[[str, bool], None]] = None):
+        self.name = name
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Called with (name, coalesced) on every lookup, e.g. to count hits in metrics
+        self._on_lookup = on_lookup
+
+    def _record(self, coalesced: bool):
+        if self._on_lookup:
+            self._on_lookup(self.name, coalesced)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        self._record(future is not None)
+        if future is None:
+            # A separate task so the shared work survives the first caller being cancelled
+            future = asyncio.ensure_future(fn())
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(future)
+
+    def claim(self, key: str) -> Tuple[asyncio.Future, bool]:
+        """
+        Lower-level variant of `do` for callers that compute several keys together (e.g. one
+        batched LLM call): returns the key's future and whether the caller is its leader.
+        A leader must eventually call `resolve` for the key.
+        """
+        future = self._inflight.get(key)
+        self._record(future is not None)
+        if future is not None:
+            return future, False
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        return future, True
+
+    def resolve(self, key: str, result: Any = None, error: BaseException = None):
+        future = self._inflight.pop(key, None)
+        if future is None or future.done():
+            return
+        if isinstance(error, asyncio.CancelledError):
+            future.cancel()
+        elif error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _forget(self, key: str, done: asyncio.Future):
+        if self._inflight.get(key) is done:
+            del self._inflight[key]
+        if not done.cancelled():
+            # Mark the exception as retrieved even if every caller went away
+            done.exception()
+
+    def __len__(self) -> int:
+        return len(self._inflight)
@@ -0,0 +1,99 @@
+# Startup-time benchmark: time until a fresh service process listens, is ready, and answers its first requests
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+SAMPLE_REQUEST = {
+    "gameId": "startup-benchmark",
+    "fen": "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4",
+    "moves": "4. d3 Bc5 5. O-O d6 6. c3 O-O 7. Re1 a6",
+    "side": "white",
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_once(env: dict, timeout: float) -> dict:
+    """
+    Starts `uvicorn main:app` and polls /ready; returns seconds from process start to the
+    first HTTP answer (listening), to ready, and the latency of the first two requests.
+    """
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    result = {"listening": None, "ready": None}
+    try:
+        with httpx.Client(base_url=base, timeout=timeout) as client:
+            while time.perf_counter() - start < timeout:
+                try:
+                    response = client.get("/ready")
+                except httpx.TransportError:
+                    time.sleep(0.01)
+                    continue
+                now = time.perf_counter() - start
+                if result["listening"] is None:
+                    result["listening"] = now
+                if response.status_code == 200:
+                    result["ready"] = now
+                    result["warmup_steps"] = response.json().get("steps", {})
+                    break
+                time.sleep(0.01)
+            else:
+                raise TimeoutError(f"service not ready within {timeout}s")
+
+            for name in ("first_request", "second_request"):
+                request_start = time.perf_counter()
+                client.post("/analyze-single-strategy", json=SAMPLE_REQUEST).raise_for_status()
+                result[name] = time.perf_counter() - request_start
+    finally:
+        process.terminate()
+        process.wait()
+    return result
+
+
+def _median(runs: list, key: str) -> float:
+    return statistics.median(run[key] for run in runs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure cold start, readiness and first-request latency")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--provider", choices=["fake", "openai"], default="fake",
+                        help="LLM_PROVIDER for the service under test (fake needs no network)")
+    parser.add_argument("--no-warmup", action="store_true", help="Start with WARMUP=0 for comparison")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--json", action="store_true", help="Print the raw runs as JSON")
+    args = parser.parse_args()
+
+    env = {**os.environ, "LLM_PROVIDER": args.provider, "WARMUP": "0" if args.no_warmup else "1"}
+    env.setdefault("OPENAI_API_KEY", "startup-benchmark")
+    if args.provider == "fake":
+        # Fast replies so the request latency is dominated by the service itself
+        env.setdefault("FAKE_LLM_LATENCY_MS", "5")
+        env.setdefault("FAKE_LLM_TOKENS_PER_SECOND", "100000")
+
+    runs = [measure_once(env, args.timeout) for _ in range(args.runs)]
+    if args.json:
+        print(json.dumps(runs, indent=2))
+    print(f"{args.runs} runs, provider={args.provider}, warm-up {'off' if args.no_warmup else 'on'} (medians)")
+    print(f"  listening:      {_median(runs, 'listening') * 1000:8.0f} ms")
+    print(f"  ready:          {_median(runs, 'ready') * 1000:8.0f} ms")
+    print(f"  first request:  {_median(runs, 'first_request') * 1000:8.0f} ms")
+    print(f"  second request: {_median(runs, 'second_request') * 1000:8.0f} ms")
@@ -1,44 +1,226 @@
-from typing import List
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from models.game_summary_request import GameSummaryRequest, StrategyRequest
 from graph_builder import build_chess_strategy_graph
-from langchain_openai import ChatOpenAI
+from agents.idea_synthesizer import batch_idea_synthesizer_tool
+from llm_clients import get_llm, get_verifier_llm, model_identity
+from deadlines import deadline_from_ms
+from instrumentation import record_cache_lookup
+from single_flight import SingleFlight, analysis_key
+from strategy_store import strategy_store
+from move_codes import continuation_san
+from functools import lru_cache
+import chess
+import asyncio
 import os
-import dotenv
 
-dotenv.load_dotenv()
-llm = ChatOpenAI(model=os.getenv("OPENAI_MODEL"), temperature=0.5)
-verifier_llm = ChatOpenAI(model=os.getenv("VERIFIER_OPENAI_MODEL"), temperature=0.5)
-strategy_graph_app = build_chess_strategy_graph(llm,verifier_llm)
+
+@lru_cache(maxsize=None)
+def strategy_graph():
+    """
+    The compiled strategy graph, built on first use (or by the startup warm-up).
+    """
+    return build_chess_strategy_graph(get_llm(), get_verifier_llm())
+
+
+@lru_cache(maxsize=None)
+def analysis_graph():
+    return build_chess_strategy_graph(analysis_only=True)
+
+
+# Synthesize ideas for multi-game requests in batched LLM calls (0 = one call per game)
+BATCH_SYNTHESIS = os.getenv("BATCH_SYNTHESIS", "1") == "1"
+
+# Concurrent requests for the same game share one graph run
+analysis_flight = SingleFlight("analysis_single_flight", on_lookup=record_cache_lookup)
+
+# Default time budgets per endpoint when the caller does not send deadlineMs (unset = no deadline)
+STRATEGY_DEADLINE_ENV = "STRATEGY_DEADLINE_MS"
+SINGLE_STRATEGY_DEADLINE_ENV = "SINGLE_STRATEGY_DEADLINE_MS"
+
+
+def _game_summary(game_id: str, result: dict) -> dict:
+    return {
+        "game_id": game_id,
+        "summary": result.get("formatted_strategy", "(No strategy returned)"),
+        "skipped_steps": result.get("skipped_steps", [])
+    }
+
+
+def _stored_result(state: dict) -> Optional[dict]:
+    """
+    Strategy pregenerated offline by the current model for this exact position and continuation,
+    if the store has one.
+    """
+    if not strategy_store.path:
+        return None
+    stored = strategy_store.get(state.get("fen") or chess.STARTING_FEN, state["side"], state["moves"], model_identity())
+    record_cache_lookup("strategy_store", stored is not None)
+    if stored is None:
+        return None
+    return {"formatted_strategy": stored["formatted_strategy"], "skipped_steps": []}
+
+
+async def _analyze(state: dict) -> dict:
+    stored = _stored_result(state)
+    if stored is not None:
+        return stored
+    return await strategy_graph().ainvoke(state)
+
+def _state_key(state: dict) -> str:
+    return analysis_key(state["fen"], state["moves"], state["side"], model_identity())
+
+
+def _run_graph(state: dict):
+    """
+    Runs the strategy graph for one game, sharing the run with identical in-flight requests.
+    """
+    return analysis_flight.do(_state_key(state), lambda: _analyze(state))
+
 
 async def generate_per_game_summaries(request: StrategyRequest) -> List[dict]:
-    summaries = []
+    deadline = deadline_from_ms(request.deadlineMs, STRATEGY_DEADLINE_ENV)
+    states = [{
+        "fen": position.fen,
+        "moves": request_moves(position),
+        "side": position.side,
+        "deadline": deadline
+    } for position in request.positions]
 
-    for position in request.positions:
-        result = strategy_graph_app.invoke({
-            "fen": position.fen,
-            "moves": position.moves,
-            "side": position.side
-        })
+    # Games already being analyzed (by another request or earlier in this one) are only awaited
+    keys = [_state_key(state) for state in states]
+    claims = [analysis_flight.claim(key) for key in keys]
+    leaders = [index for index, (_, leader) in enumerate(claims) if leader]
 
+    try:
+        for index in list(leaders):
+            stored = _stored_result(states[index])
+            if stored is not None:
+                analysis_flight.resolve(keys[index], stored)
+                leaders.remove(index)
 
+        own_states = [states[index] for index in leaders]
+        if BATCH_SYNTHESIS and len(own_states) > 1:
+            own_states = await _batch_synthesize(own_states)
 
-        summaries.append({
-            "game_id": position.gameId,
-            "summary": result.get("formatted_strategy", "(No strategy returned)")
-        })
+        # Games whose batched synthesis failed still carry their analysis and resume at the synthesizer
+        for index, state in zip(leaders, own_states):
+            analysis_flight.resolve(keys[index], await strategy_graph().ainvoke(state))
+    except BaseException as e:
+        for index in leaders:
+            analysis_flight.resolve(keys[index], error=e)
+        raise
+
+    summaries = []
+    for position, (future, _) in zip(request.positions, claims):
+        result = await asyncio.shield(future)
+        summaries.append(_game_summary(position.gameId, result))
 
     return summaries
 
 
-async def generate_single_game_summary(position: GameSummaryRequest) -> str:
-    cleaned_moves = extract_moves_from_pgn(position.moves)
-    result = strategy_graph_app.invoke({
+async def _batch_synthesize(states: List[dict]) -> List[dict]:
+    """
+    Runs the board analysis for every game, then synthesizes all games' ideas in batched LLM calls.
+    """
+    analyzed = [await analysis_graph().ainvoke(state) for state in states]
+    result = await batch_idea_synthesizer_tool.ainvoke({"states": analyzed, "llm": get_llm()})
+    return [
+        {**state, "synthesized_ideas": ideas} if ideas else state
+        for state, ideas in zip(analyzed, result["ideas"])
+    ]
+
+
+async def stream_per_game_summaries(request: StrategyRequest) -> AsyncIterator[dict]:
+    """
+    Runs the graph for every position concurrently and yields each per-game summary
+    as soon as its run completes.
+    """
+    deadline = deadline_from_ms(request.deadlineMs, STRATEGY_DEADLINE_ENV)
+
+    async def run(position: GameSummaryRequest) -> dict:
+        try:
+            result = await _run_graph({
+                "fen": position.fen,
+                "moves": request_moves(position),
+                "side": position.side,
+                "deadline": deadline
+            })
+        except Exception as e:
+            return {"game_id": position.gameId, "error": str(e)}
+        return _game_summary(position.gameId, result)
+
+    tasks = [asyncio.create_task(run(position)) for position in request.positions]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def generate_single_game_summary(position: GameSummaryRequest) -> dict:
+    cleaned_moves = request_moves(position)
+    result = await _run_graph({
             "fen": position.fen,
             "moves": cleaned_moves,
-            "side": position.side
+            "side": position.side,
+            "deadline": deadline_from_ms(position.deadlineMs, SINGLE_STRATEGY_DEADLINE_ENV)
         })
 
-    return result.get("formatted_strategy", "(No strategy returned)")
+    return _game_summary(position.gameId, result)
+
+# Graph runs in flight per bulk request
+BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", "4"))
+
+
+async def stream_bulk_summaries(records: AsyncIterator[Tuple[int, Dict]],
+                                concurrency: int = BULK_CONCURRENCY) -> AsyncIterator[dict]:
+    """
+    Analyzes (index, GameSummaryRequest fields) records with at most `concurrency` graph runs
+    in flight, pulling records lazily, and yields each summary tagged with its index in
+    completion order. Invalid records and failed runs yield an error entry instead.
+    """
+    async def run(index: int, record: Dict) -> dict:
+        try:
+            position = GameSummaryRequest(**record)
+        except Exception as e:
+            return {"index": index, "game_id": record.get("gameId"), "error": f"Invalid record: {e}"}
+        try:
+            summary = await generate_single_game_summary(position)
+        except Exception as e:
+            return {"index": index, "game_id": position.gameId, "error": str(e)}
+        return {"index": index, **summary}
+
+    pending = set()
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < concurrency:
+                try:
+                    index, record = await records.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                pending.add(asyncio.create_task(run(index, record)))
+            if not pending:
+                return
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def request_moves(position: GameSummaryRequest) -> str:
+    """
+    The continuation as the SAN text the graph expects: rebuilt from the move codes when
+    the request carries them, otherwise the moves text (a full PGN is reduced to its moves).
+    """
+    if position.moveCodes:
+        return continuation_san(position.fen, position.moveCodes)
+    return extract_moves_from_pgn(position.moves)
+
 
 def extract_moves_from_pgn(pgn_text: str) -> str:
     if pgn_text.strip().startswith("["):
@@ -0,0 +1,125 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from single_flight import normalize_moves
+
+# Pregenerated strategies written by pregenerate.py; unset or missing file = no store
+STRATEGY_STORE_PATH = os.getenv("STRATEGY_STORE_PATH", "")
+# Plies of the continuation that identify a stored strategy (pregenerate.py runs the graph on as many)
+CONTINUATION_PLIES = 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS strategies (
+    position_key TEXT PRIMARY KEY,
+    fen TEXT NOT NULL,
+    side TEXT NOT NULL,
+    moves TEXT NOT NULL,
+    frequency INTEGER NOT NULL,
+    formatted_strategy TEXT NOT NULL,
+    model TEXT NOT NULL,
+    created_at REAL NOT NULL
+) WITHOUT ROWID
+"""
+
+
+def ranking_key(fen: str, side: str) -> str:
+    """
+    Position a strategy is ranked under for pregeneration: piece placement, side to move and
+    castling rights of the FEN plus the planning side, regardless of the continuation.
+    """
+    return " ".join((fen or "").split()[:3]) + "|" + (side or "").lower()
+
+
+def position_key(fen: str, side: str, moves: str) -> str:
+    """
+    Store key of a position and its continuation: piece placement, side to move, castling and
+    en passant fields of the FEN (move counters dropped), the planning side and the first
+    CONTINUATION_PLIES plies of the normalized continuation. A roadmap describes the moves
+    played, so the same position with another continuation is another entry.
+    """
+    continuation = " ".join(normalize_moves(moves).split()[:CONTINUATION_PLIES])
+    return " ".join((fen or "").split()[:4]) + "|" + (side or "").lower() + "|" + continuation
+
+
+def open_for_writing(path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute(SCHEMA)
+    return connection
+
+
+def write_strategy(connection: sqlite3.Connection, entry: Dict):
+    connection.execute(
+        "INSERT OR REPLACE INTO strategies VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (position_key(entry["fen"], entry["side"], entry["moves"]), entry["fen"], entry["side"].lower(), entry["moves"],
+         entry["frequency"], entry["formatted_strategy"], entry["model"], time.time()),
+    )
+    connection.commit()
+
+
+def stored_keys(connection: sqlite3.Connection, model: str) -> Iterable[str]:
+    """
+    Keys already generated with `model`; entries of other models are regenerated.
+    """
+    return (row[0] for row in connection.execute("SELECT position_key FROM strategies WHERE model = ?", (model,)))
+
+
+def publish(connection: sqlite3.Connection, path: str):
+    """
+    Writes a compacted copy of the working database to `path` atomically, so a running
+    service never sees a half-written store.
+    """
+    temporary = f"{path}.tmp"
+    if os.path.exists(temporary):
+        os.remove(temporary)
+    connection.execute("VACUUM INTO ?", (temporary,))
+    os.replace(temporary, path)
+
+
+class StrategyStore:
+    """
+    Read-only lookups of pregenerated strategies by position_key and model; strategies generated
+    by another model than the one serving are ignored.
+    The file is reopened when it is replaced by a newer publish.
+    """
+
+    def __init__(self, path: str = STRATEGY_STORE_PATH):
+        self.path = path
+        self._connection = None
+        self._identity = None
+        self._lock = threading.Lock()
+
+    def _current(self) -> Optional[sqlite3.Connection]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        identity = (stat.st_ino, stat.st_mtime_ns)
+        if identity != self._identity:
+            if self._connection is not None:
+                self._connection.close()
+            self._connection = sqlite3.connect(f"file:{self.path}?mode=ro&immutable=1", uri=True,
+                                               check_same_thread=False)
+            self._identity = identity
+        return self._connection
+
+    def get(self, fen: str, side: str, moves: str, model: str) -> Optional[Dict]:
+        if not self.path:
+            return None
+        with self._lock:
+            connection = self._current()
+            if connection is None:
+                return None
+            row = connection.execute(
+                "SELECT fen, formatted_strategy, frequency FROM strategies WHERE position_key = ? AND model = ?",
+                (position_key(fen, side, moves), model),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"fen": row[0], "formatted_strategy": row[1], "frequency": row[2]}
+
+
+strategy_store = StrategyStore()
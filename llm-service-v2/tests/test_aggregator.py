@@ -0,0 +1,27 @@
+from aggregator import AGGREGATION_INSTRUCTIONS, _aggregation_messages, chunk_summaries
+from prompt_budget import count_tokens
+
+
+def test_chunks_respect_the_budget():
+    summaries = [f"Summary {n}: " + "pressure the queenside " * 10 for n in range(20)]
+    chunks = chunk_summaries(summaries, budget=200)
+    assert [summary for chunk in chunks for summary in chunk] == summaries
+    assert all(sum(count_tokens(summary) for summary in chunk) <= 200 for chunk in chunks)
+    assert len(chunks) > 1
+
+
+def test_oversized_summaries_are_capped_so_chunks_hold_two():
+    summaries = ["long " * 1000, "long " * 1000, "long " * 1000]
+    chunks = chunk_summaries(summaries, budget=100)
+    assert all(count_tokens(summary) <= 50 for chunk in chunks for summary in chunk)
+    assert len(chunks[0]) == 2
+
+
+def test_no_summaries_no_chunks():
+    assert chunk_summaries([]) == []
+
+
+def test_aggregation_prompt_starts_with_the_static_instructions():
+    first, second = _aggregation_messages(["a", "b"]), _aggregation_messages(["c"])
+    assert first[0] == second[0] == ("system", AGGREGATION_INSTRUCTIONS)
+    assert first[1] == ("user", "Summaries:\na\nb")
@@ -0,0 +1,89 @@
+import chess
+
+from agents.claim_checker import check_strategy_claims
+
+ITALIAN = "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4"
+ITALIAN_MOVES = ["d2d3", "f8c5", "e1g1", "d7d6", "c2c3", "e8g8"]
+# White castled, black kept both rights
+WHITE_CASTLED = "r3k2r/pppq1ppp/2npbn2/4p3/2B1P3/2NP1N2/PPP2PPP/R2Q1RK1 b kq - 0 8"
+
+
+def features(fen):
+    board = chess.Board(fen)
+    return {
+        "white_has_bishop_pair": len(board.pieces(chess.BISHOP, chess.WHITE)) >= 2,
+        "black_has_bishop_pair": len(board.pieces(chess.BISHOP, chess.BLACK)) >= 2,
+    }
+
+
+def check(strategy, fen=ITALIAN, moves=ITALIAN_MOVES, side="white"):
+    return check_strategy_claims(strategy, fen, features(fen), moves, side)
+
+
+def test_roadmap_matching_the_game_is_valid():
+    result = check(
+        "Strategic Goal\n"
+        "Build slow pressure in the centre after d3 and c3.\n"
+        "- The bishop on c4 eyes f7; keep it on the a2-g8 diagonal\n"
+        "- After castling kingside, prepare d4 with the knight on f3 supporting it\n"
+        "- Use the bishop pair to open the position later")
+    assert result["verdict"] == "valid", result
+    assert result["contradicted"] == 0
+
+
+def test_planned_placements_are_not_contradictions():
+    for wording in ("The knight belongs on d5", "A knight on d5 would dominate the centre",
+                    "Ideally the queen on e2 supports the f-pawn"):
+        result = check(f"Strategic Goal\nControl d5.\n- {wording}\n- Play c3 and d4")
+        assert result["contradicted"] == 0, (wording, result)
+        assert result["verdict"] != "needs_correction"
+
+
+def test_piece_type_that_does_not_exist_is_contradicted():
+    endgame = "8/5k2/8/3p4/3P4/5K2/8/8 w - - 0 40"
+    result = check("Strategic Goal\nWin the d5 pawn.\n- Bring the rook on d1 to the d-file\n- Kf4 and Ke5",
+                   fen=endgame, moves=[])
+    assert result["verdict"] == "needs_correction"
+    assert any("no rook" in issue for issue in result["issues"])
+
+
+def test_castling_checks_the_named_color():
+    assert check("Black should castle kingside soon.", fen=WHITE_CASTLED, moves=[], side="white")["contradicted"] == 0
+    result = check("White can still castle queenside.", fen=WHITE_CASTLED, moves=[], side="black")
+    assert result["contradicted"] == 1
+    assert "White cannot castle" in result["issues"][0]
+
+
+def test_castling_without_color_checks_the_analyzed_side():
+    no_white_rights = "r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/3P1N2/PPP2PPP/RNBQ1K1R b kq - 2 5"
+    assert check("Castle kingside and play Re1.", fen=no_white_rights, moves=[], side="black")["contradicted"] == 0
+    result = check("Castle kingside and play Re1.", fen=no_white_rights, moves=[], side="white")
+    assert result["contradicted"] == 1
+
+
+def test_wrong_open_file_is_contradicted():
+    result = check("Strategic Goal\nUse the open e-file.\n- Double rooks on the e-file")
+    assert result["verdict"] == "needs_correction"
+    assert any("e-file" in issue for issue in result["issues"])
+
+
+def test_piece_claims_are_matched_by_the_named_color():
+    # Only Black has a knight on f6 in the Italian
+    result = check("White's knight on f6 dominates the kingside.")
+    assert result["supported"] == 0 and result["unverifiable"] == 1
+    assert check("Black's knight on f6 defends h7.")["supported"] == 1
+    assert check("The knight on f6 defends h7.")["supported"] == 1
+
+
+def test_piece_of_a_color_that_has_none_is_contradicted():
+    # White has no knights left, Black has one
+    fen = "r1bqkb1r/pppp1ppp/5n2/4p3/2B1P3/8/PPPP1PPP/R1BQK2R w KQkq - 0 6"
+    result = check("Strategic Goal\nAttack f7.\n- The white knight on g5 hits f7", fen=fen, moves=[])
+    assert result["verdict"] == "needs_correction"
+    assert "no white knight" in result["issues"][0]
+
+
+def test_castling_again_is_not_supported():
+    result = check("White should castle kingside next.", fen=WHITE_CASTLED, moves=[], side="white")
+    assert result["supported"] == 0
+    assert result["unverifiable"] == 1
@@ -0,0 +1,10 @@
+from instrumentation import node_span, node_timing_report, render_prometheus, reset_node_metrics
+
+
+def test_reset_node_metrics_clears_histograms():
+    with node_span("warmup_test_node"):
+        pass
+    assert 'strategy_node_duration_seconds_count{node="warmup_test_node"} 1' in render_prometheus()
+    reset_node_metrics()
+    assert "warmup_test_node" not in render_prometheus()
+    assert "warmup_test_node" not in node_timing_report()
@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+from llm_scheduler import BATCH, INTERACTIVE, LLMScheduler, TokenBucket, estimate_tokens
+
+
+class ProviderError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+def scheduler(**options):
+    return LLMScheduler(requests_per_minute=6000, tokens_per_minute=600000, base_backoff=0.001,
+                        max_backoff=0.002, **options)
+
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(per_minute=60)  # one token per second
+    assert bucket.wait_time(60, now=bucket.updated) == 0.0
+    bucket.take(60, now=bucket.updated)
+    assert bucket.wait_time(10, now=bucket.updated) == pytest.approx(10.0)
+    assert bucket.wait_time(10, now=bucket.updated + 4) == pytest.approx(6.0)
+
+
+def test_token_bucket_caps_requests_at_capacity():
+    bucket = TokenBucket(per_minute=60)
+    bucket.take(1000, now=bucket.updated)
+    assert bucket.tokens == 0.0
+    assert bucket.wait_time(1000, now=bucket.updated) == pytest.approx(60.0)
+
+
+def test_token_bucket_adjust_never_exceeds_capacity():
+    bucket = TokenBucket(per_minute=100)
+    bucket.take(50, now=bucket.updated)
+    bucket.adjust(-30)
+    assert bucket.tokens == pytest.approx(20)
+    bucket.adjust(500)
+    assert bucket.tokens == 100
+
+
+def test_reconcile_returns_overestimated_tokens():
+    llm_scheduler = scheduler()
+    llm_scheduler.tokens.take(1000, now=llm_scheduler.tokens.updated)
+    before = llm_scheduler.tokens.tokens
+    llm_scheduler.reconcile(estimated_tokens=1000, actual_tokens=400)
+    assert llm_scheduler.tokens.tokens == pytest.approx(before + 600)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens(["a" * 400, "b" * 400], expected_completion_tokens=50) == 250
+
+
+def test_call_retries_retryable_errors():
+    llm_scheduler = scheduler()
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ProviderError(503 if len(attempts) == 1 else 429)
+        return "ok"
+
+    assert llm_scheduler.call(flaky, 10) == "ok"
+    assert len(attempts) == 3
+    assert llm_scheduler.snapshot()["retries"] == 2
+
+
+def test_call_does_not_retry_client_errors():
+    llm_scheduler = scheduler()
+    attempts = []
+
+    def bad_request():
+        attempts.append(1)
+        raise ProviderError(400)
+
+    with pytest.raises(ProviderError):
+        llm_scheduler.call(bad_request, 10)
+    assert len(attempts) == 1
+
+
+def test_stream_retries_before_the_first_chunk_only():
+    llm_scheduler = scheduler()
+    opened = []
+
+    def open_stream():
+        opened.append(1)
+        if len(opened) == 1:
+            raise ProviderError(429)
+        yield "a"
+        if len(opened) == 2:
+            raise ProviderError(503)
+        yield "b"
+
+    chunks = []
+    with pytest.raises(ProviderError):
+        for chunk in llm_scheduler.stream(open_stream, 10):
+            chunks.append(chunk)
+    assert len(opened) == 2
+    assert chunks == ["a"]
+
+
+def test_astream_retries_before_the_first_chunk():
+    llm_scheduler = scheduler()
+    opened = []
+
+    async def open_stream():
+        opened.append(1)
+        if len(opened) == 1:
+            raise ProviderError(503)
+        for chunk in ("a", "b"):
+            yield chunk
+
+    async def collect():
+        return [chunk async for chunk in llm_scheduler.astream(open_stream, 10)]
+
+    assert asyncio.run(collect()) == ["a", "b"]
+    assert len(opened) == 2
+
+
+def test_interactive_calls_are_admitted_before_queued_batch_calls():
+    llm_scheduler = scheduler()
+    batch = llm_scheduler._enqueue(BATCH)
+    interactive = llm_scheduler._enqueue(INTERACTIVE)
+    assert llm_scheduler._try_admit(batch, 10) > 0
+    assert llm_scheduler._try_admit(interactive, 10) == 0
+    assert llm_scheduler._try_admit(batch, 10) == 0
@@ -0,0 +1,42 @@
+import base64
+import struct
+
+import chess
+import pytest
+
+from move_codes import board_at, continuation_san, decode_moves, slice_codes
+
+ITALIAN = "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4"
+UCI = ["d2d3", "f8c5", "e1g1", "d7d6"]
+
+
+def encode(uci_moves):
+    # Same layout as the pre-processor's utils/move_codes.encode_moves
+    codes = [move.from_square | move.to_square << 6 | (move.promotion or 0) << 12
+             for move in map(chess.Move.from_uci, uci_moves)]
+    return base64.b64encode(struct.pack(f"<{len(codes)}H", *codes)).decode("ascii")
+
+
+def test_decode_and_slice():
+    encoded = encode(UCI)
+    assert [move.uci() for move in decode_moves(encoded)] == UCI
+    assert [move.uci() for move in decode_moves(slice_codes(encoded, 1, 2))] == UCI[1:3]
+
+
+def test_continuation_san_from_the_position():
+    assert continuation_san(ITALIAN, encode(UCI)) == "4. d3 Bc5 5. O-O d6"
+    assert continuation_san(ITALIAN, encode(UCI), plies=2) == "4. d3 Bc5"
+
+
+def test_promotion_round_trip():
+    fen = "8/P6k/8/8/8/8/8/K7 w - - 0 1"
+    assert continuation_san(fen, encode(["a7a8n"])) == "1. a8=N"
+
+
+def test_illegal_continuation_raises():
+    with pytest.raises(ValueError):
+        continuation_san(chess.STARTING_FEN, encode(UCI))
+
+
+def test_board_at():
+    assert board_at(encode(UCI), 2, ITALIAN).fen().startswith("r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/3P1N2")
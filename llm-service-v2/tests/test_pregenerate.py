@@ -0,0 +1,38 @@
+import json
+
+from pregenerate import rank_positions
+from strategy_store import position_key, ranking_key
+
+ITALIAN = "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4"
+SICILIAN = "rnbqkbnr/pp1ppppp/8/2p5/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2"
+
+
+def write_records(path, records):
+    path.write_text("\n".join(json.dumps(record) for record in records) + "\n")
+    return str(path)
+
+
+def test_ranking_key_ignores_the_continuation_and_move_counters():
+    assert ranking_key(ITALIAN, "White") == ranking_key(ITALIAN.replace("4 4", "0 9"), "white")
+    assert ranking_key(ITALIAN, "white") != ranking_key(ITALIAN, "black")
+
+
+def test_positions_are_ranked_across_continuations(tmp_path):
+    # Every Italian occurrence has its own continuation; the Sicilian repeats one continuation twice
+    records = [{"fen": ITALIAN, "moves": moves, "side": "white"}
+               for moves in ("4. d3 Bc5", "4. Ng5 d5", "4. d4 exd4", "4. d3 Be7", "4. d3 Bc5")]
+    records += [{"fen": SICILIAN, "moves": "2... d6 3. d4", "side": "white"}] * 2
+    ranked = rank_positions(write_records(tmp_path / "records.ndjson", records), ["white"], top=1)
+
+    assert len(ranked) == 1
+    candidate, count = ranked[0]
+    assert count == 5
+    assert candidate["fen"] == ITALIAN and candidate["moves"] == "4. d3 Bc5"
+
+
+def test_several_continuations_per_position(tmp_path):
+    records = [{"fen": ITALIAN, "moves": moves, "side": "white"} for moves in ("4. d3 Bc5", "4. Ng5 d5", "4. d3 Bc5")]
+    ranked = rank_positions(write_records(tmp_path / "records.ndjson", records), ["white"], top=1, continuations=2)
+    assert [position_key(candidate["fen"], "white", candidate["moves"]) for candidate, _ in ranked] == [
+        position_key(ITALIAN, "white", "4. d3 Bc5"), position_key(ITALIAN, "white", "4. Ng5 d5")]
+    assert [count for _, count in ranked] == [3, 3]
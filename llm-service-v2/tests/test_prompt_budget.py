@@ -0,0 +1,56 @@
+from langchain_core.prompts import ChatPromptTemplate
+
+import instrumentation
+from agents.move_analyzer import analyze_moves
+from prompt_budget import count_prompt_tokens, encode_structure_insights, fit_prompt_to_budget, truncate_to_tokens
+
+FEN = "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4"
+MOVES = ("4. d3 Bc5 5. O-O d6 6. c3 O-O 7. Re1 a6 8. Bb3 Ba7 9. h3 h6 10. Nbd2 Re8 "
+         "11. Nf1 Be6 12. Bc2 d5 13. exd5 Bxd5 14. Ng3 Qd6")
+PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "Static instructions."),
+    ("user", "FEN {fen}\nMoves {pgn}\nStructure:\n{structure}"),
+])
+
+
+def test_prompt_within_budget_is_untouched():
+    structure = analyze_moves(FEN, MOVES)
+    inputs = fit_prompt_to_budget(PROMPT, {"fen": FEN, "pgn": MOVES}, structure, node="test", budget=10000)
+    assert inputs["pgn"] == MOVES
+    assert inputs["structure"] == encode_structure_insights(structure)
+
+
+def test_prompt_is_shrunk_to_budget():
+    structure = analyze_moves(FEN, MOVES)
+    inputs = fit_prompt_to_budget(PROMPT, {"fen": FEN, "pgn": MOVES}, structure, node="test",
+                                  truncatable=("structure", "pgn"), budget=80)
+    assert count_prompt_tokens(PROMPT, inputs) <= 80
+    assert inputs["fen"] == FEN
+
+
+def test_truncate_to_tokens():
+    assert truncate_to_tokens("anything", 0) == ""
+    assert truncate_to_tokens("short", 100) == "short"
+
+
+def test_system_message_counts_against_the_budget_and_overruns_are_reported(capsys):
+    structure = analyze_moves(FEN, MOVES)
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", "Static instructions. " * 400),
+        ("user", "FEN {fen}\nMoves {pgn}\nStrategy {strategy}\nStructure:\n{structure}"),
+    ])
+    before = dict(instrumentation._prompts)
+    inputs = fit_prompt_to_budget(prompt, {"fen": FEN, "pgn": MOVES, "strategy": "Keep the e5 pawn"}, structure,
+                                  node="test_overrun", truncatable=("structure", "pgn"), budget=1000)
+
+    assert inputs["pgn"] == "" and inputs["strategy"] == "Keep the e5 pawn"
+    assert "test_overrun" in capsys.readouterr().out
+    assert instrumentation._prompts[("test_overrun", "over_budget")] == before.get(("test_overrun", "over_budget"), 0) + 1
+    assert instrumentation._prompt_tokens["test_overrun"] == count_prompt_tokens(prompt, inputs)
+
+
+def test_prompts_within_budget_are_recorded():
+    structure = analyze_moves(FEN, MOVES)
+    fit_prompt_to_budget(PROMPT, {"fen": FEN, "pgn": MOVES}, structure, node="test_within", budget=10000)
+    assert instrumentation._prompts[("test_within", "within_budget")] >= 1
+    assert 'prompts_total{node="test_within",result="within_budget"}' in instrumentation.render_prometheus()
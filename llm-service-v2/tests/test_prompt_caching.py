@@ -0,0 +1,114 @@
+from collections import OrderedDict
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_openai import ChatOpenAI
+
+import openai_stub_server
+from agents.idea_synthesizer import BATCH_PROMPT, SYNTHESIS_PROMPT, _game_block
+from agents.move_analyzer import analyze_moves
+from agents.position_feature_extractor import position_feature_extractor_tool
+from agents.verifier import CORRECTION_PROMPT, CRITIQUE_PROMPT
+from aggregator import _aggregation_messages
+from instrumentation import _llm_tokens, node_span
+from llm_clients import ScheduledChatModel
+from llm_scheduler import LLMScheduler
+from prompt_budget import encode_position_features, fit_prompt_to_budget
+
+# The stub caches in steps of this many tokens, from this size on; far below the provider's
+# minimum so the short static prefixes show up as cache hits
+STUB_CACHE_TOKENS = 16
+
+REQUESTS = [
+    ("r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4",
+     "4. d3 Bc5 5. O-O d6 6. c3 O-O 7. Re1 a6 8. Bb3 Ba7 9. h3 h6", "white"),
+    ("rnbqk2r/pppp1ppp/4pn2/8/1bPP4/2N5/PP2PPPP/R1BQKBNR w KQkq - 2 4",
+     "4. e3 O-O 5. Bd3 d5 6. Nf3 c5 7. O-O dxc4 8. Bxc4 Nbd7", "white"),
+    ("r1bqkbnr/pp1ppppp/2n5/2p5/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+     "3. Bb5 g6 4. O-O Bg7 5. Re1 Nf6 6. c3 O-O 7. d4 cxd4 8. cxd4 d5", "black"),
+]
+STRATEGIES = [
+    "Strategic Goal\nPressure the e5 pawn.\n- Reroute the knight via d2-f1-g3\n- Prepare d4",
+    "Strategic Goal\nCounterattack on the queenside.\n- Push ...b5-b4\n- Open the c-file for the rooks",
+]
+
+
+def _pairs(messages) -> list:
+    # The aggregator passes (role, text) tuples instead of messages
+    return [({"human": "user"}.get(message.type, message.type), str(message.content))
+            if hasattr(message, "type") else message for message in messages]
+
+
+def render_prompts() -> dict:
+    """
+    (role, content) messages of every prompt kind for each sample request, rendered like the graph does.
+    """
+    prompts = {kind: [] for kind in ("idea_synthesizer", "batch_idea_synthesizer", "verifier_critique",
+                                     "verifier_correction", "aggregate")}
+    states = []
+    for number, (fen, moves, side) in enumerate(REQUESTS):
+        structure = analyze_moves(fen, moves)
+        features = position_feature_extractor_tool.invoke({"state": {"fen": fen}}).position_features
+        states.append({"fen": fen, "moves": moves, "side": side, "structure_insights": structure,
+                       "position_features": features})
+        strategy = STRATEGIES[number % len(STRATEGIES)]
+
+        inputs = fit_prompt_to_budget(SYNTHESIS_PROMPT, {
+            "side": side, "position": encode_position_features(features), "fen": fen, "pgn": moves,
+        }, structure, node="idea_synthesizer", truncatable=("structure", "pgn"))
+        prompts["idea_synthesizer"].append(SYNTHESIS_PROMPT.format_messages(**inputs))
+
+        inputs = fit_prompt_to_budget(CRITIQUE_PROMPT, {
+            "fen": fen, "side": side, "position": encode_position_features(features), "moves": moves,
+            "strategy": strategy,
+        }, structure, node="verifier", truncatable=("structure", "moves"))
+        prompts["verifier_critique"].append(CRITIQUE_PROMPT.format_messages(**inputs))
+        prompts["verifier_correction"].append(CORRECTION_PROMPT.format_messages(
+            strategy=strategy, issues=f"Claims a plan for {side} that does not fit {fen}"))
+
+    for count in range(1, len(states) + 1):
+        games = "\n".join(f"GAME {number} - {_game_block(state)}"
+                          for number, state in enumerate(states[:count], start=1))
+        prompts["batch_idea_synthesizer"].append(BATCH_PROMPT.format_messages(games=games))
+        prompts["aggregate"].append(_aggregation_messages(STRATEGIES[:1] * count))
+    return {kind: [_pairs(messages) for messages in rendered] for kind, rendered in prompts.items()}
+
+
+@pytest.fixture
+def stub_llm(monkeypatch):
+    monkeypatch.setattr(openai_stub_server, "STUB_LATENCY_SECONDS", 0.0)
+    monkeypatch.setattr(openai_stub_server, "STUB_RPM", 100000)
+    monkeypatch.setattr(openai_stub_server, "STUB_TPM", 100000000)
+    monkeypatch.setattr(openai_stub_server, "STUB_CACHE_MIN_TOKENS", STUB_CACHE_TOKENS)
+    monkeypatch.setattr(openai_stub_server, "STUB_CACHE_INCREMENT_TOKENS", STUB_CACHE_TOKENS)
+    monkeypatch.setattr(openai_stub_server, "window", openai_stub_server.window.__class__())
+    monkeypatch.setattr(openai_stub_server, "prompt_cache", OrderedDict())
+    inner = ChatOpenAI(model="stub", api_key="stub", base_url="http://stub/v1", max_retries=0,
+                       http_client=TestClient(openai_stub_server.app, base_url="http://stub"))
+    return ScheduledChatModel(inner=inner, scheduler=LLMScheduler(requests_per_minute=6000,
+                                                                   tokens_per_minute=600000))
+
+
+def test_static_prefix_is_stable_and_request_data_comes_last():
+    request_data = [value for fen, moves, side in REQUESTS for value in (fen, moves)] + STRATEGIES
+    for kind, rendered in render_prompts().items():
+        assert all(messages[0][0] == "system" and len(messages) == 2 for messages in rendered), kind
+        systems = {messages[0][1] for messages in rendered}
+        assert len(systems) == 1, kind
+        system = systems.pop()
+        assert not [value for value in request_data if value in system], kind
+
+
+def test_stub_reports_cached_static_prefix(stub_llm):
+    for kind, rendered in render_prompts().items():
+        system = openai_stub_server._prompt_text([{"role": "system", "content": rendered[0][0][1]}])
+        cached = []
+        with node_span(kind):
+            for messages in rendered:
+                before = _llm_tokens[(kind, "cached")]
+                stub_llm.invoke(messages)
+                cached.append(_llm_tokens[(kind, "cached")] - before)
+
+        # Each later request is served at least its whole static prefix from the cache
+        assert cached[0] == 0, kind
+        assert all(tokens >= len(system) // 4 - STUB_CACHE_TOKENS for tokens in cached[1:]), (kind, cached)
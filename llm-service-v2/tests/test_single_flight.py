@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from single_flight import SingleFlight, aggregate_key, analysis_key, normalize_moves
+
+FEN = "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4"
+
+
+def test_analysis_key_normalizes_formatting_only():
+    key = analysis_key(FEN, "4. d3 Bc5 5. O-O", "white", "model")
+    assert key == analysis_key("  " + FEN, "4.d3 Bc5  5.O-O 1-0", "White", "model")
+    assert key != analysis_key(FEN, "4. d3 Bc5 5. c3", "white", "model")
+    assert key != analysis_key(FEN, "4. d3 Bc5 5. O-O", "white", "other-model")
+
+
+def test_normalize_moves():
+    assert normalize_moves("1. e4 e5 2. Nf3 1... Nc6 1/2-1/2") == "e4 e5 Nf3 Nc6"
+
+
+def test_aggregate_key_depends_on_order():
+    assert aggregate_key(["a", "b"], "model") != aggregate_key(["b", "a"], "model")
+
+
+def test_concurrent_identical_calls_share_one_computation():
+    lookups = []
+    flight = SingleFlight("test", on_lookup=lambda name, coalesced: lookups.append(coalesced))
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def run():
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+        return results, len(flight)
+
+    results, inflight_after = asyncio.run(run())
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert lookups == [False, True, True, True, True]
+    assert inflight_after == 0
+
+
+def test_errors_are_shared_and_not_cached():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("provider down")
+
+    async def run():
+        results = await asyncio.gather(flight.do("key", failing), flight.do("key", failing), return_exceptions=True)
+        with pytest.raises(RuntimeError):
+            await flight.do("key", failing)
+        return results
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(calls) == 2
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_work():
+    flight = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def run():
+        first = asyncio.ensure_future(flight.do("key", work))
+        second = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "done"
+
+
+def test_claim_and_resolve():
+    flight = SingleFlight("test")
+
+    async def run():
+        leader_future, leader = flight.claim("key")
+        follower_future, follower = flight.claim("key")
+        flight.resolve("key", "batched")
+        return leader, follower, await follower_future, len(flight)
+
+    assert asyncio.run(run()) == (True, False, "batched", 0)
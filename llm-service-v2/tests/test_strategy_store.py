@@ -0,0 +1,41 @@
+from strategy_store import StrategyStore, open_for_writing, position_key, publish, stored_keys, write_strategy
+
+FEN = "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4"
+MOVES = "4. d3 Bc5 5. O-O d6"
+
+
+def entry(moves=MOVES, model="model-a", strategy="plan"):
+    return {"fen": FEN, "side": "white", "moves": moves, "frequency": 3, "model": model,
+            "formatted_strategy": strategy}
+
+
+def test_position_key_ignores_move_counters_and_move_formatting():
+    assert position_key(FEN, "White", MOVES) == position_key(FEN.replace("4 4", "0 12"), "white", "4.d3 Bc5 5.O-O d6 *")
+
+
+def test_position_key_depends_on_the_continuation():
+    assert position_key(FEN, "white", MOVES) != position_key(FEN, "white", "4. Ng5 d5")
+
+
+def test_position_key_uses_a_bounded_continuation_prefix():
+    long_moves = " ".join(["Nf3 Nf6 Ng1 Ng8"] * 10)
+    assert position_key(FEN, "white", long_moves) == position_key(FEN, "white", long_moves + " e4")
+
+
+def test_store_serves_only_the_same_continuation_and_model(tmp_path):
+    working, published = str(tmp_path / "working.sqlite"), str(tmp_path / "store.sqlite")
+    connection = open_for_writing(working)
+    write_strategy(connection, entry())
+    publish(connection, published)
+    store = StrategyStore(published)
+
+    assert store.get(FEN, "white", MOVES, "model-a")["formatted_strategy"] == "plan"
+    assert store.get(FEN, "white", "4. Ng5 d5", "model-a") is None
+    assert store.get(FEN, "white", MOVES, "model-b") is None
+
+
+def test_stored_keys_are_per_model(tmp_path):
+    connection = open_for_writing(str(tmp_path / "working.sqlite"))
+    write_strategy(connection, entry())
+    assert list(stored_keys(connection, "model-a")) == [position_key(FEN, "white", MOVES)]
+    assert list(stored_keys(connection, "model-b")) == []
@@ -0,0 +1,81 @@
+import asyncio
+import importlib
+import os
+import time
+from typing import Dict
+
+from instrumentation import reset_node_metrics
+
+# WARMUP=0 skips the startup warm-up: the service is ready at once and the first requests pay for it
+WARMUP = os.getenv("WARMUP", "1") == "1"
+# Keep-alive connections opened per LLM client pool during warm-up
+WARMUP_CONNECTIONS = int(os.getenv("WARMUP_CONNECTIONS", "4"))
+
+# Short continuation run through the analysis graph to exercise the board analysis code paths
+WARMUP_POSITION = {
+    "fen": "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+    "moves": "3. Bb5 a6 4. Ba4 Nf6 5. O-O Be7",
+    "side": "white",
+}
+
+_status = {"ready": not WARMUP, "started": time.monotonic(), "seconds": None, "steps": {}, "errors": {}}
+
+
+def _step(name: str, fn):
+    start = time.perf_counter()
+    try:
+        return fn()
+    except Exception as e:
+        _status["errors"][name] = str(e)
+    finally:
+        _status["steps"][name] = round(time.perf_counter() - start, 3)
+
+
+def _load_pipeline():
+    """
+    Imports the request pipeline (langchain, langgraph, openai) and prepares
+    everything a first request would otherwise build lazily.
+    """
+    strategy_generator = _step("import_pipeline", lambda: importlib.import_module("strategy_generator"))
+    _step("import_aggregator", lambda: importlib.import_module("aggregator"))
+    if strategy_generator is None:
+        return
+    _step("compile_graphs", lambda: (strategy_generator.strategy_graph(), strategy_generator.analysis_graph()))
+    _step("analysis_dry_run", lambda: strategy_generator.analysis_graph().invoke(dict(WARMUP_POSITION)))
+    # Keep the dry run out of the node latency metrics and the /metrics histograms
+    reset_node_metrics()
+
+    from prompt_budget import count_tokens
+    # Loads the tokenizer's BPE ranks (a download on a fresh container)
+    _step("tokenizer", lambda: count_tokens("warm-up"))
+
+
+async def warm_up():
+    """
+    Startup hook: loads the pipeline off the event loop, then pre-opens the LLM HTTP
+    connection pools. Failed steps are reported by `readiness` but do not block readiness,
+    since every step is retried lazily by the first request that needs it.
+    """
+    if _status["ready"]:
+        return
+    await asyncio.to_thread(_load_pipeline)
+
+    from llm_clients import open_connection_pools
+    start = time.perf_counter()
+    try:
+        await open_connection_pools(WARMUP_CONNECTIONS)
+    except Exception as e:
+        _status["errors"]["connection_pools"] = str(e)
+    _status["steps"]["connection_pools"] = round(time.perf_counter() - start, 3)
+
+    _status["seconds"] = round(time.monotonic() - _status["started"], 3)
+    _status["ready"] = True
+
+
+def readiness() -> Dict:
+    return {
+        "ready": _status["ready"],
+        "warmup_seconds": _status["seconds"],
+        "steps": dict(_status["steps"]),
+        "errors": dict(_status["errors"]),
+    }
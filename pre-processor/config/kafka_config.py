@@ -17,6 +17,13 @@ def get_kafka_topic_from_env():
     """
     return os.getenv('KAFKA_TOPIC', 'chess_positions')
 
+def get_kafka_partitions_from_env():
+    """
+    Reads the number of topic partitions messages are spread over; 0 leaves the choice
+    to the producer's default partitioner.
+    """
+    return int(os.getenv('KAFKA_TOPIC_PARTITIONS', '0'))
+
 def create_kafka_producer():
     """
     Creates and returns a Kafka Producer and topic using environment-based config.
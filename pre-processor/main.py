@@ -1,7 +1,10 @@
 import argparse
-from services.pgn_parser import process_pgn_file
-from services.kafka_publisher import KafkaPublisher
+from services.pipeline import IngestPipeline
+from services.pgn_parser import CHANGE_DISTANCE, POSITION_BUDGET
+from services.kafka_publisher import KafkaPublisher, KafkaPublisherPool, PartitionMetrics
 from services.api_publisher import APIPublisher
+from utils.position_vectorizer import DENSE_WEIGHTS, VectorSidecarWriter
+from utils.opening_cache import OPENING_CACHE_PLIES, OPENING_CACHE_SIZE, OpeningCache
 import redis
 from dotenv import load_dotenv
 import os
@@ -19,17 +22,43 @@ def main():
     parser.add_argument('--method', choices=['kafka', 'api'], default='kafka', 
                         help='Publishing method (default: kafka)')
     parser.add_argument('--batch-size', type=int, default=100, 
-                        help='Number of games to process in a batch')
+                        help='Number of games published per batch (one producer flush per batch)')
+    parser.add_argument('--producers', type=int, default=1,
+                        help='Kafka producer threads, each with its own producer (kafka method)')
+    parser.add_argument('--partitions', type=int, default=None,
+                        help='Partitions to spread games over by hashed game ID '
+                             '(default: KAFKA_TOPIC_PARTITIONS, 0 uses the default partitioner)')
     parser.add_argument('--position-freq', type=int, default=5, 
-                        help='Extract position every N moves')
+                        help='Extract position every N moves (interval sampler)')
+    parser.add_argument('--sampler', choices=['interval', 'change'], default='interval',
+                        help='Position sampling: fixed interval, or change points (pawn structure, material, '
+                             'castling, distance from the last kept position)')
+    parser.add_argument('--position-budget', type=int, default=POSITION_BUDGET,
+                        help='Max positions per game (change sampler)')
+    parser.add_argument('--change-distance', type=int, default=CHANGE_DISTANCE,
+                        help='Piece-square bits that must differ from the last kept position (change sampler)')
     parser.add_argument('--max-games', type=int, default=200000,
                         help="Max number of games that you want it to read from the pgn file")
+    parser.add_argument('--queue-depth', type=int, default=64,
+                        help='Capacity of each queue between the read, parse, convert and publish stages')
+    parser.add_argument('--report-interval', type=float, default=10.0,
+                        help='Seconds between queue occupancy reports (0 disables them)')
+    parser.add_argument('--opening-cache-size', type=int, default=OPENING_CACHE_SIZE,
+                        help='Opening prefixes cached to skip replaying shared openings (0 disables the cache)')
+    parser.add_argument('--opening-cache-plies', type=int, default=OPENING_CACHE_PLIES,
+                        help='Deepest opening prefix cached')
+    parser.add_argument('--vectors', type=str, default=None,
+                        help='Append fixed-length position vectors to this binary sidecar file')
+    parser.add_argument('--no-dense-features', action='store_true',
+                        help='Write only the 768-bit piece-square part of each vector')
     
     args = parser.parse_args()
     
     # Choose publisher based on method
-    if args.method == 'kafka':
-        publisher = KafkaPublisher()
+    if args.method == 'kafka' and args.producers > 1:
+        publisher = KafkaPublisherPool(args.producers, args.partitions)
+    elif args.method == 'kafka':
+        publisher = KafkaPublisher(args.partitions, PartitionMetrics())
     else:
         publisher = APIPublisher()
 
@@ -42,22 +71,23 @@ def main():
     redis_key = "chess_pgndata:games_published"
     games_already_processed = int(redis_client.get(redis_key) or 0)
     
-    # Process games
+    vector_writer = None
+    if args.vectors:
+        vector_writer = VectorSidecarWriter(args.vectors, weights=None if args.no_dense_features else DENSE_WEIGHTS)
+
+    sampler_options = None
+    if args.sampler == 'change':
+        sampler_options = {'position_budget': args.position_budget, 'change_distance': args.change_distance}
+    opening_cache = OpeningCache(args.opening_cache_plies, args.opening_cache_size) if args.opening_cache_size else None
+
+    # Process games: read, parse, convert and publish run as concurrent stages
+    pipeline = IngestPipeline(args.pgn_file, publisher, batch_size=args.batch_size, position_frequency=args.position_freq,
+                              max_games=args.max_games, skip_games=games_already_processed, queue_depth=args.queue_depth,
+                              redis_client=redis_client, redis_key=redis_key, report_interval=args.report_interval,
+                              vector_writer=vector_writer, sampler=args.sampler, sampler_options=sampler_options,
+                              opening_cache=opening_cache)
     try:
-        batch = []
-        for game_data in process_pgn_file(args.pgn_file, position_frequency= args.position_freq, max_games=args.max_games,
-                                           skip_games=games_already_processed, redis_client=redis_client, redis_key=redis_key):
-            batch.append(game_data)
-            
-            # Publish batch when size is reached
-            if len(batch) >= args.batch_size:
-                for game in batch:
-                    publisher.publish_game_data(game)
-                batch = []
-        
-        # Publish any remaining games
-        for game in batch:
-            publisher.publish_game_data(game)
+        pipeline.run()
     
     except Exception as e:
         print(f"Error processing PGN file: {e}")
@@ -66,6 +96,8 @@ def main():
         # Cleanup if needed
         if hasattr(publisher, 'close'):
             publisher.close()
+        if vector_writer:
+            vector_writer.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,56 @@
+# Measures the opening-prefix replay cache on a PGN dump: hit rate, plies skipped, DTOs
+# reused and position extraction time with and without the cache (outputs must match)
+
+import argparse
+import contextlib
+import io
+import time
+
+from services.pgn_parser import extract_positions, parse_game, read_game_texts
+from utils.opening_cache import OPENING_CACHE_PLIES, OPENING_CACHE_SIZE, OpeningCache
+
+
+def load_games(pgn_path, max_games):
+    games = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for game_text in read_game_texts(pgn_path):
+            parsed = parse_game(game_text)
+            if parsed:
+                games.append((parsed[0], parsed[1]["gameId"]))
+            if len(games) >= max_games:
+                break
+    return games
+
+
+def extract_all(games, position_frequency, cache):
+    start = time.perf_counter()
+    positions = [extract_positions(game, game_id, position_frequency, cache=cache) for game, game_id in games]
+    return positions, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Opening-prefix replay cache hit rate and time saved")
+    parser.add_argument("pgn_file", help="Path to the PGN file")
+    parser.add_argument("--max-games", type=int, default=20000)
+    parser.add_argument("--position-freq", type=int, default=5)
+    parser.add_argument("--plies", type=int, default=OPENING_CACHE_PLIES, help="Deepest prefix cached")
+    parser.add_argument("--size", type=int, default=OPENING_CACHE_SIZE, help="Prefixes kept")
+    args = parser.parse_args()
+
+    games = load_games(args.pgn_file, args.max_games)
+    print(f"{len(games)} games (parsing excluded from the timings)")
+
+    baseline, uncached = extract_all(games, args.position_freq, None)
+    cache = OpeningCache(args.plies, args.size)
+    cached_positions, cached = extract_all(games, args.position_freq, cache)
+    if cached_positions != baseline:
+        raise SystemExit("Cached extraction differs from the uncached one")
+
+    stats = cache.stats
+    print(f"hit rate:       {cache.hit_rate():.1%} of games resumed from a cached prefix")
+    print(f"plies skipped:  {stats['plies_skipped']} ({stats['plies_skipped'] / len(games):.1f} per game)")
+    print(f"DTOs reused:    {stats['dtos_reused']} of {sum(len(positions) for positions in baseline)}")
+    print(f"cache entries:  {len(cache.entries)}")
+    print(f"without cache:  {uncached * 1000:8.1f} ms ({uncached / len(games) * 1e6:.0f} us/game)")
+    print(f"with cache:     {cached * 1000:8.1f} ms ({cached / len(games) * 1e6:.0f} us/game)")
+    print(f"time saved:     {1 - cached / uncached:.1%}")
@@ -0,0 +1,54 @@
+# Benchmarks the block-based PGN splitter against the former line loop
+# (correctness on irregular files is covered by tests/test_pgn_splitter.py)
+
+import argparse
+import os
+import time
+
+from services.pgn_parser import read_game_texts, split_games
+
+
+def line_loop_game_texts(pgn_file_path):
+    """
+    The former splitter: strips every line and cuts a game at every second blank line.
+    """
+    with open(pgn_file_path, 'r', encoding='utf-8') as file:
+        current_game = []
+        line_breaks = 0
+        for line in file:
+            line = line.strip()
+            if not line:
+                line_breaks += 1
+                if line_breaks == 2:
+                    if current_game:
+                        yield '\n'.join(current_game)
+                    current_game = []
+                    line_breaks = 0
+            else:
+                current_game.append(line)
+
+
+def throughput(label, games, size):
+    start = time.perf_counter()
+    count = sum(1 for _ in games)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28}{count:>9} games {elapsed:>8.3f}s {size / elapsed / 1e6:>9.1f} MB/s")
+    return count
+
+
+def benchmark(pgn_file_path, repeat):
+    size = os.path.getsize(pgn_file_path)
+    print(f"{pgn_file_path}: {size / 1e6:.1f} MB")
+    for _ in range(repeat):
+        throughput("line loop", line_loop_game_texts(pgn_file_path), size)
+        throughput("blocks (memoryview only)", split_games(pgn_file_path), size)
+        throughput("blocks + decode", read_game_texts(pgn_file_path), size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PGN splitter throughput (MB/s)")
+    parser.add_argument("pgn_file", help="PGN file to benchmark")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    benchmark(args.pgn_file, args.repeat)
@@ -0,0 +1,146 @@
+# Compares the fixed-interval and change-point position samplers on a PGN file:
+# stored rows per game, coverage of each game's positions, and similarity search recall
+
+import argparse
+import contextlib
+import io
+
+import chess
+import numpy as np
+
+from services.pgn_parser import (CHANGE_DISTANCE, MAX_MOVE, MIN_MOVE, POSITION_BUDGET, parse_game, read_game_texts,
+                                 sample_change_points, sample_interval)
+from utils.position_vectorizer import board_to_words, hamming_distances
+
+
+def window_vectors(game):
+    """
+    Packed vectors of every position between MIN_MOVE and MAX_MOVE, keyed by ply.
+    """
+    vectors = {}
+    board = game.board()
+    for ply, move in enumerate(game.mainline_moves(), start=1):
+        board.push(move)
+        if ply >= MIN_MOVE:
+            vectors[ply] = board_to_words(board)
+        if ply >= MAX_MOVE:
+            break
+    return vectors
+
+
+def load_games(pgn_path, max_games, position_frequency, position_budget, change_distance):
+    games = []
+    # parse_game reports skipped games on stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        for game_text in read_game_texts(pgn_path):
+            parsed = parse_game(game_text)
+            if parsed is None:
+                continue
+            game = parsed[0]
+            vectors = window_vectors(game)
+            if not vectors:
+                continue
+            games.append({
+                "vectors": vectors,
+                "interval": [ply for ply, _ in sample_interval(game, position_frequency)],
+                "change": [ply for ply, _ in sample_change_points(game, position_budget, change_distance)],
+            })
+            if len(games) >= max_games:
+                break
+    return games
+
+
+def stored_matrix(games, key):
+    """
+    Vectors of the stored rows of all games, with the game index of each row.
+    """
+    rows, owners = [], []
+    for index, game in enumerate(games):
+        plies = game["vectors"].keys() if key == "all" else game[key]
+        for ply in plies:
+            rows.append(game["vectors"][ply])
+            owners.append(index)
+    return np.array(rows, dtype=np.uint64), np.array(owners)
+
+
+def game_distances(query, matrix, owners, game_count):
+    """
+    Distance from the query to each game: the nearest of that game's stored rows.
+    """
+    distances = np.full(game_count, np.iinfo(np.int32).max, dtype=np.int32)
+    np.minimum.at(distances, owners, hamming_distances(query, matrix))
+    return distances
+
+
+def coverage(games, key):
+    """
+    Distance from every position in a game's window to the nearest row stored for it.
+    """
+    gaps = []
+    for game in games:
+        stored = np.array([game["vectors"][ply] for ply in game[key]], dtype=np.uint64)
+        for words in game["vectors"].values():
+            gaps.append(hamming_distances(words, stored).min() if len(stored) else 768)
+    return np.array(gaps)
+
+
+def recall(games, queries, k):
+    """
+    Game-level recall@k against an exhaustive index of every position in the window:
+    the share of each sampler's top-k games whose exhaustive distance is within the
+    true k-th nearest distance (ties included). The query's own game is excluded.
+    """
+    indexes = {key: stored_matrix(games, key) for key in ("all", "interval", "change")}
+    hits = {"interval": [], "change": []}
+    for game_index, words in queries:
+        truth = game_distances(words, *indexes["all"], len(games))
+        truth[game_index] = np.iinfo(np.int32).max
+        threshold = np.partition(truth, k - 1)[k - 1]
+        for key in hits:
+            distances = game_distances(words, *indexes[key], len(games))
+            distances[game_index] = np.iinfo(np.int32).max
+            top = np.argsort(distances, kind="stable")[:k]
+            hits[key].append(np.mean(truth[top] <= threshold))
+    return {key: float(np.mean(values)) for key, values in hits.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the interval and change-point position samplers")
+    parser.add_argument("pgn_file", help="Path to the PGN file")
+    parser.add_argument("--max-games", type=int, default=1000)
+    parser.add_argument("--position-freq", type=int, default=5)
+    parser.add_argument("--position-budget", type=int, default=POSITION_BUDGET)
+    parser.add_argument("--change-distance", type=int, default=CHANGE_DISTANCE)
+    parser.add_argument("--queries", type=int, default=200, help="Query positions drawn from the games")
+    parser.add_argument("--k", type=int, default=10, help="Games retrieved per query")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    games = load_games(args.pgn_file, args.max_games, args.position_freq, args.position_budget, args.change_distance)
+    if len(games) <= args.k:
+        raise SystemExit(f"Need more than {args.k} games, found {len(games)}")
+
+    rng = np.random.default_rng(args.seed)
+    queries = []
+    for game_index in rng.integers(0, len(games), args.queries):
+        vectors = games[game_index]["vectors"]
+        ply = list(vectors)[rng.integers(0, len(vectors))]
+        queries.append((game_index, vectors[ply]))
+
+    print(f"{len(games)} games, {args.queries} queries, k={args.k} (distance: piece-square Hamming)")
+    print(f"{'sampler':<10}{'rows':>9}{'rows/game':>11}{'median':>8}{'gap mean':>10}{'gap p90':>9}")
+    rows = {}
+    for key in ("interval", "change"):
+        per_game = np.array([len(game[key]) for game in games])
+        gaps = coverage(games, key)
+        rows[key] = per_game.sum()
+        print(f"{key:<10}{per_game.sum():>9}{per_game.mean():>11.2f}{np.median(per_game):>8.0f}"
+              f"{gaps.mean():>10.2f}{np.percentile(gaps, 90):>9.0f}")
+    print(f"Row reduction: {1 - rows['change'] / rows['interval']:.1%}")
+
+    for key, value in recall(games, queries, args.k).items():
+        print(f"recall@{args.k} {key:<9} {value:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ class APIPublisher:
         :param base_url: Base URL for API endpoint
         """
         self.base_url = base_url
+        self.session = requests.Session()
     
     def publish_game_data(self, game_data):
         """
@@ -19,7 +20,7 @@ class APIPublisher:
         """
         try:
             headers = {'Content-Type': 'application/json'}
-            response = requests.post(
+            response = self.session.post(
                 self.base_url, 
                 data=json.dumps(game_data), 
                 headers=headers
@@ -33,4 +34,13 @@ class APIPublisher:
                 return False
         except requests.exceptions.RequestException as e:
             print(f"Error publishing to API: {e}")
-            return False
\ No newline at end of file
+            return False
+
+    def publish_batch(self, games):
+        """
+        Publish several games over one reused HTTP connection.
+
+        :param games: List of game data dictionaries
+        :return: Number of games published successfully
+        """
+        return sum(1 for game_data in games if self.publish_game_data(game_data))
\ No newline at end of file
@@ -1,5 +1,9 @@
+import hashlib
 import json
-from config.kafka_config import create_kafka_producer
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config.kafka_config import create_kafka_producer, get_kafka_partitions_from_env
 
 def delivery_report(err, msg):
     """
@@ -13,12 +17,89 @@ def delivery_report(err, msg):
     else:
         print(f'Message delivered to {msg.topic()} [{msg.partition()}]')
 
-class KafkaPublisher:
+def partition_for(game_id, partitions):
+    """
+    Stable partition of a game: a hash of its ID, so every replay of a game lands on the
+    same partition and games spread evenly whatever the players or dates.
+    """
+    digest = hashlib.blake2b(game_id.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % partitions
+
+class PartitionMetrics:
+    """
+    Delivered messages and bytes per partition, from the producers' delivery reports.
+    Shared by all producer threads.
+    """
+
     def __init__(self):
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+        self.messages = {}
+        self.bytes = {}
+        self.failed = 0
+
+    def delivery_report(self, err, msg):
+        with self.lock:
+            if err is not None:
+                self.failed += 1
+                print(f'Message delivery failed: {err}')
+                return
+            partition = msg.partition()
+            self.messages[partition] = self.messages.get(partition, 0) + 1
+            self.bytes[partition] = self.bytes.get(partition, 0) + len(msg.value())
+
+    def skew(self):
+        """
+        Busiest partition's share relative to an even spread (1.0 is perfectly balanced).
+        """
+        with self.lock:
+            counts = list(self.messages.values())
+        if not counts:
+            return 0.0
+        return max(counts) / (sum(counts) / len(counts))
+
+    def report(self):
+        elapsed = time.perf_counter() - self.start
+        with self.lock:
+            partitions = sorted(self.messages)
+            lines = [f"  partition {partition:>3}: {self.messages[partition]:>8} msgs "
+                     f"{self.messages[partition] / elapsed:>8.1f} msgs/s {self.bytes[partition] / elapsed / 1e6:>7.2f} MB/s"
+                     for partition in partitions]
+            failed = self.failed
+        return "\n".join([f"[kafka] {len(partitions)} partitions, skew {self.skew():.2f} (max/mean), "
+                          f"{failed} failed deliveries", *lines])
+
+class KafkaPublisher:
+    def __init__(self, partitions=None, metrics=None):
         """
         Initialize Kafka publisher.
+
+        :param partitions: Partitions to spread games over by hashed game ID
+                           (default KAFKA_TOPIC_PARTITIONS; 0 uses the default partitioner)
+        :param metrics: Optional PartitionMetrics receiving the delivery reports of publish_batch
         """
         self.producer, self.topic = create_kafka_producer()
+        self.partitions = self._available_partitions(get_kafka_partitions_from_env() if partitions is None else partitions)
+        self.metrics = metrics
+
+    def _available_partitions(self, partitions):
+        """
+        Explicit partitions must exist: with fewer on the topic (e.g. auto-created with 1),
+        fall back to the default partitioner rather than failing every message.
+        """
+        if not partitions:
+            return 0
+        try:
+            topic = self.producer.list_topics(self.topic, timeout=10).topics.get(self.topic)
+            available = len(topic.partitions) if topic is not None and topic.error is None else 0
+        except Exception as e:
+            print(f"Could not read partitions of {self.topic}: {e}")
+            return 0
+        if available < partitions:
+            print(f"Topic {self.topic} has {available} partitions, fewer than {partitions}; "
+                  f"using the default partitioner")
+            return 0
+        return partitions
 
     def publish_game_data(self, game_data):
         """
@@ -27,10 +108,8 @@ class KafkaPublisher:
         :param game_data: Game data dictionary
         """
         try:
-            # Generate a unique key (you might want to use game metadata for this)
-            key = game_data['gameMetadata'].get('date', '') + '_' + \
-                  game_data['gameMetadata'].get('whiteName', '') + '_' + \
-                  game_data['gameMetadata'].get('blackName', '')
+            # Content-derived game ID: replays of a game land on the same partition with the same key
+            key = game_data['gameMetadata']['gameId']
 
             # Convert data to JSON string
             value = json.dumps(game_data)
@@ -40,6 +119,7 @@ class KafkaPublisher:
                 self.topic,
                 key=key,
                 value=value,
+                partition=partition_for(key, self.partitions) if self.partitions else -1,
                 callback=delivery_report
             )
 
@@ -50,3 +130,86 @@ class KafkaPublisher:
         except Exception as e:
             print(f"Error publishing to Kafka: {e}")
             return False
+
+
+    def publish_batch(self, games):
+        """
+        Publish several games with a single flush: messages are queued in the producer
+        and delivered together, instead of one blocking round trip per game.
+
+        :param games: List of game data dictionaries
+        :return: Number of games queued successfully
+        """
+        queued = 0
+        callback = self.metrics.delivery_report if self.metrics else delivery_report
+        for game_data in games:
+            try:
+                key = game_data['gameMetadata']['gameId']
+                value = json.dumps(game_data)
+                # librdkafka takes -1 as "use the configured partitioner"
+                partition = partition_for(key, self.partitions) if self.partitions else -1
+                while True:
+                    try:
+                        self.producer.produce(self.topic, key=key, value=value, partition=partition,
+                                              callback=callback)
+                        break
+                    except BufferError:
+                        # Local queue full: serve delivery callbacks to make room
+                        self.producer.poll(0.5)
+                queued += 1
+            except Exception as e:
+                print(f"Error publishing to Kafka: {e}")
+            self.producer.poll(0)
+
+        self.producer.flush()
+        return queued
+
+    def close(self):
+        self.producer.flush()
+
+class KafkaPublisherPool:
+    """
+    Several producer threads, each with its own Producer, fed from the shared work queue
+    of a thread pool. A batch is split between the producers and published once all of
+    them have flushed their share. JSON encoding still takes the GIL; the producers
+    overlap their delivery waits and librdkafka's native work.
+    """
+
+    def __init__(self, producers=2, partitions=None):
+        """
+        :param producers: Producer threads
+        :param partitions: See KafkaPublisher
+        """
+        self.producers = producers
+        self.partitions = partitions
+        self.metrics = PartitionMetrics()
+        self.executor = ThreadPoolExecutor(max_workers=producers, thread_name_prefix='kafka-producer')
+        self.local = threading.local()
+        self.publishers = []
+        self.lock = threading.Lock()
+
+    def _publisher(self):
+        publisher = getattr(self.local, 'publisher', None)
+        if publisher is None:
+            publisher = KafkaPublisher(self.partitions, self.metrics)
+            self.local.publisher = publisher
+            with self.lock:
+                self.publishers.append(publisher)
+        return publisher
+
+    def _publish_share(self, games):
+        return self._publisher().publish_batch(games)
+
+    def publish_batch(self, games):
+        """
+        :param games: List of game data dictionaries
+        :return: Number of games queued successfully
+        """
+        shares = [games[i::self.producers] for i in range(self.producers)]
+        futures = [self.executor.submit(self._publish_share, share) for share in shares if share]
+        return sum(future.result() for future in futures)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        for publisher in self.publishers:
+            publisher.close()
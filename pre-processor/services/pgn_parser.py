@@ -1,26 +1,66 @@
 import io
+import re
+import uuid
 import chess
 import chess.pgn
 from utils.bitboard_converter import convert_position_to_dto
+from utils.move_codes import encode_moves
+from utils.position_vectorizer import board_to_words
 
-def extract_positions_from_game(pgn_text, position_frequency=5):
+# Namespace of the content-derived game IDs (uuid5), so re-ingesting a game yields the same ID
+GAME_ID_NAMESPACE = uuid.UUID("5f0c8a4e-2b7d-4c1e-9a63-0d8e7f14b2a9")
+# Headers that, with the moves, identify a game when the Site header is not a game URL
+IDENTITY_HEADERS = ("Event", "Site", "Date", "UTCDate", "UTCTime", "Round", "White", "Black", "Result")
+# Site URLs that name a single game (lichess game IDs, chess.com game pages); a bare domain
+# such as "https://www.chess.com" is shared by every game of that source
+GAME_URL_PATTERN = re.compile(
+    r"https?://(?:www\.)?(?:lichess\.org/[A-Za-z0-9]{8}(?:[A-Za-z0-9]{4})?"
+    r"|chess\.com/game/(?:live|daily)/\d+)/?")
+
+def game_id_for(headers, game):
     """
-    Extract positions from a chess game with specific PGN format.
+    Stable game ID: uuid5 of the Site header when it is a per-game URL (GAME_URL_PATTERN),
+    otherwise of the identity headers plus the moves in UCI (independent of PGN formatting).
+    """
+    site = headers.get("Site", "").strip()
+    if GAME_URL_PATTERN.fullmatch(site):
+        key = site
+    else:
+        header_part = "|".join(f"{name}={headers.get(name, '').strip()}" for name in IDENTITY_HEADERS)
+        key = header_part + "|" + " ".join(move.uci() for move in game.mainline_moves())
+    return str(uuid.uuid5(GAME_ID_NAMESPACE, key))
+
+def position_id_for(game_id, ply):
+    """
+    Stable position ID: uuid5 of (game ID, ply).
+    """
+    return str(uuid.uuid5(uuid.UUID(game_id), str(ply)))
+
+# Positions are extracted between these plies
+MIN_MOVE = 6
+MAX_MOVE = 80
+
+def parse_game(pgn_text):
+    """
+    Parse a chess game with specific PGN format into the python-chess game and its metadata.
     
     :param pgn_text: Raw PGN text
-    :param position_frequency: Extract a position every N moves
-    :return: Dictionary with game metadata and positions or None
+    :return: (game, game metadata dictionary) or None
     """
-    # Split the input into headers and move text
-    parts = pgn_text.rsplit('\n', 1)
-    min_move = 6
-    max_move = 80
+    # Split the input into headers (leading "[...]" lines) and move text (the rest, which
+    # may span several lines)
+    lines = [line.strip() for line in pgn_text.strip().split('\n')]
+    header_count = 0
+    while header_count < len(lines) and (lines[header_count].startswith('[') or not lines[header_count]):
+        header_count += 1
+    header_lines = [line for line in lines[:header_count] if line]
+    move_lines = [line for line in lines[header_count:] if line]
     
-    if len(parts) < 2:
+    if not header_lines or not move_lines:
         print(f"Incomplete PGN: {pgn_text}")
         return None
     
-    headers_text, moves_text = parts
+    headers_text, moves_text = '\n'.join(header_lines), ' '.join(move_lines)
     
     # Parse headers
     headers = {}
@@ -62,8 +102,11 @@ def extract_positions_from_game(pgn_text, position_frequency=5):
         else:
             trimmed_pgn = raw_pgn
         
+        game_id = game_id_for(headers, game)
+
         # Extract game metadata
         game_data = {
+            "gameId": game_id,
             "result": result,
             "whiteElo": int(headers.get("WhiteElo", "0")),
             "blackElo": int(headers.get("BlackElo", "0")),
@@ -75,7 +118,9 @@ def extract_positions_from_game(pgn_text, position_frequency=5):
             "timeControl": headers.get("TimeControl", ""),
             "opening":headers.get("Opening", ""),
             "site":headers.get("Site", ""),
-            "pgn":trimmed_pgn
+            "pgn":trimmed_pgn,
+            # Every move, untruncated; a position's continuation starts at code moveNumber (its ply)
+            "moveCodes": encode_moves(game.mainline_moves())
         }
         
         # Determine game type
@@ -90,39 +135,235 @@ def extract_positions_from_game(pgn_text, position_frequency=5):
             not any(game.mainline_moves())):
             print(f"Skipping abandoned or incomplete game")
             return None
-        
-        # Extract positions
-        positions = []
-        board = game.board()
-        move_count = 0
-        
-        # Add positions at regular intervals
-        for move in game.mainline_moves():
-            board.push(move)
-            move_count += 1
-
-            # Only extract positions between min_move and max_move
-            if min_move <= move_count <= max_move:
-                if (move_count - min_move) % position_frequency == 0:
-                    positions.append({
-                        "moveNumber": move_count,
-                        **convert_position_to_dto(board)
-                    })
-            
-            # Stop if we've reached the maximum move
-            if move_count >= max_move:
-                break
-        
-        return {
-            "gameMetadata": game_data,
-            "positions": positions
-        }
+
+        return game, game_data
     
     except Exception as e:
         print(f"Error parsing PGN: {e}")
         print(f"Problematic PGN:\n{full_pgn}")
         return None
 
+# Change-point sampling defaults: positions kept per game, and the piece-square distance
+# (squares whose occupant differs, counted per plane) that counts as a new position
+POSITION_BUDGET = 8
+CHANGE_DISTANCE = 12
+
+def sample_interval(game, position_frequency=5, cache=None):
+    """
+    Fixed-interval sampler: every `position_frequency` plies between MIN_MOVE and MAX_MOVE.
+    
+    :param cache: Optional OpeningCache; replay resumes from the deepest cached opening
+                  prefix and shared sampled positions reuse their cached DTOs
+    :return: List of (ply, position DTO without ID)
+    """
+    def is_sampled(ply):
+        return MIN_MOVE <= ply <= MAX_MOVE and (ply - MIN_MOVE) % position_frequency == 0
+
+    samples = []
+    board = game.board()
+    move_count = 0
+    moves = game.mainline_moves()
+    keys = []
+
+    if cache is not None:
+        moves = list(moves)
+        keys = cache.prefix_keys(moves, cache.max_plies, board.fen())
+        move_count, cached_board, samples = cache.resume(keys, is_sampled)
+        if cached_board is not None:
+            board = cached_board
+            moves = moves[move_count:]
+    
+    # Add positions at regular intervals
+    for move in moves:
+        board.push(move)
+        move_count += 1
+
+        # Only extract positions between MIN_MOVE and MAX_MOVE
+        dto = None
+        if is_sampled(move_count):
+            dto = convert_position_to_dto(board)
+            samples.append((move_count, dto))
+
+        if move_count <= len(keys):
+            cache.store(keys[move_count - 1], board, dto)
+        
+        # Stop if we've reached the maximum move
+        if move_count >= MAX_MOVE:
+            break
+
+    return samples
+
+def sample_change_points(game, position_budget=POSITION_BUDGET, change_distance=CHANGE_DISTANCE):
+    """
+    Change-point sampler: between MIN_MOVE and MAX_MOVE, keeps the first position and then
+    a position whenever, compared to the last kept one, the pawn structure or the material
+    changed, the move castled, or more than `change_distance` piece-square bits differ.
+    Structural changes take precedence when more than `position_budget` qualify.
+    
+    :return: List of (ply, position DTO without ID)
+    """
+    candidates = []  # (priority, ply, DTO)
+    last_words = None
+    board = game.board()
+    move_count = 0
+
+    for move in game.mainline_moves():
+        castling = board.is_castling(move)
+        board.push(move)
+        move_count += 1
+        if move_count < MIN_MOVE:
+            continue
+
+        words = board_to_words(board)
+        if last_words is None:
+            priority = 3
+        elif (castling or words[0] != last_words[0] or words[6] != last_words[6]
+              or any(word.bit_count() != last.bit_count() for word, last in zip(words, last_words))):
+            priority = 2
+        elif sum((word ^ last).bit_count() for word, last in zip(words, last_words)) > change_distance:
+            priority = 1
+        else:
+            priority = 0
+
+        if priority:
+            candidates.append((priority, move_count, convert_position_to_dto(board)))
+            last_words = words
+
+        if move_count >= MAX_MOVE:
+            break
+
+    return [(ply, dto) for _, ply, dto in _within_budget(candidates, position_budget)]
+
+def _within_budget(candidates, budget):
+    """
+    Keeps at most `budget` candidates, highest priority first; within the priority level
+    that only partly fits, keeps evenly spaced ones. The result is in ply order.
+    """
+    if len(candidates) <= budget:
+        return candidates
+    kept = []
+    for priority in sorted({candidate[0] for candidate in candidates}, reverse=True):
+        level = [candidate for candidate in candidates if candidate[0] == priority]
+        room = budget - len(kept)
+        if len(level) > room:
+            level = [level[i * len(level) // room] for i in range(room)] if room else []
+        kept.extend(level)
+    return sorted(kept, key=lambda candidate: candidate[1])
+
+SAMPLERS = {"interval": sample_interval, "change": sample_change_points}
+
+def extract_positions(game, game_id, position_frequency=5, sampler="interval", cache=None, **sampler_options):
+    """
+    Replay a parsed game and convert the sampled positions to DTOs.
+    
+    :param game: python-chess game from parse_game
+    :param game_id: Game ID from the game metadata
+    :param position_frequency: Extract a position every N moves (interval sampler)
+    :param sampler: "interval" or "change" (see SAMPLERS)
+    :param cache: Optional OpeningCache (interval sampler)
+    :param sampler_options: position_budget / change_distance for the change sampler
+    :return: List of position dictionaries
+    """
+    if sampler == "interval":
+        samples = sample_interval(game, position_frequency, cache)
+    else:
+        samples = SAMPLERS[sampler](game, **sampler_options)
+
+    return [
+        {
+            "positionId": position_id_for(game_id, move_count),
+            "moveNumber": move_count,
+            **dto
+        }
+        for move_count, dto in samples
+    ]
+
+def extract_positions_from_game(pgn_text, position_frequency=5, sampler="interval", **sampler_options):
+    """
+    Extract positions from a chess game with specific PGN format.
+    
+    :param pgn_text: Raw PGN text
+    :param position_frequency: Extract a position every N moves
+    :param sampler: "interval" or "change", see extract_positions
+    :return: Dictionary with game metadata and positions or None
+    """
+    parsed = parse_game(pgn_text)
+    if parsed is None:
+        return None
+    game, game_data = parsed
+
+    try:
+        positions = extract_positions(game, game_data["gameId"], position_frequency, sampler, **sampler_options)
+    except Exception as e:
+        print(f"Error extracting positions: {e}")
+        return None
+
+    return {
+        "gameMetadata": game_data,
+        "positions": positions
+    }
+
+# Bytes read per block, and the pattern between two games: a blank line (possibly holding
+# spaces or \r, possibly several) followed by the next game's first header
+BLOCK_SIZE = 1 << 20
+GAME_BOUNDARY = re.compile(rb"\n[ \t\r]*\n\s*(?=\[)")
+# Games dropped by parse_game anyway, recognizable without decoding
+SKIPPED_TERMINATION = re.compile(rb'\[Termination "(?:Abandoned|Time forfeit)"\]')
+
+def split_games(pgn_file_path, block_size=BLOCK_SIZE):
+    """
+    Split a PGN file into games without per-line work: the file is read in binary blocks
+    into a reusable buffer and games are cut at GAME_BOUNDARY.
+    
+    :param pgn_file_path: Path to PGN file
+    :param block_size: Bytes read per block (the buffer grows for games larger than this)
+    :yield: memoryview of each game's bytes, only valid until the next game is requested
+    """
+    buffer = bytearray(block_size)
+    view = memoryview(buffer)
+    filled = 0
+    
+    with open(pgn_file_path, 'rb') as file:
+        while True:
+            if filled == len(buffer):
+                # A single game larger than the buffer: grow it (earlier views keep the old one alive)
+                buffer = buffer + bytearray(len(buffer))
+                view = memoryview(buffer)
+            read = file.readinto(view[filled:])
+            filled += read
+            at_end = read == 0
+            
+            start = 0
+            for boundary in GAME_BOUNDARY.finditer(view[:filled]):
+                if boundary.start() > start:
+                    yield view[start:boundary.start()]
+                start = boundary.end()
+            
+            if at_end:
+                if view[start:filled].tobytes().strip():
+                    yield view[start:filled]
+                return
+            
+            # Keep the incomplete last game at the front of the buffer for the next block
+            buffer[:filled - start] = buffer[start:filled]
+            filled -= start
+
+def is_skipped_game(game_bytes):
+    """
+    True for games parse_game would drop for their termination, checked on the raw bytes.
+    """
+    return SKIPPED_TERMINATION.search(game_bytes) is not None
+
+def read_game_texts(pgn_file_path):
+    """
+    Split a PGN file into raw game texts (headers and move text), see split_games.
+    
+    :param pgn_file_path: Path to PGN file
+    :yield: Raw game text
+    """
+    for game_bytes in split_games(pgn_file_path):
+        yield str(game_bytes, 'utf-8')
+
 def process_pgn_file(pgn_file_path, max_games=200000, position_frequency=5, skip_games = 0, redis_client = None, redis_key = None):
     """
     Process entire PGN file line by line and yield game data.
@@ -132,61 +373,36 @@ def process_pgn_file(pgn_file_path, max_games=200000, position_frequency=5, skip
     :param position_frequency: Extract a position every N moves
     :yield: Processed game data
     """
-    with open(pgn_file_path, 'r', encoding='utf-8') as file:
-        current_game = []
-        games_processed = 0
-        line_breaks = 0
+    games_processed = 0
+
+    for game_text in read_game_texts(pgn_file_path):
+        if games_processed < skip_games:
+            games_processed += 1
+            continue
+
+        # Join the game lines and process
+        print("Game Text : ", game_text)
+        game_data = extract_positions_from_game(game_text, position_frequency)
         
-        for line in file:
-            # Strip whitespace
-            line = line.strip()
+        if game_data:
+            games_processed += 1
+
+            # Yield the game data
+            yield game_data
             
-            # Check for empty line
-            if not line:
-                line_breaks += 1
-                
-                # Second line break indicates complete game
-                if line_breaks == 2:
-                    # Process the current game
-                    if current_game:
-
-                        if games_processed < skip_games:
-                            games_processed += 1
-                            current_game = []
-                            line_breaks = 0
-                            continue
-
-                        # Join the game lines and process
-                        game_text = '\n'.join(current_game)
-                        print("Game Text : ", game_text)
-                        game_data = extract_positions_from_game(game_text, position_frequency)
-                        
-                        if game_data:
-                            games_processed += 1
-
-                            # Yield the game data
-                            yield game_data
-                            
-                            # Print some info about each processed game
-                            print(f"Processed Game {games_processed}:")
-                            print(f"  White: {game_data['gameMetadata']['whiteName']}")
-                            print(f"  Black: {game_data['gameMetadata']['blackName']}")
-                            print(f"  Result: {game_data['gameMetadata']['result']}")
-                            print(f"  Positions Extracted: {len(game_data['positions'])}")
-                            print("-" * 40)
-                            
-                            if redis_client and redis_key:
-                                redis_client.set(redis_key, games_processed)
-
-                            # Stop processing if we've reached max_games
-                            if games_processed >= max_games:
-                                break
-                    
-                    # Reset for next game
-                    current_game = []
-                    line_breaks = 0
-                    continue
-            else:
-                current_game.append(line)
-        
-        print(f"Total games processed: {games_processed}")
\ No newline at end of file
+            # Print some info about each processed game
+            print(f"Processed Game {games_processed}:")
+            print(f"  White: {game_data['gameMetadata']['whiteName']}")
+            print(f"  Black: {game_data['gameMetadata']['blackName']}")
+            print(f"  Result: {game_data['gameMetadata']['result']}")
+            print(f"  Positions Extracted: {len(game_data['positions'])}")
+            print("-" * 40)
+            
+            if redis_client and redis_key:
+                redis_client.set(redis_key, games_processed)
+
+            # Stop processing if we've reached max_games
+            if games_processed >= max_games:
+                break
+    
+    print(f"Total games processed: {games_processed}")
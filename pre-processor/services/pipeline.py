@@ -0,0 +1,246 @@
+import queue
+import threading
+import time
+
+from services.pgn_parser import extract_positions, is_skipped_game, parse_game, split_games
+from utils.position_vectorizer import vectorize_positions
+
+# Marks the end of a stage's output
+END = object()
+
+class IngestPipeline:
+    """
+    Staged ingest: read -> parse -> convert -> publish, each stage in its own thread and
+    connected by bounded queues. A slow publisher fills the queues and blocks the earlier
+    stages (backpressure) instead of buffering the whole file. Items carry the index of
+    their raw game in the file so the Redis progress key only advances past games that
+    have been published (or dropped as unparseable).
+    """
+
+    def __init__(self, pgn_file_path, publisher, batch_size=100, position_frequency=5, max_games=200000,
+                 skip_games=0, queue_depth=64, redis_client=None, redis_key=None, report_interval=10.0,
+                 vector_writer=None, sampler="interval", sampler_options=None, opening_cache=None):
+        """
+        :param pgn_file_path: Path to PGN file
+        :param publisher: KafkaPublisher or APIPublisher
+        :param batch_size: Games per publish batch
+        :param position_frequency: Extract a position every N moves
+        :param max_games: Maximum number of games to publish
+        :param skip_games: Raw games at the start of the file to skip (resume point)
+        :param queue_depth: Capacity of each queue between stages
+        :param report_interval: Seconds between queue occupancy reports (0 disables them)
+        :param vector_writer: Optional VectorSidecarWriter receiving the vectors of published positions
+        :param sampler: Position sampler, "interval" or "change" (see pgn_parser.SAMPLERS)
+        :param sampler_options: position_budget / change_distance for the change sampler
+        :param opening_cache: Optional OpeningCache used by the interval sampler (convert stage only)
+        """
+        self.pgn_file_path = pgn_file_path
+        self.publisher = publisher
+        self.batch_size = batch_size
+        self.position_frequency = position_frequency
+        self.max_games = max_games
+        self.skip_games = skip_games
+        self.redis_client = redis_client
+        self.redis_key = redis_key
+        self.report_interval = report_interval
+        self.vector_writer = vector_writer
+        self.sampler = sampler
+        self.sampler_options = sampler_options or {}
+        self.opening_cache = opening_cache if sampler == "interval" else None
+
+        self.queues = {
+            "read->parse": queue.Queue(queue_depth),
+            "parse->convert": queue.Queue(queue_depth),
+            "convert->publish": queue.Queue(queue_depth),
+        }
+        # Set on error or interrupt: stages stop, the publisher flushes its current batch
+        self.abort = threading.Event()
+        # Set once max_games have been converted: reading and parsing stop early
+        self.enough = threading.Event()
+        self.errors = []
+        # Counters per stage, each only written by its stage's thread; `counts` sums them up
+        self.stage_counts = {
+            "read": {"read": 0, "dropped": 0},
+            "parse": {"parsed": 0, "dropped": 0},
+            "convert": {"converted": 0, "dropped": 0, "positions": 0},
+            "publish": {"published": 0, "batches": 0, "vectors": 0},
+        }
+
+    @property
+    def counts(self):
+        counts = {"read": 0, "parsed": 0, "dropped": 0, "converted": 0, "published": 0, "batches": 0,
+                  "positions": 0, "vectors": 0}
+        for stage_counts in self.stage_counts.values():
+            for key, value in stage_counts.items():
+                counts[key] += value
+        return counts
+
+    # Queue helpers
+
+    def _put(self, name, item, stop_events):
+        # Blocks while the queue is full (backpressure) but gives up once any stop event is set
+        while not any(event.is_set() for event in stop_events):
+            try:
+                self.queues[name].put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, name):
+        while not self.abort.is_set():
+            try:
+                return self.queues[name].get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return END
+
+    # Stages
+
+    def _read(self):
+        counts = self.stage_counts["read"]
+        for index, game_bytes in enumerate(split_games(self.pgn_file_path)):
+            if index < self.skip_games:
+                continue
+            counts["read"] += 1
+            # Skipped and filtered games are never decoded
+            if is_skipped_game(game_bytes):
+                counts["dropped"] += 1
+                continue
+            if not self._put("read->parse", (index, str(game_bytes, "utf-8")), (self.abort, self.enough)):
+                return
+        self._put("read->parse", END, (self.abort, self.enough))
+
+    def _parse(self):
+        counts = self.stage_counts["parse"]
+        while (item := self._get("read->parse")) is not END:
+            index, game_text = item
+            parsed = parse_game(game_text)
+            counts["parsed" if parsed else "dropped"] += 1
+            if not self._put("parse->convert", (index, parsed), (self.abort, self.enough)):
+                return
+        self._put("parse->convert", END, (self.abort, self.enough))
+
+    def _convert(self):
+        counts = self.stage_counts["convert"]
+        while (item := self._get("parse->convert")) is not END:
+            index, parsed = item
+            game_data = vectors = None
+            if parsed is not None:
+                game, metadata = parsed
+                try:
+                    positions = extract_positions(game, metadata["gameId"], self.position_frequency, self.sampler,
+                                                  self.opening_cache, **self.sampler_options)
+                    game_data = {"gameMetadata": metadata, "positions": positions}
+                    counts["positions"] += len(positions)
+                    if self.vector_writer:
+                        # Vectorized here so the publisher thread only writes them out
+                        vectors = vectorize_positions(positions, self.vector_writer.weights)
+                    counts["converted"] += 1
+                except Exception as e:
+                    print(f"Error extracting positions: {e}")
+                    counts["dropped"] += 1
+            # Dropped games are forwarded as None so the progress index stays contiguous
+            if not self._put("convert->publish", (index, game_data, vectors), (self.abort,)):
+                return
+            if counts["converted"] >= self.max_games:
+                self.enough.set()
+                break
+        self._put("convert->publish", END, (self.abort,))
+
+    def _publish(self):
+        batch = []
+        last_index = None
+        while True:
+            item = self._get("convert->publish")
+            if item is not END:
+                last_index, game_data, vectors = item
+                if game_data is not None:
+                    batch.append((game_data, vectors))
+            if batch and (len(batch) >= self.batch_size or item is END):
+                self._flush(batch, last_index)
+                batch = []
+            elif item is END and last_index is not None:
+                self._record_progress(last_index)
+            if item is END:
+                return
+
+    def _flush(self, batch, last_index):
+        counts = self.stage_counts["publish"]
+        counts["published"] += self.publisher.publish_batch([game_data for game_data, _ in batch])
+        counts["batches"] += 1
+        if self.vector_writer:
+            for game_data, (one_hot, dense) in batch:
+                position_ids = [position["positionId"] for position in game_data["positions"]]
+                counts["vectors"] += self.vector_writer.write_vectors(position_ids, one_hot, dense)
+            # Vectors are on disk before the progress key moves past their games
+            self.vector_writer.flush()
+        self._record_progress(last_index)
+
+    def _record_progress(self, last_index):
+        if self.redis_client and self.redis_key:
+            self.redis_client.set(self.redis_key, last_index + 1)
+
+    # Running
+
+    def _stage(self, name, target):
+        def run():
+            try:
+                target()
+            except BaseException as e:
+                self.errors.append((name, e))
+                self.abort.set()
+        return threading.Thread(target=run, name=f"ingest-{name}", daemon=True)
+
+    def occupancy(self):
+        """
+        Current fill of each queue as (size, capacity), plus the stage counters.
+        """
+        return {name: (q.qsize(), q.maxsize) for name, q in self.queues.items()}, self.counts
+
+    def report(self):
+        queues, counts = self.occupancy()
+        occupancy = ", ".join(f"{name} {size}/{capacity}" for name, (size, capacity) in queues.items())
+        print(f"[pipeline] queues: {occupancy} | " + ", ".join(f"{key} {value}" for key, value in counts.items()))
+        metrics = getattr(self.publisher, "metrics", None)
+        if metrics:
+            print(metrics.report())
+        if self.opening_cache:
+            stats = self.opening_cache.stats
+            print(f"[pipeline] opening cache: hit rate {self.opening_cache.hit_rate():.1%}, "
+                  f"{stats['plies_skipped']} plies skipped, {stats['dtos_reused']} DTOs reused, "
+                  f"{len(self.opening_cache.entries)} entries")
+
+    def run(self):
+        """
+        Runs all stages to completion. Ctrl+C aborts cleanly: the publisher still flushes
+        its current batch. Re-raises the first stage error.
+        """
+        stages = [self._stage("read", self._read), self._stage("parse", self._parse),
+                  self._stage("convert", self._convert), self._stage("publish", self._publish)]
+        start = time.perf_counter()
+        for stage in stages:
+            stage.start()
+
+        last_report = time.perf_counter()
+        try:
+            while any(stage.is_alive() for stage in stages):
+                stages[-1].join(timeout=0.5)
+                if self.report_interval and time.perf_counter() - last_report >= self.report_interval:
+                    self.report()
+                    last_report = time.perf_counter()
+        except KeyboardInterrupt:
+            print("Interrupted, stopping pipeline")
+            self.abort.set()
+        for stage in stages:
+            stage.join()
+
+        self.report()
+        elapsed = time.perf_counter() - start
+        counts = self.counts
+        print(f"Published {counts['published']} games in {counts['batches']} batches "
+              f"in {elapsed:.1f}s ({counts['published'] / elapsed if elapsed else 0:.1f} games/s)")
+        if self.errors:
+            name, error = self.errors[0]
+            raise RuntimeError(f"Pipeline stage '{name}' failed: {error}") from error
+        return counts
@@ -0,0 +1,336 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+from collections import OrderedDict
+
+import httpx
+
+SIMILARITY_SELECTION = """
+      positionId
+      gameId
+      moveNumber
+      similarityScore
+      position { fen }
+      game { whiteName blackName whiteElo blackElo result site }
+"""
+
+SUMMARY_SELECTION = """
+      aggregatedSummary
+      perGameSummaries { gameId summary }
+"""
+
+# Field, argument types and default selection of each batched query
+OPERATIONS = {
+    "findSimilarPositionsByFen": ({"fen": "String!", "request": "SimilarityRequestInput!"}, SIMILARITY_SELECTION),
+    "generateSummaryForPositions": ({"positionIds": "[ID!]!", "side": "String!"}, SUMMARY_SELECTION),
+}
+
+
+def canonical_request(request):
+    """
+    SimilarityRequestInput in a stable form: equal requests give equal cache keys
+    whatever the order of their keys or selected pieces.
+    """
+    request = dict(request)
+    if "selectedPieces" in request:
+        request["selectedPieces"] = sorted(request["selectedPieces"])
+    return {key: value for key, value in sorted(request.items()) if value is not None}
+
+
+def build_document(field, count, selection=None):
+    """
+    One GraphQL document querying `field` `count` times under aliases q0..qN-1, each
+    with its own variables ($fen0, $request0, ...).
+    """
+    arguments, default_selection = OPERATIONS[field]
+    definitions = ", ".join(f"${name}{i}: {kind}" for i in range(count) for name, kind in arguments.items())
+    fields = "\n".join(
+        f"  q{i}: {field}({', '.join(f'{name}: ${name}{i}' for name in arguments)}) {{{selection or default_selection}  }}"
+        for i in range(count)
+    )
+    return f"query Batch{field[0].upper()}{field[1:]}({definitions}) {{\n{fields}\n}}"
+
+
+class ResultCache:
+    """
+    LRU of query results in memory, optionally backed by a SQLite file that persists
+    across runs (so a re-run of a sweep only queries what is missing).
+    """
+
+    def __init__(self, max_size=10000, path=None):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.db = None
+        if path:
+            self.db = sqlite3.connect(path)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID")
+
+    @staticmethod
+    def key(field, variables):
+        return hashlib.sha1(f"{field}:{json.dumps(variables, sort_keys=True)}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        if self.db is not None:
+            row = self.db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row:
+                value = json.loads(row[0])
+                self._remember(key, value)
+                return value
+        return None
+
+    def put(self, key, value):
+        self._remember(key, value)
+        if self.db is not None:
+            self.db.execute("INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def commit(self):
+        if self.db is not None:
+            self.db.commit()
+
+    def _remember(self, key, value):
+        if not self.max_size:
+            return
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def close(self):
+        if self.db is not None:
+            self.db.commit()
+            self.db.close()
+
+
+class SimilarityClient:
+    """
+    Async client for the chess-app GraphQL API. Queries share a pooled keep-alive HTTP
+    connection, are batched as aliased fields into one document per request, run with
+    bounded concurrency and are answered from the cache when repeated.
+
+        async with SimilarityClient() as client:
+            async for result in client.find_similar_many((fen, request) for fen in fens):
+                ...
+    """
+
+    def __init__(self, url=None, batch_size=25, concurrency=8, cache_size=10000, cache_path=None,
+                 timeout=60.0, retries=2):
+        """
+        :param url: GraphQL endpoint (CHESS_GRAPHQL_URL, default http://localhost:8080/graphql)
+        :param batch_size: Queries per GraphQL document
+        :param concurrency: HTTP requests in flight (and pooled connections)
+        :param cache_size: Results kept in the in-memory LRU (0 disables it)
+        :param cache_path: Optional SQLite file persisting the cache across runs
+        :param retries: Retries of a batch after a connection error or a 5xx answer
+        """
+        self.url = url or os.getenv("CHESS_GRAPHQL_URL", "http://localhost:8080/graphql")
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.cache = ResultCache(cache_size, cache_path)
+        self.http = None
+        self.stats = {"queries": 0, "cache_hits": 0, "requests": 0, "errors": 0}
+
+    async def __aenter__(self):
+        self.http = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.http.aclose()
+        self.cache.close()
+
+    # Public API
+
+    async def find_similar(self, fen, request):
+        """
+        Similar positions for one FEN; raises RuntimeError on a GraphQL error.
+        """
+        async for result in self.find_similar_many([(fen, request)]):
+            if "error" in result:
+                raise RuntimeError(result["error"])
+            return result["results"]
+
+    async def find_similar_many(self, queries, selection=None):
+        """
+        Streams `{"index", "fen", "results"}` (or `"error"`) for each (fen, request) pair,
+        in completion order. `queries` may be a sync or async iterable and is consumed
+        lazily, so arbitrarily long sweeps run in constant memory.
+        """
+        async for index, variables, result in self._stream("findSimilarPositionsByFen", self._similar_variables(queries),
+                                                           selection):
+            yield {"index": index, "fen": variables["fen"], **result}
+
+    async def generate_summaries(self, position_ids, side):
+        async for result in self.generate_summaries_many([(position_ids, side)]):
+            if "error" in result:
+                raise RuntimeError(result["error"])
+            return result["results"]
+
+    async def generate_summaries_many(self, requests, selection=None):
+        """
+        Streams `{"index", "results"}` (or `"error"`) for each (position_ids, side) pair.
+        """
+        async def variables():
+            async for position_ids, side in _aiter(requests):
+                yield {"positionIds": sorted(str(position_id) for position_id in position_ids), "side": side}
+
+        async for index, _, result in self._stream("generateSummaryForPositions", variables(), selection):
+            yield {"index": index, **result}
+
+    # Batching
+
+    @staticmethod
+    async def _similar_variables(queries):
+        async for fen, request in _aiter(queries):
+            yield {"fen": fen, "request": canonical_request(request)}
+
+    async def _stream(self, field, variables_iter, selection):
+        """
+        Core loop: cache hits are yielded at once; misses are grouped into batches of
+        `batch_size` and sent with at most `concurrency` batches in flight. Identical
+        queries waiting in the same or an in-flight batch are sent once.
+        """
+        pending = {}  # cache key -> [(index, variables)] waiting for that key
+        batch = []
+        tasks = set()
+        index = 0
+
+        async def drain(wait_for):
+            done, _ = await asyncio.wait(tasks, return_when=wait_for)
+            for task in done:
+                tasks.discard(task)
+                for key, result in task.result():
+                    for waiting_index, variables in pending.pop(key):
+                        yield waiting_index, variables, result
+
+        async for variables in variables_iter:
+            self.stats["queries"] += 1
+            key = ResultCache.key(field, variables)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.stats["cache_hits"] += 1
+                yield index, variables, {"results": cached}
+            elif key in pending:
+                pending[key].append((index, variables))
+            else:
+                pending[key] = [(index, variables)]
+                batch.append((key, variables))
+                if len(batch) >= self.batch_size:
+                    tasks.add(asyncio.create_task(self._send(field, batch, selection)))
+                    batch = []
+                    if len(tasks) >= self.concurrency:
+                        async for result in drain(asyncio.FIRST_COMPLETED):
+                            yield result
+            index += 1
+
+        if batch:
+            tasks.add(asyncio.create_task(self._send(field, batch, selection)))
+        while tasks:
+            async for result in drain(asyncio.FIRST_COMPLETED):
+                yield result
+        self.cache.commit()
+
+    async def _send(self, field, batch, selection):
+        """
+        Sends one aliased document; returns (cache key, {"results"} or {"error"}) per query.
+        """
+        document = build_document(field, len(batch), selection)
+        variables = {f"{name}{i}": value for i, (_, query) in enumerate(batch) for name, value in query.items()}
+
+        for attempt in range(self.retries + 1):
+            try:
+                self.stats["requests"] += 1
+                response = await self.http.post(self.url, json={"query": document, "variables": variables})
+                if response.status_code >= 500 and attempt < self.retries:
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+                    continue
+                response.raise_for_status()
+                body = response.json()
+                break
+            except httpx.TransportError as e:
+                if attempt < self.retries:
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+                    continue
+                return self._failed(batch, f"{type(e).__name__}: {e}")
+            except httpx.HTTPStatusError as e:
+                return self._failed(batch, str(e))
+
+        # Errors are reported per alias through their path; an error without a path fails the batch
+        errors = {}
+        for error in body.get("errors") or []:
+            path = error.get("path") or []
+            errors.setdefault(path[0] if path else None, error.get("message", "GraphQL error"))
+        data = body.get("data") or {}
+
+        results = []
+        for i, (key, _) in enumerate(batch):
+            message = errors.get(f"q{i}") or (errors.get(None) if data.get(f"q{i}") is None else None)
+            if message:
+                self.stats["errors"] += 1
+                results.append((key, {"error": message}))
+            else:
+                self.cache.put(key, data.get(f"q{i}"))
+                results.append((key, {"results": data.get(f"q{i}")}))
+        return results
+
+    def _failed(self, batch, message):
+        self.stats["errors"] += len(batch)
+        return [(key, {"error": message}) for key, _ in batch]
+
+
+async def _aiter(iterable):
+    if hasattr(iterable, "__aiter__"):
+        async for item in iterable:
+            yield item
+    else:
+        for item in iterable:
+            yield item
+
+
+async def sweep(args):
+    """
+    Queries similar positions for every FEN in a file (one per line) and writes one
+    NDJSON result per FEN.
+    """
+    request = {"color": args.color, "selectedPieces": args.pieces, "limit": args.limit,
+               "minElo": args.min_elo, "maxElo": args.max_elo}
+
+    def queries():
+        with open(args.fens, "r", encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    yield line.strip(), request
+
+    async with SimilarityClient(url=args.url, batch_size=args.batch_size, concurrency=args.concurrency,
+                                cache_path=args.cache) as client:
+        with open(args.output, "w", encoding="utf-8") as output:
+            async for result in client.find_similar_many(queries()):
+                output.write(json.dumps(result) + "\n")
+        print(f"Done: {client.stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find similar positions for a file of FENs via the GraphQL API")
+    parser.add_argument("--fens", required=True, help="File with one FEN per line")
+    parser.add_argument("--output", required=True, help="NDJSON output, one line per FEN")
+    parser.add_argument("--url", default=None, help="GraphQL endpoint (default: CHESS_GRAPHQL_URL)")
+    parser.add_argument("--color", choices=["WHITE", "BLACK"], default="WHITE")
+    parser.add_argument("--pieces", nargs="+", default=["PAWN"],
+                        choices=["PAWN", "KNIGHT", "BISHOP", "ROOK", "QUEEN", "KING"])
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--min-elo", type=int, default=None)
+    parser.add_argument("--max-elo", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=25, help="FEN queries per GraphQL request")
+    parser.add_argument("--concurrency", type=int, default=8, help="GraphQL requests in flight")
+    parser.add_argument("--cache", default=None, help="SQLite file caching results across runs")
+    asyncio.run(sweep(parser.parse_args()))
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# services/ and utils/ are imported as top-level packages from the pre-processor directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,56 @@
+import io
+
+import chess.pgn
+
+from services.pgn_parser import game_id_for, parse_game, position_id_for
+
+PGN = ('[Event "Club match"]\n[Site "Berlin"]\n[Date "2024.01.02"]\n[Round "3"]\n[White "a"]\n[Black "b"]\n'
+       '[Result "1-0"]\n\n1. e4 e5 2. Nf3 Nc6 3. Bb5 a6 1-0')
+
+
+def read(pgn):
+    game = chess.pgn.read_game(io.StringIO(pgn))
+    return game.headers, game
+
+
+def test_game_id_of_a_url_site_is_the_url():
+    headers, game = read(PGN.replace('"Berlin"', '"https://lichess.org/abcd1234"'))
+    other_headers, other_game = read(PGN.replace('"Berlin"', '"https://lichess.org/abcd1234"').replace("a6", "Nf6"))
+    assert game_id_for(headers, game) == game_id_for(other_headers, other_game)
+
+
+def test_game_id_of_a_bare_domain_site_depends_on_the_game():
+    for site in ("https://www.chess.com", "https://lichess.org", "https://lichess.org/"):
+        game_id = game_id_for(*read(PGN.replace('"Berlin"', f'"{site}"')))
+        assert game_id != game_id_for(*read(PGN.replace('"Berlin"', f'"{site}"').replace("a6", "Nf6")))
+        assert game_id != game_id_for(*read(PGN.replace('"Berlin"', f'"{site}"').replace('"3"', '"4"')))
+
+
+def test_game_id_of_a_chess_com_game_url_is_the_url():
+    site = '"https://www.chess.com/game/live/123456789"'
+    assert game_id_for(*read(PGN.replace('"Berlin"', site))) == \
+        game_id_for(*read(PGN.replace('"Berlin"', site).replace("a6", "Nf6")))
+
+
+def test_game_id_ignores_pgn_formatting():
+    reformatted = PGN.replace("1. e4 e5 2. Nf3", "1.e4 e5\n2.Nf3").replace("3. Bb5", "3. Bb5 {pin}")
+    assert game_id_for(*read(PGN)) == game_id_for(*read(reformatted))
+
+
+def test_game_id_depends_on_identity_headers_and_moves():
+    game_id = game_id_for(*read(PGN))
+    assert game_id != game_id_for(*read(PGN.replace('"3"', '"4"')))
+    assert game_id != game_id_for(*read(PGN.replace("a6", "Nf6")))
+
+
+def test_position_ids_are_stable_per_game_and_ply():
+    game_id = game_id_for(*read(PGN))
+    assert position_id_for(game_id, 10) == position_id_for(game_id, 10)
+    assert len({position_id_for(game_id, ply) for ply in range(80)}) == 80
+    assert position_id_for(game_id, 10) != position_id_for(game_id_for(*read(PGN.replace('"3"', '"4"'))), 10)
+
+
+def test_reparsing_a_game_yields_the_same_ids():
+    lichess = PGN.replace('"Berlin"', '"https://lichess.org/abcd1234"') + " "
+    (_, first), (_, second) = parse_game(lichess), parse_game(lichess)
+    assert first["gameId"] == second["gameId"]
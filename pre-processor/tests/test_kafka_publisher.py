@@ -0,0 +1,54 @@
+import uuid
+from collections import Counter
+
+from services.kafka_publisher import PartitionMetrics, partition_for
+from services.pgn_parser import GAME_ID_NAMESPACE
+
+PINNED_PARTITIONS = [4, 2, 0, 1, 3, 1, 5, 3]
+
+
+class DeliveredMessage:
+    def __init__(self, partition, value):
+        self._partition, self._value = partition, value
+
+    def partition(self):
+        return self._partition
+
+    def value(self):
+        return self._value
+
+
+def test_partition_is_stable_and_in_range():
+    game_id = str(uuid.uuid5(GAME_ID_NAMESPACE, "https://lichess.org/abcd1234"))
+    assert partition_for(game_id, 6) == partition_for(game_id, 6)
+    assert all(0 <= partition_for(f"game-{n}", 6) < 6 for n in range(100))
+    assert partition_for(game_id, 1) == 0
+
+
+def test_partition_is_pinned():
+    # A change of hash reshuffles every game over the partitions; it has to be deliberate
+    assert [partition_for(f"game-{n}", 6) for n in range(8)] == PINNED_PARTITIONS
+    assert partition_for("00000000-0000-0000-0000-000000000000", 1024) == 10
+
+
+def test_game_ids_spread_evenly_over_partitions():
+    spread = Counter(partition_for(str(uuid.uuid5(GAME_ID_NAMESPACE, f"game {n}")), 6) for n in range(60000))
+    assert set(spread) == set(range(6))
+    assert max(spread.values()) / (60000 / 6) < 1.05
+
+
+def test_partition_metrics_skew_and_failures():
+    metrics = PartitionMetrics()
+    for partition, count in ((0, 30), (1, 10), (2, 20)):
+        for _ in range(count):
+            metrics.delivery_report(None, DeliveredMessage(partition, b"{}"))
+    metrics.delivery_report("broker down", None)
+    assert metrics.messages == {0: 30, 1: 10, 2: 20}
+    assert metrics.bytes[0] == 60
+    assert metrics.failed == 1
+    assert metrics.skew() == 1.5
+    assert "3 partitions, skew 1.50" in metrics.report()
+
+
+def test_skew_without_deliveries():
+    assert PartitionMetrics().skew() == 0.0
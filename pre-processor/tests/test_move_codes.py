@@ -0,0 +1,56 @@
+import base64
+import io
+
+import chess
+import chess.pgn
+import pytest
+
+from utils.move_codes import board_at, decode_move, decode_moves, encode_move, encode_moves, slice_codes
+
+GAME = "1. e4 e5 2. Nf3 Nc6 3. Bb5 a6 4. Ba4 Nf6 5. O-O Be7 6. Re1 b5 7. Bb3 d6"
+
+
+def moves_of(pgn):
+    return list(chess.pgn.read_game(io.StringIO(pgn)).mainline_moves())
+
+
+@pytest.mark.parametrize("move", [
+    chess.Move.from_uci("e2e4"),
+    chess.Move.from_uci("e1g1"),        # castling is the king's move
+    chess.Move.from_uci("a7a8q"),
+    chess.Move.from_uci("h2h1n"),       # underpromotion
+    chess.Move.from_uci("h8a1"),
+])
+def test_move_round_trip(move):
+    code = encode_move(move)
+    assert 0 <= code < 1 << 16
+    assert decode_move(code) == move
+
+
+def test_code_layout():
+    assert encode_move(chess.Move(chess.E2, chess.E4)) == chess.E2 | chess.E4 << 6
+    assert encode_move(chess.Move(chess.A7, chess.A8, chess.QUEEN)) >> 12 == chess.QUEEN
+
+
+def test_game_round_trip_is_two_bytes_per_ply():
+    moves = moves_of(GAME)
+    encoded = encode_moves(moves)
+    assert len(base64.b64decode(encoded)) == 2 * len(moves)
+    assert decode_moves(encoded) == moves
+    assert encode_moves([]) == "" and decode_moves("") == []
+
+
+def test_slice_is_the_continuation_after_a_ply():
+    moves = moves_of(GAME)
+    encoded = encode_moves(moves)
+    assert decode_moves(slice_codes(encoded, 4)) == moves[4:]
+    assert decode_moves(slice_codes(encoded, 4, 3)) == moves[4:7]
+    assert slice_codes(encoded, len(moves)) == ""
+
+
+def test_board_at_replays_the_prefix():
+    moves = moves_of(GAME)
+    board = chess.Board()
+    for move in moves[:6]:
+        board.push(move)
+    assert board_at(encode_moves(moves), 6).fen() == board.fen()
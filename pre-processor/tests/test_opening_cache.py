@@ -0,0 +1,37 @@
+import io
+
+import chess.pgn
+
+from services.pgn_parser import sample_interval
+from utils.opening_cache import OpeningCache
+
+SHUFFLE = "1. Nf3 Nf6 2. Ng1 Ng8 3. Nf3 Nf6 4. Ng1 Ng8 5. Nf3 Nf6 6. Ng1 Ng8 7. Nf3 Nf6 8. Ng1 Ng8"
+# The same knight moves from a position without White's a-pawn
+FEN_GAME = ('[SetUp "1"]\n[FEN "rnbqkbnr/pppppppp/8/8/8/8/1PPPPPPP/RNBQKBNR w KQkq - 0 1"]\n\n'
+            + SHUFFLE + " 9. e4 e5 10. d4 *")
+
+
+def game_of(pgn):
+    return chess.pgn.read_game(io.StringIO(pgn))
+
+
+def test_cached_replay_matches_uncached_replay():
+    cache = OpeningCache(max_plies=16)
+    first = game_of(SHUFFLE + " 9. e4 e5 10. d4 *")
+    second = game_of(SHUFFLE + " 9. d4 d5 10. c4 *")
+    sample_interval(first, 5, cache)
+    assert sample_interval(second, 5, cache) == sample_interval(second, 5)
+    assert cache.stats["hits"] == 1
+    assert cache.stats["plies_skipped"] == 16
+
+
+def test_games_from_a_fen_do_not_resume_from_the_standard_start():
+    cache = OpeningCache(max_plies=16)
+    sample_interval(game_of(SHUFFLE + " 9. e4 e5 10. d4 *"), 5, cache)
+    game = game_of(FEN_GAME)
+    assert sample_interval(game, 5, cache) == sample_interval(game, 5)
+    assert cache.stats["hits"] == 0
+
+    # ... but share the cache among themselves
+    assert sample_interval(game_of(FEN_GAME), 5, cache) == sample_interval(game, 5)
+    assert cache.stats["hits"] == 1
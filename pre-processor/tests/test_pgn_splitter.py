@@ -0,0 +1,84 @@
+import pytest
+
+from pgn_split_benchmark import line_loop_game_texts
+from services.pgn_parser import is_skipped_game, parse_game, read_game_texts, split_games
+
+HEADERS = ('[Event "Rated Blitz game"]\n[Site "https://lichess.org/{id}"]\n[White "a"]\n[Black "b"]\n'
+           '[Result "1-0"]\n[WhiteElo "1500"]\n[BlackElo "1500"]\n[Termination "Normal"]\n')
+MOVES = "1. e4 e5 2. Nf3 Nc6 3. Bb5 a6 4. Ba4 Nf6 5. O-O Be7 6. Re1 b5 7. Bb3 d6 8. c3 O-O 9. h3 Na5 1-0"
+PLIES = 18
+
+# Layouts the former line loop also splits correctly
+REGULAR_LAYOUTS = {
+    "regular": lambda i: HEADERS.format(id=i) + "\n" + MOVES + "\n\n",
+    "crlf": lambda i: (HEADERS.format(id=i) + "\n" + MOVES + "\n\n").replace("\n", "\r\n"),
+    "whitespace-only lines": lambda i: HEADERS.format(id=i) + "  \n" + MOVES + "\n \t\n",
+}
+IRREGULAR_LAYOUTS = {
+    "extra blank lines": lambda i: "\n\n" + HEADERS.format(id=i) + "\n\n\n" + MOVES + "\n\n\n\n",
+    "no blank after headers": lambda i: HEADERS.format(id=i) + MOVES + "\n\n",
+    "multi-line moves": lambda i: HEADERS.format(id=i) + "\n" + MOVES.replace(" 5. ", "\n5. ") + "\n\n",
+    "comments": lambda i: HEADERS.format(id=i) + "\n" + MOVES.replace("3. Bb5", "3. Bb5 { the Ruy Lopez\n\n}") + "\n\n",
+}
+LAYOUTS = {**REGULAR_LAYOUTS, **IRREGULAR_LAYOUTS}
+# Boundaries across blocks and buffer growth, up to the whole file in one block
+BLOCK_SIZES = (7, 64, 1 << 20)
+
+
+def write(tmp_path, content):
+    path = tmp_path / "games.pgn"
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        file.write(content)
+    return str(path)
+
+
+def parsed_games(texts):
+    games = [parse_game(text) for text in texts]
+    assert all(games)
+    return [(metadata["site"], [move.uci() for move in game.mainline_moves()]) for game, metadata in games]
+
+
+def split(path, block_size):
+    return [str(game, "utf-8") for game in split_games(path, block_size)]
+
+
+@pytest.mark.parametrize("block_size", BLOCK_SIZES)
+@pytest.mark.parametrize("layout", REGULAR_LAYOUTS)
+def test_matches_the_line_loop_on_regular_files(tmp_path, layout, block_size):
+    path = write(tmp_path, "".join(REGULAR_LAYOUTS[layout](i) for i in range(5)))
+    assert parsed_games(split(path, block_size)) == parsed_games(line_loop_game_texts(path))
+
+
+@pytest.mark.parametrize("block_size", BLOCK_SIZES)
+@pytest.mark.parametrize("layout", LAYOUTS)
+def test_every_layout_yields_one_complete_game_per_game(tmp_path, layout, block_size):
+    path = write(tmp_path, "".join(LAYOUTS[layout](i) for i in range(5)))
+    games = parsed_games(split(path, block_size))
+    assert [site for site, _ in games] == [f"https://lichess.org/{i}" for i in range(5)]
+    assert all(len(moves) == PLIES for _, moves in games)
+
+
+@pytest.mark.parametrize("block_size", BLOCK_SIZES)
+def test_mixed_layouts_without_final_newline(tmp_path, block_size):
+    content = "".join(LAYOUTS[name](i) for i, name in enumerate(list(LAYOUTS) * 3)).rstrip()
+    games = parsed_games(split(write(tmp_path, content), block_size))
+    assert len(games) == 3 * len(LAYOUTS)
+    assert all(len(moves) == PLIES for _, moves in games)
+
+
+def test_line_loop_merges_games_after_extra_blank_lines(tmp_path):
+    # The regression the block splitter fixes: blank-line runs shift the old game boundaries
+    path = write(tmp_path, "".join(IRREGULAR_LAYOUTS["extra blank lines"](i) for i in range(5)))
+    assert len(list(line_loop_game_texts(path))) != 5
+    assert len(list(read_game_texts(path))) == 5
+
+
+def test_empty_file(tmp_path):
+    assert list(split_games(write(tmp_path, ""))) == []
+    assert list(split_games(write(tmp_path, "\n\n  \n"))) == []
+
+
+def test_skipped_terminations_are_detected_on_raw_bytes():
+    assert is_skipped_game(HEADERS.replace("Normal", "Abandoned").encode())
+    assert is_skipped_game(HEADERS.replace("Normal", "Time forfeit").encode())
+    assert not is_skipped_game(HEADERS.encode())
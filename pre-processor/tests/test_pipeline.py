@@ -0,0 +1,71 @@
+import threading
+
+from services.pipeline import IngestPipeline
+
+HEADERS = ('[Event "Rated Blitz game"]\n[Site "https://lichess.org/{id}"]\n[White "a"]\n[Black "b"]\n'
+           '[Result "1-0"]\n[WhiteElo "1500"]\n[BlackElo "1500"]\n[Termination "{termination}"]\n')
+MOVES = "1. e4 e5 2. Nf3 Nc6 3. Bb5 a6 4. Ba4 Nf6 5. O-O Be7 6. Re1 b5 7. Bb3 d6 8. c3 O-O 9. h3 Na5 1-0"
+
+
+class RecordingPublisher:
+    def __init__(self):
+        self.games = []
+        self.threads = set()
+
+    def publish_batch(self, games):
+        self.threads.add(threading.current_thread().name)
+        self.games.extend(games)
+        return len(games)
+
+
+class RecordingRedis:
+    def __init__(self):
+        self.values = {}
+
+    def set(self, key, value):
+        self.values[key] = value
+
+
+def write_games(path, terminations):
+    path.write_text("".join(HEADERS.format(id=f"game{n:04d}", termination=termination) + "\n" + MOVES + "\n\n"
+                            for n, termination in enumerate(terminations)), encoding="utf-8")
+
+
+def run_pipeline(path, **options):
+    publisher, redis = RecordingPublisher(), RecordingRedis()
+    pipeline = IngestPipeline(str(path), publisher, redis_client=redis, redis_key="progress", report_interval=0,
+                              queue_depth=2, **options)
+    return pipeline, publisher, redis, pipeline.run()
+
+
+def test_counts_add_up_across_stages(tmp_path):
+    path = tmp_path / "games.pgn"
+    write_games(path, ["Normal"] * 4 + ["Abandoned"] * 3 + ["Normal"] * 3)
+    pipeline, publisher, redis, counts = run_pipeline(path, batch_size=3)
+
+    assert counts["read"] == 10
+    assert counts["dropped"] == 3
+    assert counts["parsed"] == counts["converted"] == counts["published"] == 7
+    assert counts["batches"] == 3
+    assert counts["positions"] == sum(len(game["positions"]) for game in publisher.games)
+    assert pipeline.stage_counts["read"]["dropped"] == 3
+    assert publisher.threads == {"ingest-publish"}
+    assert redis.values["progress"] == 10
+
+
+def test_stops_after_max_games(tmp_path):
+    path = tmp_path / "games.pgn"
+    write_games(path, ["Normal"] * 50)
+    _, publisher, _, counts = run_pipeline(path, batch_size=4, max_games=5)
+    assert counts["converted"] == 5
+    assert len(publisher.games) == 5
+
+
+def test_skip_games_resumes_after_the_progress_point(tmp_path):
+    path = tmp_path / "games.pgn"
+    write_games(path, ["Normal"] * 6)
+    _, publisher, redis, counts = run_pipeline(path, skip_games=4)
+    assert counts["read"] == 2
+    assert [game["gameMetadata"]["site"] for game in publisher.games] == [
+        "https://lichess.org/game0004", "https://lichess.org/game0005"]
+    assert redis.values["progress"] == 6
@@ -0,0 +1,47 @@
+import base64
+import struct
+
+import chess
+
+# 16-bit move code: from square (bits 0-5), to square (bits 6-11), promotion piece (bits 12-15,
+# python-chess piece type, 0 for none). Castling is the king's move (e1g1). A game's codes are
+# stored little-endian and base64 encoded, so the continuation from ply N starts at byte 2 * N.
+
+def encode_move(move):
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+def decode_move(code):
+    return chess.Move(code & 0x3F, (code >> 6) & 0x3F, (code >> 12) or None)
+
+def encode_moves(moves):
+    """
+    :param moves: Iterable of chess.Move
+    :return: Base64 string of the 16-bit codes
+    """
+    codes = [encode_move(move) for move in moves]
+    return base64.b64encode(struct.pack(f"<{len(codes)}H", *codes)).decode("ascii")
+
+def decode_moves(encoded):
+    """
+    :param encoded: Base64 string from encode_moves
+    :return: List of chess.Move
+    """
+    data = base64.b64decode(encoded)
+    return [decode_move(code) for code in struct.unpack(f"<{len(data) // 2}H", data)]
+
+def slice_codes(encoded, ply, count=None):
+    """
+    Continuation after `ply` plies, still encoded: a byte slice, no board or SAN involved.
+    """
+    data = base64.b64decode(encoded)
+    end = len(data) if count is None else 2 * (ply + count)
+    return base64.b64encode(data[2 * ply:end]).decode("ascii")
+
+def board_at(encoded, ply, start_fen=chess.STARTING_FEN):
+    """
+    Board after the first `ply` moves, replayed from the codes.
+    """
+    board = chess.Board(start_fen)
+    for move in decode_moves(encoded)[:ply]:
+        board.push(move)
+    return board
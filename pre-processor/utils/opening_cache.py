@@ -0,0 +1,77 @@
+import struct
+from collections import OrderedDict
+
+import chess
+
+from utils.move_codes import encode_move
+
+# Plies of a game's opening that are cached, and boards kept across all prefixes
+OPENING_CACHE_PLIES = 16
+OPENING_CACHE_SIZE = 50000
+
+class OpeningCache:
+    """
+    LRU of boards keyed by the start position and the move prefix that reached them (the
+    16-bit move codes of the first plies), together with the position DTO once a sampler has
+    converted that ply.
+    Games sharing an opening resume their replay from the deepest cached prefix and reuse
+    the DTOs of shared sampled positions instead of converting them again.
+    Not thread-safe: use one cache per converting thread.
+    """
+
+    def __init__(self, max_plies=OPENING_CACHE_PLIES, max_size=OPENING_CACHE_SIZE):
+        """
+        :param max_plies: Deepest prefix cached
+        :param max_size: Entries kept (one per distinct prefix)
+        """
+        self.max_plies = max_plies
+        self.max_size = max_size
+        self.entries = OrderedDict()  # (start FEN, prefix bytes) -> [board, DTO or None]
+        self.stats = {"games": 0, "hits": 0, "plies_skipped": 0, "dtos_reused": 0}
+
+    @staticmethod
+    def prefix_keys(moves, max_plies, start_fen=chess.STARTING_FEN):
+        """
+        Key of every prefix of the first `max_plies` moves played from `start_fen` (games with
+        SetUp/FEN headers start elsewhere); keys[n - 1] is the key of n plies.
+        """
+        codes = struct.pack(f"<{min(len(moves), max_plies)}H", *(encode_move(move) for move in moves[:max_plies]))
+        return [(start_fen, codes[:2 * ply]) for ply in range(1, len(codes) // 2 + 1)]
+
+    def resume(self, keys, is_sampled):
+        """
+        Walks the cached prefixes of a game as deep as they go, stopping early at a sampled
+        ply whose DTO was not converted before.
+        
+        :param keys: prefix_keys of the game
+        :param is_sampled: Predicate telling whether a ply is sampled
+        :return: (plies replayed, copy of the board after them or None, [(ply, DTO)] of the sampled plies)
+        """
+        self.stats["games"] += 1
+        plies, board, dtos = 0, None, []
+        for ply, key in enumerate(keys, start=1):
+            entry = self.entries.get(key)
+            if entry is None or (is_sampled(ply) and entry[1] is None):
+                break
+            self.entries.move_to_end(key)
+            if is_sampled(ply):
+                dtos.append((ply, entry[1]))
+            plies, board = ply, entry[0]
+        if plies:
+            self.stats["hits"] += 1
+            self.stats["plies_skipped"] += plies
+            self.stats["dtos_reused"] += len(dtos)
+            board = board.copy(stack=False)
+        return plies, board, dtos
+
+    def store(self, key, board, dto=None):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.entries[key] = [board.copy(stack=False), dto]
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        elif dto is not None:
+            entry[1] = dto
+
+    def hit_rate(self):
+        return self.stats["hits"] / self.stats["games"] if self.stats["games"] else 0.0
@@ -0,0 +1,252 @@
+import os
+import struct
+import uuid
+
+import chess
+import numpy as np
+
+# Piece-square one-hot: 12 planes (white P N B R Q K, then black) of 64 squares = 768 bits.
+# Plane order matches python-chess piece types, so each plane is exactly one bitboard word.
+PLANES = [(color, piece_type) for color in (chess.WHITE, chess.BLACK) for piece_type in chess.PIECE_TYPES]
+WORDS = len(PLANES)
+
+# Dense features and their default weights. Weights scale each feature's contribution
+# to euclidean/cosine distances next to the one-hot part.
+DENSE_WEIGHTS = {
+    "white_material": 1.0 / 39,
+    "black_material": 1.0 / 39,
+    "material_balance": 1.0 / 39,
+    "white_king_shield": 1.0 / 3,
+    "black_king_shield": 1.0 / 3,
+    "white_king_zone_enemies": 1.0 / 4,
+    "black_king_zone_enemies": 1.0 / 4,
+    "side_to_move": 1.0,
+    "castling_rights": 1.0 / 15,
+}
+DENSE_FEATURES = list(DENSE_WEIGHTS)
+
+PIECE_VALUES = {chess.PAWN: 1, chess.KNIGHT: 3, chess.BISHOP: 3, chess.ROOK: 5, chess.QUEEN: 9, chess.KING: 0}
+
+# Position DTO fields holding each plane (see bitboard_converter.convert_position_to_dto)
+DTO_FIELDS = {
+    (chess.WHITE, chess.PAWN): "whitePawns", (chess.WHITE, chess.KNIGHT): "whiteKnights",
+    (chess.WHITE, chess.BISHOP): "whiteBishops", (chess.WHITE, chess.ROOK): "whiteRooks",
+    (chess.WHITE, chess.QUEEN): "whiteQueens", (chess.WHITE, chess.KING): "whiteKing",
+    (chess.BLACK, chess.PAWN): "blackPawns", (chess.BLACK, chess.KNIGHT): "blackKnights",
+    (chess.BLACK, chess.BISHOP): "blackBishops", (chess.BLACK, chess.ROOK): "blackRooks",
+    (chess.BLACK, chess.QUEEN): "blackQueens", (chess.BLACK, chess.KING): "blackKing",
+}
+
+SIDECAR_MAGIC = b"CPVEC001"
+# Header: magic, words per vector, dense dimensions
+SIDECAR_HEADER = struct.Struct("<8sII")
+
+
+def dto_to_words(position):
+    """
+    The 12 plane bitboards of a position DTO, without parsing its FEN.
+    Pawns are bitboards, kings a single square (or None) and other pieces square lists.
+    """
+    words = []
+    for color, piece_type in PLANES:
+        value = position.get(DTO_FIELDS[color, piece_type])
+        if value is None:
+            mask = 0
+        elif piece_type == chess.PAWN:
+            mask = value
+        elif piece_type == chess.KING:
+            mask = chess.BB_SQUARES[value]
+        else:
+            mask = 0
+            for square in value:
+                mask |= chess.BB_SQUARES[square]
+        words.append(mask)
+    return words
+
+
+def board_to_words(board):
+    """
+    The 12 plane bitboards of a chess.Board.
+    """
+    return [board.pieces_mask(piece_type, color) for color, piece_type in PLANES]
+
+
+def _king_zone_features(words, color):
+    own = 0 if color == chess.WHITE else 6
+    enemy = 6 - own
+    king = words[own + chess.KING - 1]
+    if not king:
+        return 0, 0
+    zone = chess.BB_KING_ATTACKS[chess.lsb(king)]
+    shield = (words[own + chess.PAWN - 1] & zone).bit_count()
+    enemies = 0
+    for piece_type in chess.PIECE_TYPES[1:]:
+        enemies += (words[enemy + piece_type - 1] & zone).bit_count()
+    return shield, enemies
+
+
+def dense_features(words, side_to_move, castling_rights, weights=DENSE_WEIGHTS):
+    """
+    Weighted dense features of a position from its plane words.
+
+    :param side_to_move: "w" or "b"
+    :param castling_rights: Bitmask as in the position DTO
+    :param weights: Feature weights, keys as in DENSE_WEIGHTS
+    :return: float32 array in DENSE_FEATURES order
+    """
+    white_material = sum(words[piece_type - 1].bit_count() * value for piece_type, value in PIECE_VALUES.items())
+    black_material = sum(words[6 + piece_type - 1].bit_count() * value for piece_type, value in PIECE_VALUES.items())
+    white_shield, white_enemies = _king_zone_features(words, chess.WHITE)
+    black_shield, black_enemies = _king_zone_features(words, chess.BLACK)
+    raw = {
+        "white_material": white_material,
+        "black_material": black_material,
+        "material_balance": white_material - black_material,
+        "white_king_shield": white_shield,
+        "black_king_shield": black_shield,
+        "white_king_zone_enemies": white_enemies,
+        "black_king_zone_enemies": black_enemies,
+        "side_to_move": 1 if side_to_move == "w" else 0,
+        "castling_rights": castling_rights,
+    }
+    return np.array([raw[name] * weights[name] for name in DENSE_FEATURES], dtype=np.float32)
+
+
+def vectorize_positions(positions, weights=DENSE_WEIGHTS):
+    """
+    Batch vectorization of position DTOs (as produced by the PGN parser).
+
+    :param positions: List of position dictionaries
+    :param weights: Dense feature weights, or None for the one-hot part only
+    :return: (uint64 array of shape (n, 12), float32 array of shape (n, dense dimensions))
+    """
+    one_hot = np.zeros((len(positions), WORDS), dtype=np.uint64)
+    dense = np.zeros((len(positions), len(DENSE_FEATURES) if weights else 0), dtype=np.float32)
+    for row, position in enumerate(positions):
+        words = dto_to_words(position)
+        one_hot[row] = words
+        if weights:
+            dense[row] = dense_features(words, position.get("sideToMove"), position.get("castlingRights", 0), weights)
+    return one_hot, dense
+
+
+def vectorize_boards(boards, weights=DENSE_WEIGHTS):
+    """
+    Batch vectorization of chess.Board objects; same output as vectorize_positions.
+    """
+    one_hot = np.zeros((len(boards), WORDS), dtype=np.uint64)
+    dense = np.zeros((len(boards), len(DENSE_FEATURES) if weights else 0), dtype=np.float32)
+    for row, board in enumerate(boards):
+        words = board_to_words(board)
+        one_hot[row] = words
+        if weights:
+            castling_rights = (
+                (1 if board.has_kingside_castling_rights(chess.WHITE) else 0) +
+                (2 if board.has_queenside_castling_rights(chess.WHITE) else 0) +
+                (4 if board.has_kingside_castling_rights(chess.BLACK) else 0) +
+                (8 if board.has_queenside_castling_rights(chess.BLACK) else 0)
+            )
+            dense[row] = dense_features(words, "w" if board.turn == chess.WHITE else "b", castling_rights, weights)
+    return one_hot, dense
+
+
+def unpack_bits(one_hot):
+    """
+    Expand packed words to a (n, 768) uint8 0/1 matrix for indexes that want dense input.
+    Bit i of word p is square i of plane p.
+    """
+    return np.unpackbits(one_hot.astype("<u8").view(np.uint8), axis=1, bitorder="little")
+
+
+def hamming_distances(query, one_hot):
+    """
+    Hamming distance from one packed vector (12 words) to each row of `one_hot`.
+    """
+    differing = np.bitwise_xor(one_hot, np.asarray(query, dtype=np.uint64))
+    return unpack_bits(differing).sum(axis=1, dtype=np.int32)
+
+
+def sidecar_dtype(dense_dimensions):
+    """
+    Record layout of the vector sidecar: position UUID, packed one-hot, dense features.
+    """
+    return np.dtype([
+        ("position_id", "S16"),
+        ("one_hot", "<u8", (WORDS,)),
+        ("dense", "<f4", (dense_dimensions,)),
+    ])
+
+
+class VectorSidecarWriter:
+    """
+    Appends fixed-size vector records to a binary file, in the order positions are
+    published. The header records the layout so readers can memory-map the file.
+    """
+
+    def __init__(self, path, weights=DENSE_WEIGHTS):
+        self.weights = weights
+        self.dense_dimensions = len(DENSE_FEATURES) if weights else 0
+        self.dtype = sidecar_dtype(self.dense_dimensions)
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(SIDECAR_HEADER.pack(SIDECAR_MAGIC, WORDS, self.dense_dimensions))
+        else:
+            with open(path, "rb") as existing:
+                _, _, dense_dimensions = SIDECAR_HEADER.unpack(existing.read(SIDECAR_HEADER.size))
+            if dense_dimensions != self.dense_dimensions:
+                raise ValueError(f"{path} holds {dense_dimensions} dense features, expected {self.dense_dimensions}")
+            # Drop a record cut short by an interrupted run
+            torn = (self.file.tell() - SIDECAR_HEADER.size) % self.dtype.itemsize
+            if torn:
+                self.file.truncate(self.file.tell() - torn)
+                self.file.seek(0, 2)
+
+    def write_vectors(self, position_ids, one_hot, dense):
+        """
+        :param position_ids: Position UUID strings, one per row
+        :param one_hot: uint64 array from vectorize_positions
+        :param dense: float32 array from vectorize_positions
+        :return: Number of records written
+        """
+        records = np.zeros(len(position_ids), dtype=self.dtype)
+        records["position_id"] = [uuid.UUID(position_id).bytes for position_id in position_ids]
+        records["one_hot"] = one_hot
+        records["dense"] = dense
+        self.file.write(records.tobytes())
+        return len(records)
+
+    def write_positions(self, positions):
+        """
+        Vectorizes and writes position DTOs that carry a positionId.
+        """
+        one_hot, dense = vectorize_positions(positions, self.weights)
+        return self.write_vectors([position["positionId"] for position in positions], one_hot, dense)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def read_sidecar(path):
+    """
+    Memory-maps a vector sidecar file.
+
+    :return: Structured array with position_id, one_hot and dense fields
+    """
+    with open(path, "rb") as file:
+        magic, words, dense_dimensions = SIDECAR_HEADER.unpack(file.read(SIDECAR_HEADER.size))
+    if magic != SIDECAR_MAGIC or words != WORDS:
+        raise ValueError(f"Not a position vector file: {path}")
+    dtype = sidecar_dtype(dense_dimensions)
+    if os.path.getsize(path) == SIDECAR_HEADER.size:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=SIDECAR_HEADER.size)
+
+
+def position_ids(records):
+    """
+    Position UUID strings of sidecar records (fixed-size bytes drop trailing zero bytes).
+    """
+    return [str(uuid.UUID(bytes=position_id.ljust(16, b"\0"))) for position_id in records["position_id"]]